@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+"""
+In-process benchmark of every API endpoint.
+
+Drives server.app directly through ASGI (no network, no uvicorn) against the
+configured MongoDB, using a separate database (BENCH_DB_NAME, default
+"<DB_NAME>_bench") that is seeded with a synthetic dataset first; with
+--storage memory the lead and search routes run on the embedded backend
+instead; the automation routes stay on MongoDB, like the scheduler. Reports
+throughput and p50/p95/p99 latency per endpoint and writes the results as
+JSON. With --compare, a previous result file is used as the baseline and
+regressions beyond --threshold make the run exit with status 1, as do
+endpoints whose p95 misses the budget given in a --targets file.
+
+To measure against a large dataset, load one with synthetic_data.py and run
+with --db-name <that database> --no-seed --no-reset; request ids are then
+sampled from the existing data.
+
+Usage: python benchmarks/api_bench.py [--searches 50] [--leads-per-search 200]
+       [--requests 200] [--concurrency 16] [--only dashboard] [--compare old.json]
+       [--targets benchmarks/targets.json] [--no-seed]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from urllib.parse import urlencode
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from dotenv import load_dotenv
+
+load_dotenv(ROOT_DIR / '.env')
+
+RESULTS_DIR = Path(__file__).parent / 'results'
+
+
+class ASGIClient:
+    """Minimal in-process HTTP client for an ASGI app"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method, path, body=None, headers=None):
+        path, _, query = path.partition('?')
+        payload = json.dumps(body).encode() if body is not None else b''
+        raw_headers = [(b'host', b'bench'), (b'content-length', str(len(payload)).encode())]
+        if body is not None:
+            raw_headers.append((b'content-type', b'application/json'))
+        raw_headers += [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': method, 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+            'query_string': query.encode(), 'root_path': '', 'headers': raw_headers,
+            'client': ('127.0.0.1', 0), 'server': ('bench', 80)
+        }
+        request_sent = False
+        response = {'status': None, 'body': []}
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {'type': 'http.request', 'body': payload, 'more_body': False}
+            await asyncio.Event().wait()
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+            elif message['type'] == 'http.response.body':
+                response['body'].append(message.get('body', b''))
+
+        await self.app(scope, receive, send)
+        return response['status'], b''.join(response['body'])
+
+
+class Lifespan:
+    """Runs the app's startup and shutdown handlers via the ASGI lifespan protocol"""
+
+    def __init__(self, app):
+        self.app = app
+        self._events = asyncio.Queue()
+        self._replies = asyncio.Queue()
+
+    async def __aenter__(self):
+        async def receive():
+            return await self._events.get()
+
+        async def send(message):
+            await self._replies.put(message)
+
+        self._task = asyncio.get_running_loop().create_task(
+            self.app({'type': 'lifespan', 'asgi': {'version': '3.0'}}, receive, send))
+        await self._events.put({'type': 'lifespan.startup'})
+        reply = await self._replies.get()
+        if reply['type'] != 'lifespan.startup.complete':
+            raise RuntimeError(f"Startup failed: {reply}")
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._events.put({'type': 'lifespan.shutdown'})
+        await self._replies.get()
+        await self._task
+
+
+LOCATIONS = [('New York', 'NY', '10001'), ('Chicago', 'IL', '60601'), ('Austin', 'TX', '78701')]
+BUSINESS_TYPES = ['Restaurant', 'Cafe', 'Dental Clinic', 'Plumbing Service', 'Bakery']
+NAME_WORDS = ['Golden', 'Corner', 'Family', 'Urban', 'Classic']
+
+
+async def seed(storage, searches, leads_per_search, tasks):
+    """Synthetic dataset written through the storage layer; returns the ids endpoints are called with"""
+    from services.geo import synthetic_point
+    from services.cardinality import record_leads
+    from services.scoring import rescore_stale
+
+    rng = random.Random(42)
+    now = datetime.utcnow()
+    search_ids = []
+    leads_by_id = []
+
+    for s in range(searches):
+        search_id = str(uuid.uuid4())
+        search_ids.append(search_id)
+        created = now - timedelta(minutes=rng.randint(0, 60 * 24 * 30))
+        await storage.searches.insert({
+            'id': search_id, 'query': rng.choice(['pizza', 'coffee', 'dentist', 'plumber']),
+            'city': rng.choice(['New York', 'Chicago', 'Austin']), 'state': rng.choice(['NY', 'IL', 'TX']),
+            'zipCode': None, 'maxResults': leads_per_search, 'results_count': leads_per_search,
+            'created_at': created, 'status': 'completed'
+        })
+        leads = []
+        for i in range(leads_per_search):
+            lead_id = str(uuid.uuid4())
+            website = f"https://business-{s}-{i}.com"
+            leads_by_id.append((lead_id, website))
+            city, state, zip_code = rng.choice(LOCATIONS)
+            leads.append({
+                'id': lead_id, 'businessName': f"{rng.choice(NAME_WORDS)} Business {s}-{i}",
+                'businessType': rng.choice(BUSINESS_TYPES),
+                'address': f"{rng.randint(1, 9999)} Main St, {city}, {state} {zip_code}",
+                'phone': '(212) 555-0123' if rng.random() > 0.1 else None,
+                'website': website,
+                'email': f"info@business-{s}-{i}.com" if rng.random() > 0.5 else None,
+                'rating': round(rng.uniform(1, 5), 1), 'reviewCount': rng.randint(0, 2000),
+                'location': synthetic_point(city, state, lead_id),
+                'searchId': search_id, 'created_at': created
+            })
+        await storage.leads.insert_many(leads)
+        await record_leads(storage, leads)
+
+    # Tasks and health checks live in MongoDB with any storage backend (repositories.storage.automation_storage)
+    if storage.name == 'mongo':
+        task_docs = [{
+            'id': str(uuid.uuid4()),
+            'workflow_type': rng.choice(['google_maps_scraper', 'linkedin_extractor', 'ecommerce_intelligence']),
+            'status': rng.choice(['completed', 'completed', 'failed']),
+            'started_at': now - timedelta(minutes=rng.randint(0, 60 * 24 * 30)),
+            'result_count': rng.randint(0, 100)
+        } for _ in range(tasks)]
+        await asyncio.gather(*(storage.tasks.insert(task) for task in task_docs))
+        await storage.health_checks.insert({'timestamp': now, 'overall_status': 'healthy', 'services': {}})
+    # Score the seeded leads the way the scheduler's scoring job would
+    await rescore_stale(storage)
+
+    return SimpleNamespace(search_ids=search_ids, leads=leads_by_id)
+
+
+async def sample_ids(storage, count=1000):
+    """Ids from data that is already there, for runs with --no-seed"""
+    from repositories.base import LeadQuery
+
+    searches = await storage.searches.recent(count)
+    leads = (await storage.leads.query(LeadQuery(has_website=True, sort='created_at', limit=count)))['leads']
+    if not searches or not leads:
+        raise SystemExit("--no-seed needs existing searches and leads in the benchmark database")
+    return SimpleNamespace(search_ids=[s['id'] for s in searches], leads=[(l['id'], l['website']) for l in leads])
+
+
+# Routes that still read or write MongoDB directly, whatever STORAGE_BACKEND says
+MONGO_ONLY = {'POST /api/status', 'GET /api/status', 'GET /api/automation/dashboard/overview',
+              'GET /api/automation/workflows/status', 'GET /api/automation/system/health',
+              'GET /api/automation/metrics/performance', 'POST /api/automation/workflows/{workflow_name}/trigger',
+              'GET /api/automation/tasks/recent', 'GET /api/automation/statistics/summary'}
+
+
+def endpoints(ids):
+    """(name, method, path factory, body factory) for every route"""
+    from services.geo import city_center, tile_of
+
+    rng = random.Random(7)
+    pick = rng.choice
+
+    def near_city():
+        lng, lat = city_center(*pick(LOCATIONS)[:2])
+        return round(lng + rng.uniform(-0.05, 0.05), 5), round(lat + rng.uniform(-0.05, 0.05), 5)
+
+    def box_near_city():
+        lng, lat = near_city()
+        return {'minLng': lng - 0.05, 'minLat': lat - 0.05, 'maxLng': lng + 0.05, 'maxLat': lat + 0.05}
+
+    def city_tile(zoom):
+        return f'{zoom}/' + '/'.join(map(str, tile_of(*near_city(), zoom)))
+
+    return [
+        ('GET /api/', 'GET', lambda: '/api/', None),
+        ('POST /api/status', 'POST', lambda: '/api/status', lambda: {'client_name': pick(['a', 'b', 'c'])}),
+        ('GET /api/status', 'GET', lambda: '/api/status?' + urlencode({'limit': 100}), None),
+        ('GET /api/system/db-pool', 'GET', lambda: '/api/system/db-pool', None),
+        ('GET /metrics', 'GET', lambda: '/metrics', None),
+        ('POST /api/leads/scrape', 'POST', lambda: '/api/leads/scrape',
+         lambda: {'query': 'pizza', 'city': 'New York', 'state': 'NY', 'maxResults': 20}),
+        ('POST /api/leads/enrich-email', 'POST', lambda: '/api/leads/enrich-email',
+         lambda: dict(zip(('leadId', 'website'), pick(ids.leads)))),
+        ('GET /api/leads/search/{search_id}', 'GET', lambda: f'/api/leads/search/{pick(ids.search_ids)}', None),
+        ('GET /api/leads/dashboard/stats', 'GET', lambda: '/api/leads/dashboard/stats', None),
+        ('GET /api/leads/dashboard/cardinalities', 'GET', lambda: '/api/leads/dashboard/cardinalities?days=30', None),
+        ('GET /api/leads/top', 'GET', lambda: '/api/leads/top?k=20', None),
+        ('GET /api/leads/top (search)', 'GET', lambda: '/api/leads/top?' + urlencode({'searchId': pick(ids.search_ids)}),
+         None),
+        ('GET /api/leads/top (region)', 'GET', lambda: '/api/leads/top?' + urlencode({'region': pick(['NY', 'IL', 'TX'])}),
+         None),
+        ('GET /api/leads/geo/radius', 'GET',
+         lambda: '/api/leads/geo/radius?' + urlencode(dict(zip(('lng', 'lat'), near_city()), radiusKm=5)), None),
+        ('GET /api/leads/geo/bbox', 'GET',
+         lambda: '/api/leads/geo/bbox?' + urlencode(box_near_city()), None),
+        ('GET /api/leads/geo/nearest', 'GET',
+         lambda: '/api/leads/geo/nearest?' + urlencode(dict(zip(('lng', 'lat'), near_city()), k=10)), None),
+        ('GET /api/leads/geo/tiles/{z}/{x}/{y}', 'GET', lambda: f'/api/leads/geo/tiles/{city_tile(pick([10, 12, 14]))}', None),
+        ('GET /api/leads/query (text)', 'GET',
+         lambda: '/api/leads/query?' + urlencode({'q': pick(['pizza', 'golden cafe', 'dental', 'plumbing'])}), None),
+        ('GET /api/leads/query (filters)', 'GET',
+         lambda: '/api/leads/query?' + urlencode({'businessType': pick(BUSINESS_TYPES), 'minRating': 4,
+                                                  'hasEmail': 'true', 'sort': 'rating'}), None),
+        ('GET /api/leads/query (text+filters)', 'GET',
+         lambda: '/api/leads/query?' + urlencode({'q': pick(['cafe', 'family', 'bakery']), 'state': pick(['NY', 'TX']),
+                                                  'minReviews': 100, 'hasWebsite': 'true'}), None),
+        ('GET /api/leads/export/{search_id}', 'GET', lambda: f'/api/leads/export/{pick(ids.search_ids)}', None),
+        ('GET /api/automation/dashboard/overview', 'GET', lambda: '/api/automation/dashboard/overview', None),
+        ('GET /api/automation/workflows/status', 'GET', lambda: '/api/automation/workflows/status', None),
+        ('GET /api/automation/system/health', 'GET', lambda: '/api/automation/system/health', None),
+        ('GET /api/automation/metrics/performance', 'GET', lambda: '/api/automation/metrics/performance', None),
+        ('POST /api/automation/workflows/{workflow_name}/trigger', 'POST',
+         lambda: '/api/automation/workflows/google_maps_scraper/trigger', None),
+        ('GET /api/automation/tasks/recent', 'GET', lambda: '/api/automation/tasks/recent', None),
+        ('GET /api/automation/statistics/summary', 'GET', lambda: '/api/automation/statistics/summary', None),
+        ('GET /api/automation/archive', 'GET', lambda: '/api/automation/archive', None),
+    ]
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+async def run_endpoint(client, method, make_path, make_body, requests, concurrency):
+    latencies = []
+    errors = 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            status, _ = await client.request(method, make_path(), make_body() if make_body else None)
+            latencies.append(time.perf_counter() - started)
+            if status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'requests': requests,
+        'errors': errors,
+        'throughput_rps': round(requests / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3)
+    }
+
+
+def compare(results, baseline, threshold):
+    """Endpoints whose p95 rose or throughput fell by more than threshold"""
+    regressions = []
+    for name, current in results['endpoints'].items():
+        previous = baseline.get('endpoints', {}).get(name)
+        if not previous:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + threshold):
+            regressions.append(f"{name}: p95 {previous['p95_ms']} -> {current['p95_ms']} ms")
+        if current['throughput_rps'] < previous['throughput_rps'] * (1 - threshold):
+            regressions.append(f"{name}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} rps")
+    return regressions
+
+
+def check_targets(results, targets):
+    """Endpoints whose p95 is over their budget in targets ({endpoint: p95_ms})"""
+    return [f"{name}: p95 {results['endpoints'][name]['p95_ms']} ms > target {target} ms"
+            for name, target in targets.items()
+            if name in results['endpoints'] and results['endpoints'][name]['p95_ms'] > target]
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main_async(args):
+    # Point the app at the benchmark database and storage backend before it is imported
+    os.environ['DB_NAME'] = args.db_name
+    os.environ['STORAGE_BACKEND'] = args.storage
+    use_mongo = args.storage == 'mongo'
+
+    if args.skip_provider_delay:
+        import services.lead_scraper as lead_scraper
+
+        async def no_delay(_):
+            await asyncio.sleep(0)
+
+        lead_scraper.asyncio = SimpleNamespace(sleep=no_delay)
+
+    from database import mongo
+    from repositories.storage import storage
+    from server import app
+
+    mongo.connect()
+    if args.reset and use_mongo:
+        await mongo.client.drop_database(args.db_name)
+
+    async with Lifespan(app):
+        if args.seed:
+            ids = await seed(storage, args.searches, args.leads_per_search, args.tasks)
+        else:
+            ids = await sample_ids(storage)
+        client = ASGIClient(app)
+
+        results = {
+            'timestamp': datetime.utcnow().isoformat(),
+            'revision': git_revision(),
+            'config': {
+                'searches': args.searches, 'leads_per_search': args.leads_per_search, 'tasks': args.tasks,
+                'requests': args.requests, 'concurrency': args.concurrency,
+                'skip_provider_delay': args.skip_provider_delay, 'storage': args.storage,
+                'seeded': args.seed, 'leads': await storage.leads.count()
+            },
+            'endpoints': {}
+        }
+
+        print(f"{'endpoint':<58} {'rps':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>5}")
+        for name, method, make_path, make_body in endpoints(ids):
+            if args.only and args.only not in name:
+                continue
+            if not use_mongo and name in MONGO_ONLY:
+                continue
+            # Warm-up, so connection setup and first-call caches are not measured
+            await run_endpoint(client, method, make_path, make_body, min(args.concurrency, args.requests), args.concurrency)
+            stats = await run_endpoint(client, method, make_path, make_body, args.requests, args.concurrency)
+            results['endpoints'][name] = stats
+            print(f"{name:<58} {stats['throughput_rps']:>9} {stats['p50_ms']:>8} "
+                  f"{stats['p95_ms']:>8} {stats['p99_ms']:>8} {stats['errors']:>5}")
+
+        if args.reset and use_mongo:
+            await mongo.client.drop_database(args.db_name)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--searches", type=int, default=50)
+    parser.add_argument("--leads-per-search", type=int, default=200)
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=200, help="measured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--only", help="only endpoints whose name contains this string")
+    parser.add_argument("--storage", choices=['mongo', 'sqlite', 'memory'], default='mongo',
+                        help="storage backend; memory separates app cost from database cost")
+    parser.add_argument("--db-name", default=os.environ.get('BENCH_DB_NAME', f"{os.environ.get('DB_NAME', 'leads')}_bench"))
+    parser.add_argument("--no-reset", dest="reset", action="store_false",
+                        help="keep the benchmark database instead of dropping it before and after")
+    parser.add_argument("--skip-provider-delay", action="store_true",
+                        help="remove the mock scraper/enrichment sleeps to measure app cost only")
+    parser.add_argument("--output", type=Path, help="result file (default benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", type=Path, help="baseline result file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--no-seed", dest="seed", action="store_false",
+                        help="use the data already in the database, e.g. loaded by synthetic_data.py")
+    parser.add_argument("--targets", type=Path, help="JSON file of p95 budgets in ms per endpoint")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+
+    output = args.output or RESULTS_DIR / f"{datetime.utcnow():%Y%m%dT%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {output}")
+
+    failures = []
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.threshold)
+        failures += [f"REGRESSION {regression}" for regression in regressions]
+    if args.targets:
+        failures += [f"TARGET MISSED {miss}" for miss in check_targets(results, json.loads(args.targets.read_text()))]
+    for failure in failures:
+        print(failure)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for the streaming lead import (services/lead_import.py).
+
+Writes a seeded CSV or JSONL lead list to a temporary file, optionally
+gzipped, then streams it in fixed-size chunks through import_leads, the same
+path POST /api/leads/import takes. Reports rows/s and the process's peak
+RSS, which should stay flat as --rows grows.
+
+Usage: python benchmarks/import_bench.py [--rows 1000000] [--format csv|jsonl]
+       [--gzip] [--storage memory|sqlite|mongo] [--batch-size 5000]
+"""
+
+import argparse
+import asyncio
+import csv
+import gzip
+import io
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+import orjson
+
+CHUNK_SIZE = 64 * 1024
+HEADERS = ["Business Name", "Type", "Address", "Phone", "Website", "Email", "Rating", "Reviews",
+           "Latitude", "Longitude"]
+TYPES = ["Pizza Restaurant", "Coffee Shop", "Dentist", "Law Firm", "Auto Repair", "Hair Salon"]
+
+
+def make_row(rng: random.Random, index: int) -> list:
+    return [
+        f"Business {index}", rng.choice(TYPES), f"{rng.randint(100, 9999)} Main St, Austin, TX 78701",
+        "(512) 555-0123" if rng.random() > 0.1 else "", f"https://business-{index}.com",
+        f"info@business-{index}.com" if rng.random() > 0.3 else "", round(rng.uniform(3.0, 5.0), 1),
+        rng.randint(0, 2000), round(30.27 + rng.uniform(-0.1, 0.1), 5), round(-97.74 + rng.uniform(-0.1, 0.1), 5),
+    ]
+
+
+def write_file(path: str, rows: int, file_format: str, compress: bool, seed: int):
+    rng = random.Random(seed)
+    raw = gzip.open(path, 'wb', compresslevel=6) if compress else open(path, 'wb')
+    with raw, io.TextIOWrapper(raw, encoding='utf-8', newline='') as out:
+        if file_format == 'csv':
+            writer = csv.writer(out)
+            writer.writerow(HEADERS)
+            for index in range(rows):
+                writer.writerow(make_row(rng, index))
+        else:
+            for index in range(rows):
+                values = make_row(rng, index)
+                out.write(orjson.dumps({
+                    'businessName': values[0], 'businessType': values[1], 'address': values[2],
+                    'phone': values[3] or None, 'website': values[4], 'email': values[5] or None,
+                    'rating': values[6], 'reviewCount': values[7],
+                    'location': {'type': 'Point', 'coordinates': [values[9], values[8]]},
+                }).decode())
+                out.write('\n')
+
+
+async def file_chunks(path: str):
+    with open(path, 'rb') as source:
+        while chunk := source.read(CHUNK_SIZE):
+            yield chunk
+            await asyncio.sleep(0)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+async def run(args, path: str):
+    os.environ['STORAGE_BACKEND'] = args.storage
+    from database import mongo
+    from repositories.storage import storage
+    from services.lead_import import import_leads
+
+    mongo.connect()
+    await storage.setup()
+    try:
+        await storage.searches.insert({'id': 'import-bench', 'query': 'import bench', 'city': '', 'state': '',
+                                       'maxResults': 0, 'status': 'importing', 'results_count': 0})
+        rss_before = peak_rss_mb()
+        started = time.perf_counter()
+        report = await import_leads(storage, 'import-bench', file_chunks(path), args.format, args.batch_size)
+        elapsed = time.perf_counter() - started
+    finally:
+        await storage.close()
+        mongo.close()
+
+    print(f"{report['rows']:,} rows, {report['imported']:,} imported, {report['rejected']} rejected "
+          f"in {elapsed:.1f} s: {report['rows'] / elapsed:,.0f} rows/s")
+    print(f"peak RSS {rss_before} MB before the import, {peak_rss_mb()} MB after")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--format", choices=('csv', 'jsonl'), default='csv')
+    parser.add_argument("--gzip", action="store_true")
+    parser.add_argument("--storage", choices=('memory', 'sqlite', 'mongo'), default='memory')
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    suffix = f".{args.format}" + ('.gz' if args.gzip else '')
+    with tempfile.NamedTemporaryFile(suffix=suffix) as handle:
+        started = time.perf_counter()
+        write_file(handle.name, args.rows, args.format, args.gzip, args.seed)
+        print(f"Wrote {Path(handle.name).stat().st_size / 1e6:.1f} MB in {time.perf_counter() - started:.1f} s")
+        asyncio.run(run(args, handle.name))
+
+
+if __name__ == "__main__":
+    main()
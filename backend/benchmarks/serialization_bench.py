@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the lead serialization path.
+
+Compares the previous per-lead path (.dict(), rebuilding dicts without _id,
+response_model=dict validation, jsonable_encoder, stdlib json) with the
+bulk TypeAdapter + orjson path used by routes/leads.py.
+
+Usage: python benchmarks/serialization_bench.py [--leads 1000] [--repeat 50]
+"""
+
+import argparse
+import json
+import random
+import sys
+import timeit
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from models.leads import LeadResult, dump_leads
+
+DictAdapter = TypeAdapter(dict)
+
+# The "before" path deliberately uses the deprecated .dict()
+warnings.filterwarnings("ignore", category=DeprecationWarning)
+
+
+def make_leads(count):
+    rng = random.Random(42)
+    return [
+        LeadResult(
+            businessName=f"Business {i}",
+            businessType=rng.choice(["Pizza Restaurant", "Coffee Shop", "Salad Bar"]),
+            address=f"{rng.randint(100, 9999)} Main St, New York, NY 10001",
+            phone="(212) 555-0123" if rng.random() > 0.1 else None,
+            website=f"https://business-{i}.com",
+            email=f"info@business-{i}.com" if rng.random() > 0.3 else None,
+            rating=round(rng.uniform(3.5, 5.0), 1),
+            reviewCount=rng.randint(15, 500),
+            searchId="search-1"
+        )
+        for i in range(count)
+    ]
+
+
+def write_path_before(leads):
+    leads_data = [lead.dict() for lead in leads]
+    clean = [{k: v for k, v in d.items() if k != '_id'} for d in leads_data]
+    content = DictAdapter.validate_python({"results": clean, "count": len(clean)})
+    return json.dumps(jsonable_encoder(content)).encode()
+
+
+def write_path_after(leads):
+    leads_data = dump_leads(leads)
+    for d in leads_data:
+        d.pop('_id', None)
+    return orjson.dumps({"results": leads_data, "count": len(leads_data)})
+
+
+def read_path_before(docs):
+    content = DictAdapter.validate_python({"leads": docs, "count": len(docs)})
+    return json.dumps(jsonable_encoder(content)).encode()
+
+
+def read_path_after(docs):
+    return orjson.dumps({"leads": docs, "count": len(docs)})
+
+
+def bench(name, func, arg, repeat):
+    seconds = min(timeit.repeat(lambda: func(arg), number=1, repeat=repeat))
+    print(f"  {name:<8} {seconds * 1000:8.2f} ms")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leads", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    leads = make_leads(args.leads)
+    docs = dump_leads(leads)
+
+    # Both paths must produce the same payload
+    assert json.loads(write_path_before(leads)) == json.loads(write_path_after(leads))
+    assert json.loads(read_path_before(docs)) == json.loads(read_path_after(docs))
+
+    print(f"Serializing {args.leads} leads (best of {args.repeat})")
+    for label, before, after, arg in (
+        ("scrape response", write_path_before, write_path_after, leads),
+        ("search results read", read_path_before, read_path_after, docs),
+    ):
+        print(label)
+        t_before = bench("before", before, arg, args.repeat)
+        t_after = bench("after", after, arg, args.repeat)
+        print(f"  speedup  {t_before / t_after:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
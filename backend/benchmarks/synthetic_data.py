@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Seeded synthetic dataset generator for scale testing.
+
+Generates searches, leads, email enrichment logs and automation tasks with
+realistic distributions (skewed ratings, long-tailed review counts, missing
+contact fields, recency-weighted timestamps) and bulk-loads them into the
+configured MongoDB. Generation is vectorized with NumPy and split into
+chunks; every chunk has its own seed derived from (--seed, chunk index), so
+the dataset is identical regardless of --workers. Chunks are generated in a
+process pool and written with concurrent unordered insert_many batches.
+
+Usage: python benchmarks/synthetic_data.py --searches 500000 [--seed 42]
+       [--db-name leads_scale] [--workers 4] [--drop]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv(ROOT_DIR / '.env')
+
+from models.leads import LEAD_CODEC, SEARCH_CODEC
+from services.geo import EARTH_RADIUS_M, city_center
+
+# Stored like the app stores them (models.leads.DocumentCodec)
+CODECS = {'leads': LEAD_CODEC, 'searches': SEARCH_CODEC}
+
+CATEGORIES = [
+    # (query, business types, weight)
+    ('restaurants', ['Pizza Restaurant', 'American Restaurant', 'Japanese Restaurant',
+                     'Mexican Restaurant', 'Chinese Restaurant'], 0.35),
+    ('coffee', ['Coffee Shop', 'Cafe'], 0.15),
+    ('plumber', ['Plumbing Service'], 0.1),
+    ('hair salon', ['Hair Salon', 'Barber Shop'], 0.12),
+    ('gym', ['Fitness Center', 'Yoga Studio'], 0.1),
+    ('dentist', ['Dental Clinic'], 0.08),
+    ('bakery', ['Bakery'], 0.1),
+]
+
+CITIES = [
+    ('New York', 'NY', '10001', '212'), ('Los Angeles', 'CA', '90012', '213'), ('Chicago', 'IL', '60601', '312'),
+    ('Houston', 'TX', '77002', '713'), ('Phoenix', 'AZ', '85004', '602'), ('Philadelphia', 'PA', '19103', '215'),
+    ('San Antonio', 'TX', '78205', '210'), ('San Diego', 'CA', '92101', '619'), ('Dallas', 'TX', '75201', '214'),
+    ('Austin', 'TX', '78701', '512'), ('Miami', 'FL', '33101', '305'), ('Seattle', 'WA', '98101', '206'),
+    ('Denver', 'CO', '80202', '303'), ('Boston', 'MA', '02108', '617'), ('Portland', 'OR', '97201', '503'),
+    ('München', 'BY', '80331', '089'), ('Berlin', 'BE', '10115', '030'), ('Hamburg', 'HH', '20095', '040'),
+]
+
+NAME_PREFIXES = np.array([
+    "Tony's", 'The Corner', 'Sakura', "Maria's", 'Blue Moon', 'Dragon', 'Golden', 'Green Leaf', 'Urban',
+    'Sunrise', 'Harbor', 'Little', 'Royal', 'Old Town', 'Silver', 'Happy', 'Downtown', 'Village', 'Central',
+])
+NAME_SUFFIXES = np.array(['', ' & Co', ' House', ' Express', ' Studio', ' Place', ' Corner', ' Bar', ' Kitchen'])
+STREETS = np.array([
+    'Main St', 'Broadway Ave', 'Park Ave', '5th Street', 'Columbus Circle', 'Wall Street', 'Harbor View',
+    'Green Ave', 'Market St', 'Oak Street', 'Maple Ave', 'Elm Street', 'Lake Shore Dr', 'Sunset Blvd',
+])
+EMAIL_PREFIXES = np.array(['info', 'contact', 'hello', 'owner', 'admin', 'support'])
+
+# Implemented workflows of services/workflow_registry.py
+WORKFLOWS = np.array(['google_maps_scraper', 'linkedin_extractor', 'ecommerce_intelligence',
+                      'social_media_harvester', 'real_estate_analyzer', 'job_market_intelligence'])
+TASK_STATUSES = np.array(['completed', 'failed', 'running', 'scheduled'])
+
+# Fraction of leads without the field, as seen in the mock provider
+MISSING_RATE = {'phone': 0.1, 'website': 0.25, 'rating': 0.08, 'reviewCount': 0.05}
+# Probability that a lead with a website has a listed email
+EMAIL_RATE = 0.55
+# Leads lie within this distance of their city center, denser towards it
+CITY_SPREAD_KM = 15
+
+
+def uuids(rng: np.random.Generator, count: int) -> List[str]:
+    """Version-4 UUID strings drawn from rng, so ids are reproducible"""
+    raw = rng.integers(0, 256, size=(count, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    hexed = raw.tobytes().hex()
+    return [f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+            for h in (hexed[i:i + 32] for i in range(0, len(hexed), 32))]
+
+
+def recency_weighted_times(rng: np.random.Generator, count: int, end: datetime, days: int) -> np.ndarray:
+    """Timestamps over the last `days`, denser towards `end` and during business hours"""
+    age_days = np.minimum(rng.exponential(days / 3, count), days)
+    hour = np.clip(rng.normal(13, 3.5, count), 0, 23.99)
+    day_start = np.floor(age_days)
+    seconds_back = day_start * 86400 + (24 - hour) * 3600
+    end_ms = np.datetime64(end, 'ms')
+    return end_ms - (seconds_back * 1000).astype('timedelta64[ms]')
+
+
+def _to_datetimes(values: np.ndarray) -> List[datetime]:
+    return values.astype('datetime64[ms]').astype(datetime).tolist()
+
+
+def _with_missing(rng: np.random.Generator, values: list, rate: float) -> list:
+    missing = rng.random(len(values)) < rate
+    return [None if m else v for v, m in zip(values, missing.tolist())]
+
+
+def generate_chunk(seed: int, chunk_index: int, searches: int, leads_mean: float, enrichment_rate: float,
+                   end: datetime, days: int) -> Dict[str, List[dict]]:
+    """Searches, their leads and enrichment logs for one chunk"""
+    rng = np.random.default_rng([seed, chunk_index])
+
+    category_weights = np.array([c[2] for c in CATEGORIES])
+    categories = rng.choice(len(CATEGORIES), size=searches, p=category_weights / category_weights.sum())
+    # City popularity follows a Zipf-like curve
+    city_weights = 1 / np.arange(1, len(CITIES) + 1)
+    cities = rng.choice(len(CITIES), size=searches, p=city_weights / city_weights.sum())
+    max_results = rng.choice([10, 20, 50, 100], size=searches, p=[0.2, 0.5, 0.2, 0.1])
+    counts = np.minimum(rng.poisson(leads_mean, searches), max_results)
+    created = recency_weighted_times(rng, searches, end, days)
+
+    search_ids = uuids(rng, searches)
+    search_docs = [{
+        'id': search_ids[i],
+        'query': CATEGORIES[c][0],
+        'city': CITIES[t][0],
+        'state': CITIES[t][1],
+        'zipCode': None,
+        'maxResults': int(m),
+        'status': 'completed',
+        'results_count': int(n),
+        'created_at': ts
+    } for i, (c, t, m, n, ts) in enumerate(zip(categories.tolist(), cities.tolist(), max_results.tolist(),
+                                              counts.tolist(), _to_datetimes(created)))]
+
+    # One row per lead; each inherits its search's category, city and time
+    total = int(counts.sum())
+    owner = np.repeat(np.arange(searches), counts)
+    lead_ids = uuids(rng, total)
+    prefix = rng.integers(0, len(NAME_PREFIXES), total)
+    suffix = rng.integers(0, len(NAME_SUFFIXES), total)
+    type_pick = rng.random(total)
+    street = rng.integers(0, len(STREETS), total)
+    number = rng.integers(1, 9999, total)
+    # Ratings skew high, review counts are long-tailed
+    rating = np.round(1 + 4 * rng.beta(8, 2, total), 1)
+    reviews = np.floor(rng.lognormal(4.0, 1.2, total)).astype(np.int64)
+    has_website = rng.random(total) >= MISSING_RATE['website']
+    has_email = has_website & (rng.random(total) < EMAIL_RATE)
+    email_prefix = rng.integers(0, len(EMAIL_PREFIXES), total)
+    phone_tail = rng.integers(1000000, 9999999, total)
+    # Distance from the center is half-normal, so downtown cells are the busiest
+    centers = np.array([city_center(c[0], c[1]) for c in CITIES])[cities[owner]]
+    distance = np.minimum(np.abs(rng.normal(0, CITY_SPREAD_KM / 2.5, total)), CITY_SPREAD_KM) * 1000
+    bearing = rng.uniform(0, 2 * np.pi, total)
+    lat = np.round(centers[:, 1] + np.degrees(distance * np.cos(bearing) / EARTH_RADIUS_M), 6)
+    lng = np.round(centers[:, 0] + np.degrees(distance * np.sin(bearing)
+                                              / (EARTH_RADIUS_M * np.cos(np.radians(centers[:, 1])))), 6)
+    lead_created = np.minimum(created[owner] + rng.integers(1000, 240000, total).astype('timedelta64[ms]'),
+                              np.datetime64(end, 'ms'))
+
+    names = np.char.add(NAME_PREFIXES[prefix], NAME_SUFFIXES[suffix]).tolist()
+    city_of, category_of = cities.tolist(), categories.tolist()
+    lead_docs = []
+    for i, (s, name, pick, st, num, tail, web, mail, ep, x, y, ts) in enumerate(zip(
+            owner.tolist(), names, type_pick.tolist(), street.tolist(), number.tolist(), phone_tail.tolist(),
+            has_website.tolist(), has_email.tolist(), email_prefix.tolist(), lng.tolist(), lat.tolist(),
+            _to_datetimes(lead_created))):
+        city, state, zip_code, area = CITIES[city_of[s]]
+        types = CATEGORIES[category_of[s]][1]
+        domain = f"{''.join(ch for ch in name.lower() if ch.isalnum())}-{lead_ids[i][:6]}.com"
+        lead_docs.append({
+            'id': lead_ids[i],
+            'businessName': name,
+            'businessType': types[int(pick * len(types))],
+            'address': f"{num} {STREETS[st]}, {city}, {state} {zip_code}",
+            'phone': f"({area}) {str(tail)[:3]}-{str(tail)[3:]}",
+            'website': f"https://{domain}" if web else None,
+            'email': f"{EMAIL_PREFIXES[ep]}@{domain}" if mail else None,
+            'rating': None,
+            'reviewCount': None,
+            'location': {'type': 'Point', 'coordinates': [x, y]},
+            'searchId': search_ids[s],
+            'created_at': ts
+        })
+
+    for field, values in (('phone', [d['phone'] for d in lead_docs]),
+                          ('rating', rating.tolist()),
+                          ('reviewCount', reviews.tolist())):
+        for doc, value in zip(lead_docs, _with_missing(rng, values, MISSING_RATE[field])):
+            doc[field] = value
+
+    # Enrichment logs for a share of the leads that have a website
+    candidates = np.flatnonzero(has_website)
+    enriched = candidates[rng.random(len(candidates)) < enrichment_rate]
+    enrichment_ids = uuids(rng, len(enriched))
+    enrichment_docs = [{
+        'id': enrichment_ids[j],
+        'leadId': lead_docs[i]['id'],
+        'website': lead_docs[i]['website'],
+        'enrichedEmail': f"{EMAIL_PREFIXES[i % len(EMAIL_PREFIXES)]}@{lead_docs[i]['website'].split('://')[1]}",
+        'source': 'hunter_mock',
+        'created_at': lead_docs[i]['created_at'] + timedelta(minutes=5)
+    } for j, i in enumerate(enriched.tolist())]
+
+    return {'searches': search_docs, 'leads': lead_docs, 'email_enrichments': enrichment_docs}
+
+
+def generate_tasks(seed: int, chunk_index: int, count: int, end: datetime, days: int) -> Dict[str, List[dict]]:
+    """Automation task records with completion times and failures"""
+    rng = np.random.default_rng([seed, chunk_index, 1])
+    workflow = rng.choice(len(WORKFLOWS), size=count, p=[0.4, 0.15, 0.15, 0.1, 0.1, 0.1])
+    status = rng.choice(len(TASK_STATUSES), size=count, p=[0.86, 0.1, 0.03, 0.01])
+    started = recency_weighted_times(rng, count, end, days)
+    duration = (rng.lognormal(3.5, 1.0, count) * 1000).astype('timedelta64[ms]')
+    result_count = rng.poisson(40, count)
+    task_ids = uuids(rng, count)
+
+    docs = []
+    for i, (w, st, begin, finish, n) in enumerate(zip(
+            workflow.tolist(), status.tolist(), _to_datetimes(started),
+            _to_datetimes(started + duration), result_count.tolist())):
+        doc = {
+            'id': task_ids[i],
+            'workflow_type': str(WORKFLOWS[w]),
+            'status': str(TASK_STATUSES[st]),
+            'parameters': {},
+            'started_at': begin
+        }
+        if doc['status'] == 'completed':
+            doc.update(completed_at=finish, result_count=int(n))
+        elif doc['status'] == 'failed':
+            doc.update(completed_at=finish, error='Synthetic failure')
+        docs.append(doc)
+    return {'automation_tasks': docs}
+
+
+async def _insert(db, collection_name: str, docs: List[dict], batch_size: int, slots: asyncio.Semaphore):
+    codec = CODECS.get(collection_name)
+    if codec:
+        docs = [codec.encode(doc) for doc in docs]
+
+    async def write(batch):
+        async with slots:
+            await db[collection_name].insert_many(batch, ordered=False)
+
+    await asyncio.gather(*(write(docs[i:i + batch_size]) for i in range(0, len(docs), batch_size)))
+
+
+async def load(args):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[args.db_name]
+    if args.drop:
+        await client.drop_database(args.db_name)
+
+    end = datetime.fromisoformat(args.end) if args.end else datetime(2025, 1, 1)
+    slots = asyncio.Semaphore(args.concurrency)
+    loop = asyncio.get_running_loop()
+    totals: Dict[str, int] = {}
+    started = time.perf_counter()
+
+    jobs = [(generate_chunk, (args.seed, index, min(args.chunk_size, args.searches - offset),
+                              args.leads_mean, args.enrichment_rate, end, args.days))
+            for index, offset in enumerate(range(0, args.searches, args.chunk_size))]
+    jobs += [(generate_tasks, (args.seed, index, min(args.chunk_size, args.tasks - offset), end, args.days))
+             for index, offset in enumerate(range(0, args.tasks, args.chunk_size))]
+
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        # Keep at most `workers` generated chunks in memory ahead of the writers
+        pending = [loop.run_in_executor(pool, func, *params) for func, params in jobs[:args.workers]]
+        next_job = len(pending)
+        while pending:
+            chunk = await pending.pop(0)
+            if next_job < len(jobs):
+                func, params = jobs[next_job]
+                pending.append(loop.run_in_executor(pool, func, *params))
+                next_job += 1
+
+            for collection_name, docs in chunk.items():
+                await _insert(db, collection_name, docs, args.batch_size, slots)
+                totals[collection_name] = totals.get(collection_name, 0) + len(docs)
+
+            elapsed = time.perf_counter() - started
+            rows = sum(totals.values())
+            print(f"\r{rows:>12,} documents  {rows / elapsed:>10,.0f} docs/s", end='', flush=True)
+
+    print()
+    if not args.no_indexes:
+        await db.leads.create_index(LEAD_CODEC.field('searchId'))
+        await db.leads.create_index([(LEAD_CODEC.field('location'), '2dsphere')])
+        await db.email_enrichments.create_index('leadId')
+        await db.automation_tasks.create_index([('workflow_type', 1), ('started_at', -1)])
+    for collection_name, count in sorted(totals.items()):
+        print(f"{collection_name:<20} {count:>12,}")
+    client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--searches", type=int, default=10000)
+    parser.add_argument("--leads-mean", type=float, default=20, help="mean leads per search (Poisson)")
+    parser.add_argument("--enrichment-rate", type=float, default=0.2, help="share of leads with a website that were enriched")
+    parser.add_argument("--tasks", type=int, default=50000)
+    parser.add_argument("--days", type=int, default=90, help="time span the timestamps cover")
+    parser.add_argument("--end", help="newest timestamp (ISO), default 2025-01-01 for reproducibility")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=5000, help="searches (or tasks) per generated chunk")
+    parser.add_argument("--batch-size", type=int, default=5000, help="documents per insert_many")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="generator processes")
+    parser.add_argument("--concurrency", type=int, default=8, help="insert_many batches in flight")
+    parser.add_argument("--db-name", default=os.environ.get('SCALE_DB_NAME', f"{os.environ.get('DB_NAME', 'leads')}_scale"))
+    parser.add_argument("--drop", action="store_true", help="drop the target database first")
+    parser.add_argument("--no-indexes", action="store_true", help="skip creating the app's lookup indexes")
+    args = parser.parse_args()
+
+    asyncio.run(load(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,194 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
 import os
+import threading
+import time
 from dotenv import load_dotenv
 from pathlib import Path
 
+from services.metrics import mongo_command_metrics, registry
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+
+def _int_env(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Tracks checkout waits and in-use connections of one client's pools"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.in_use = 0
+        self.open_connections = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'in_use': self.in_use,
+                'open_connections': self.open_connections,
+                'checkouts': self.checkouts,
+                'checkout_failures': self.checkout_failures,
+                'wait_seconds_total': round(self.wait_seconds_total, 6),
+                'wait_seconds_avg': round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+                'wait_seconds_max': round(self.wait_seconds_max, 6)
+            }
+
+    # Checkout start and end are reported on the same (executor) thread
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        waited = time.perf_counter() - getattr(self._local, 'started', time.perf_counter())
+        with self._lock:
+            self.in_use += 1
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+
+class MongoConnectionManager:
+    """Owns the Motor clients: one for the hot path, one for analytics reads"""
+
+    def __init__(self):
+        self.url = os.environ['MONGO_URL']
+        self.db_name = os.environ['DB_NAME']
+        self.client = None
+        self.analytics_client = None
+        self._db = None
+        self._analytics_db = None
+        self.metrics = {'primary': PoolMetrics(), 'analytics': PoolMetrics()}
+
+    def _client_options(self, prefix=''):
+        options = {
+            'minPoolSize': _int_env(f'MONGO_{prefix}MIN_POOL_SIZE', 0),
+            'maxPoolSize': _int_env(f'MONGO_{prefix}MAX_POOL_SIZE', 100 if not prefix else 20),
+            'maxIdleTimeMS': _int_env('MONGO_MAX_IDLE_TIME_MS', None),
+            'waitQueueTimeoutMS': _int_env('MONGO_WAIT_QUEUE_TIMEOUT_MS', None),
+            'connectTimeoutMS': _int_env('MONGO_CONNECT_TIMEOUT_MS', 10000),
+            'socketTimeoutMS': _int_env('MONGO_SOCKET_TIMEOUT_MS', None),
+            'serverSelectionTimeoutMS': _int_env('MONGO_SERVER_SELECTION_TIMEOUT_MS', 10000),
+        }
+        # Wire compression, e.g. "zstd,snappy"; the server picks the first it supports
+        compressors = os.environ.get('MONGO_COMPRESSORS', 'zstd')
+        if compressors:
+            options['compressors'] = compressors
+        return {k: v for k, v in options.items() if v is not None}
+
+    def connect(self):
+        """Create the clients; connections are opened lazily by Motor"""
+        if self.client is None:
+            self.client = AsyncIOMotorClient(
+                self.url, event_listeners=[self.metrics['primary'], mongo_command_metrics], **self._client_options()
+            )
+            self._db = self.client[self.db_name]
+        if self.analytics_client is None:
+            # Analytics reads may go to secondaries so they don't compete with the hot path
+            self.analytics_client = AsyncIOMotorClient(
+                self.url,
+                event_listeners=[self.metrics['analytics'], mongo_command_metrics],
+                readPreference=os.environ.get('MONGO_ANALYTICS_READ_PREFERENCE', 'secondaryPreferred'),
+                **self._client_options('ANALYTICS_')
+            )
+            self._analytics_db = self.analytics_client[self.db_name]
+
+    def close(self):
+        for client in (self.client, self.analytics_client):
+            if client is not None:
+                client.close()
+        self.client = None
+        self.analytics_client = None
+        self._db = None
+        self._analytics_db = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            self.connect()
+        return self._db
+
+    @property
+    def analytics_db(self):
+        """Database handle for dashboards and statistics"""
+        if self._analytics_db is None:
+            self.connect()
+        return self._analytics_db
+
+    def pool_stats(self):
+        stats = {}
+        for name, client in (('primary', self.client), ('analytics', self.analytics_client)):
+            stats[name] = {
+                **self.metrics[name].snapshot(),
+                'max_pool_size': client.options.pool_options.max_pool_size if client else None,
+                'min_pool_size': client.options.pool_options.min_pool_size if client else None
+            }
+        return stats
+
+    def render_pool_metrics(self):
+        """Pool stats as Prometheus gauges, rendered at scrape time"""
+        lines = []
+        for field in ('in_use', 'open_connections', 'checkouts', 'checkout_failures', 'wait_seconds_total', 'wait_seconds_max'):
+            name = f'mongo_pool_{field}'
+            lines += [f'# TYPE {name} gauge']
+            for client, stats in self.pool_stats().items():
+                lines.append(f'{name}{{client="{client}"}} {stats[field]}')
+        return lines
+
+
+class _DatabaseProxy:
+    """Module-level handle that resolves to the manager's current database"""
+
+    def __init__(self, resolve):
+        self._resolve = resolve
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __getitem__(self, name):
+        return self._resolve()[name]
+
+
 # MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
\ No newline at end of file
+mongo = MongoConnectionManager()
+db = _DatabaseProxy(lambda: mongo.db)
+analytics_db = _DatabaseProxy(lambda: mongo.analytics_db)
+registry.register_collector(mongo.render_pool_metrics)
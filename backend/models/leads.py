@@ -1,5 +1,6 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from bson import Binary
+from pydantic import BaseModel, Field, TypeAdapter
+from typing import Any, Dict, Iterable, List, Literal, Optional, Type
 from datetime import datetime
 import uuid
 
@@ -10,6 +11,10 @@ class SearchRequest(BaseModel):
     zipCode: Optional[str] = Field(None, description="Zip code (optional)")
     maxResults: int = Field(20, ge=1, le=100, description="Maximum number of results")
 
+class GeoPoint(BaseModel):
+    type: Literal["Point"] = "Point"
+    coordinates: List[float] = Field(..., min_length=2, max_length=2, description="[longitude, latitude]")
+
 class LeadResult(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     businessName: str
@@ -20,6 +25,7 @@ class LeadResult(BaseModel):
     email: Optional[str] = None
     rating: Optional[float] = None
     reviewCount: Optional[int] = None
+    location: Optional[GeoPoint] = None
     searchId: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -43,4 +49,86 @@ class DashboardStats(BaseModel):
     totalSearches: int
     avgConversion: float
     emailsEnriched: int
-    recentSearches: List[dict]
\ No newline at end of file
+    recentSearches: List[dict]
+    # Approximate (HyperLogLog, ~1% error) distinct counts over all leads
+    uniqueBusinesses: Optional[int] = None
+    uniqueDomains: Optional[int] = None
+    uniqueCities: Optional[int] = None
+
+# Precompiled adapter: dumps a whole batch of leads in one call instead of one .dict() per lead
+LeadListAdapter = TypeAdapter(List[LeadResult])
+
+def dump_leads(leads: List[LeadResult]) -> List[dict]:
+    """Convert validated leads to plain dicts in bulk (datetimes stay datetimes for Mongo)"""
+    return LeadListAdapter.dump_python(leads)
+
+
+class DocumentCodec:
+    """Maps API documents to their compact stored form and back
+
+    Stored documents use short field names, keep UUIDs as 16-byte binary
+    (the id becomes _id, replacing the ObjectId and the separate unique
+    index on id) and omit null fields. decode() restores the model's
+    optional fields as None, so API responses keep their shape. Unknown
+    keys pass through unchanged, and ids that are not UUIDs stay strings.
+    """
+
+    def __init__(self, short_names: Dict[str, str], uuid_fields: Iterable[str] = (),
+                 model: Optional[Type[BaseModel]] = None):
+        self.short_names = short_names
+        self.long_names = {short: name for name, short in short_names.items()}
+        self.uuid_fields = frozenset(uuid_fields)
+        self.defaults = {name: None for name, field in (model.model_fields.items() if model else ())
+                         if not field.is_required() and field.default is None}
+
+    def field(self, name: str) -> str:
+        """Stored name of a field, also for dotted paths ("location.coordinates")"""
+        head, dot, rest = name.partition('.')
+        return self.short_names.get(head, head) + dot + rest
+
+    def value(self, name: str, value: Any) -> Any:
+        """Stored form of a field value, for writes and query filters"""
+        if name in self.uuid_fields and isinstance(value, str):
+            try:
+                return Binary.from_uuid(uuid.UUID(value))
+            except ValueError:
+                return value
+        return value
+
+    def encode(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        return {self.field(name): self.value(name, value) for name, value in doc.items() if value is not None}
+
+    def decode(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        decoded = dict(self.defaults)
+        for key, value in doc.items():
+            name = self.long_names.get(key, key)
+            if isinstance(value, Binary) and value.subtype == 4 and name in self.uuid_fields:
+                value = str(value.as_uuid())
+            decoded[name] = value
+        return decoded
+
+    def update(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """$set for the given fields; None unsets, since stored documents have no nulls"""
+        update: Dict[str, Any] = {}
+        for name, value in fields.items():
+            if value is None:
+                update.setdefault('$unset', {})[self.field(name)] = ''
+            else:
+                update.setdefault('$set', {})[self.field(name)] = self.value(name, value)
+        return update
+
+
+LEAD_CODEC = DocumentCodec({
+    'id': '_id', 'businessName': 'n', 'businessType': 't', 'address': 'a', 'phone': 'p', 'website': 'w',
+    'email': 'e', 'rating': 'r', 'reviewCount': 'rc', 'location': 'loc', 'searchId': 's', 'created_at': 'c',
+    'updated_at': 'u', 'score': 'sc', 'score_version': 'sv', 'region': 'rg',
+    'cluster_id': 'k', 'cluster_size': 'kn', 'cluster_primary': 'kp',
+}, uuid_fields=('id', 'searchId', 'cluster_id'), model=LeadResult)
+
+SEARCH_CODEC = DocumentCodec({
+    'id': '_id', 'query': 'q', 'city': 'cy', 'state': 'st', 'zipCode': 'z', 'maxResults': 'mx', 'status': 'ss',
+    'results_count': 'n', 'results_version': 'v', 'created_at': 'c', 'updated_at': 'u',
+}, uuid_fields=('id',), model=SearchRecord)
+
+# Collections stored as they are
+PLAIN_CODEC = DocumentCodec({})
@@ -0,0 +1,196 @@
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+# "..., New York, NY 10001" -> "NY"; leads carry the state only inside the address
+STATE_PATTERN = r',\s*([A-Z]{2})\s+\d{5}'
+_STATE_RE = re.compile(STATE_PATTERN)
+
+LEAD_SORTS = ('relevance', 'score', 'rating', 'reviewCount', 'created_at')
+# Lead fields the scoring engine reads, plus the search whose cached results a new score changes
+SCORE_INPUTS = ('id', 'searchId', 'rating', 'reviewCount', 'email', 'phone', 'website', 'address')
+# Facet buckets returned per field
+FACET_LIMIT = 25
+
+
+def lead_state(address: Optional[str]) -> Optional[str]:
+    match = _STATE_RE.search(address or '')
+    return match.group(1) if match else None
+
+
+@dataclass
+class LeadQuery:
+    """Filters of /api/leads/query; None means unfiltered"""
+    text: Optional[str] = None
+    business_type: Optional[str] = None
+    state: Optional[str] = None
+    min_rating: Optional[float] = None
+    max_rating: Optional[float] = None
+    min_reviews: Optional[int] = None
+    max_reviews: Optional[int] = None
+    has_email: Optional[bool] = None
+    has_phone: Optional[bool] = None
+    has_website: Optional[bool] = None
+    sort: str = 'relevance'
+    limit: int = 50
+    offset: int = 0
+
+
+class SearchRepository(ABC):
+    @abstractmethod
+    async def insert(self, search: Dict[str, Any]) -> None: ...
+
+    @abstractmethod
+    async def get(self, search_id: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def get_many(self, search_ids: List[str]) -> Dict[str, dict]:
+        """Searches by id, in one query"""
+
+    @abstractmethod
+    async def set_results_count(self, search_id: str, results_count: int, status: Optional[str] = None) -> None:
+        """Also bumps results_version: the leads of the search changed"""
+
+    @abstractmethod
+    async def bump_results_versions(self, search_ids: List[str]) -> None:
+        """Mark cached results of these searches stale after their leads changed"""
+
+    @abstractmethod
+    async def count(self) -> int: ...
+
+    @abstractmethod
+    async def recent(self, limit: int) -> List[dict]:
+        """Newest searches first"""
+
+
+class LeadRepository(ABC):
+    @abstractmethod
+    async def insert_many(self, leads: List[Dict[str, Any]]) -> None: ...
+
+    @abstractmethod
+    async def insert_new(self, leads: List[Dict[str, Any]]) -> List[int]:
+        """Insert unordered, skipping leads whose id already exists; returns the skipped positions"""
+
+    @abstractmethod
+    async def get(self, lead_id: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def get_many(self, lead_ids: List[str]) -> Dict[str, dict]:
+        """Leads by id, in one query"""
+
+    @abstractmethod
+    async def update(self, lead_id: str, fields: Dict[str, Any]) -> None:
+        """Set fields on one lead"""
+
+    @abstractmethod
+    async def list_by_search(self, search_id: str, limit: int) -> List[dict]: ...
+
+    @abstractmethod
+    async def count(self) -> int: ...
+
+    @abstractmethod
+    async def count_with_email(self) -> int: ...
+
+    @abstractmethod
+    async def query(self, query: LeadQuery) -> Dict[str, Any]:
+        """One page of matching leads, the total and facet counts
+
+        Returns {'leads': [...], 'total': n, 'facets': {'businessType': [...],
+        'state': [...], 'hasEmail': [...]}} with facet buckets as
+        {'value': ..., 'count': n}, largest first.
+        """
+
+    @abstractmethod
+    async def stale_scores(self, version: str, limit: int) -> List[dict]:
+        """Up to limit leads without a score of this weights version, with only the SCORE_INPUTS fields"""
+
+    @abstractmethod
+    async def set_scores(self, scores: Dict[str, Dict[str, Any]]) -> None:
+        """Set score fields on many leads at once, {lead id: fields}"""
+
+    @abstractmethod
+    def scan(self, fields: Tuple[str, ...], batch_size: int) -> AsyncIterator[List[dict]]:
+        """Every lead with only these fields, in batches of up to batch_size"""
+
+    @abstractmethod
+    async def set_clusters(self, clusters: Dict[str, Dict[str, Any]]) -> None:
+        """Set duplicate cluster fields on many leads at once, {lead id: fields}; None clears a field"""
+
+    @abstractmethod
+    async def top(self, k: int, search_id: Optional[str] = None, region: Optional[str] = None) -> List[dict]:
+        """The k highest scored leads, optionally of one search or region"""
+
+    @abstractmethod
+    async def near(self, lng: float, lat: float, limit: int, max_distance_m: Optional[float] = None) -> List[dict]:
+        """Leads nearest to the point first, each with 'distance' in meters"""
+
+    @abstractmethod
+    async def within_box(self, box: Tuple[float, float, float, float], limit: int) -> List[dict]:
+        """Leads inside (min_lng, min_lat, max_lng, max_lat)"""
+
+    @abstractmethod
+    async def tile_cells(self, z: int, x: int, y: int, cell_zoom: int) -> List[dict]:
+        """Lead counts of tile z/x/y per sub-tile, cell_zoom levels deeper
+
+        Cells come as {'x', 'y', 'count', 'avgRating', 'lng', 'lat'}, with x/y
+        at zoom z + cell_zoom and lng/lat the centroid of their leads.
+        """
+
+
+class EnrichmentRepository(ABC):
+    @abstractmethod
+    async def insert(self, enrichment: Dict[str, Any]) -> None:
+        """Log an enrichment; callers do not wait for durability"""
+
+    @abstractmethod
+    async def count(self) -> int: ...
+
+
+class TaskRepository(ABC):
+    @abstractmethod
+    async def insert(self, task: Dict[str, Any]) -> None: ...
+
+    @abstractmethod
+    async def recent(self, limit: int, workflow_type: Optional[str] = None) -> List[dict]:
+        """Newest tasks first, optionally of one workflow"""
+
+    @abstractmethod
+    async def started_since(self, since: datetime, limit: int) -> List[dict]: ...
+
+
+class HealthCheckRepository(ABC):
+    @abstractmethod
+    async def insert(self, health_check: Dict[str, Any]) -> None: ...
+
+    @abstractmethod
+    async def latest(self) -> Optional[dict]: ...
+
+
+class SketchRepository(ABC):
+    @abstractmethod
+    async def merge(self, key: str, sketches: Dict[str, bytes]) -> None:
+        """Merge HyperLogLog registers into the sketches stored under key, atomically"""
+
+    @abstractmethod
+    async def get_many(self, keys: List[str]) -> Dict[str, Dict[str, bytes]]:
+        """Registers per key and sketch name; missing keys are left out"""
+
+
+class Storage:
+    """The repositories of one backend; documents are returned without _id"""
+
+    name = ''
+    searches: SearchRepository
+    leads: LeadRepository
+    enrichments: EnrichmentRepository
+    tasks: TaskRepository
+    health_checks: HealthCheckRepository
+    sketches: SketchRepository
+
+    async def setup(self) -> None:
+        """Create tables and indexes"""
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,375 @@
+import math
+import re
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from bson import Binary
+from pymongo import GEOSPHERE, TEXT, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from database import analytics_db, db
+from models.leads import LEAD_CODEC, SEARCH_CODEC
+from repositories.base import (FACET_LIMIT, SCORE_INPUTS, STATE_PATTERN, EnrichmentRepository, HealthCheckRepository, LeadQuery,
+                               LeadRepository, SearchRepository, SketchRepository, Storage, TaskRepository)
+from repositories.mongo_migration import DUPLICATE_KEY_ERROR
+from services.batch_writer import batch_writer
+from services.cardinality import merge_registers
+from services.geo import MAX_MERCATOR_LAT, point, tile_bounds
+
+NO_ID = {'_id': 0}
+
+# Leads and searches are stored compactly (models.leads.DocumentCodec); queries use the stored names
+lead_field = LEAD_CODEC.field
+search_field = SEARCH_CODEC.field
+
+# Concurrent merges into one sketch retry this often before giving up
+SKETCH_MERGE_ATTEMPTS = 20
+
+# State parsed from the address inside the pipeline
+STATE_EXPR = {'$let': {
+    'vars': {'match': {'$regexFind': {
+        'input': {'$ifNull': ['$' + lead_field('address'), '']}, 'regex': STATE_PATTERN}}},
+    'in': {'$arrayElemAt': ['$$match.captures', 0]}
+}}
+SORT_FIELDS = {name: lead_field(name) for name in ('score', 'rating', 'reviewCount', 'created_at')}
+
+
+def _present(field: str, present: bool) -> Dict[str, Any]:
+    return {lead_field(field): {'$nin': [None, '']} if present else {'$in': [None, '']}}
+
+
+def lead_query_filter(query: LeadQuery) -> Dict[str, Any]:
+    match: Dict[str, Any] = {}
+    if query.text:
+        match['$text'] = {'$search': query.text}
+    if query.business_type:
+        match[lead_field('businessType')] = query.business_type
+    if query.state:
+        match[lead_field('address')] = {'$regex': STATE_PATTERN.replace('([A-Z]{2})', re.escape(query.state.upper()))}
+    for field, low, high in (('rating', query.min_rating, query.max_rating),
+                             ('reviewCount', query.min_reviews, query.max_reviews)):
+        bounds = {op: value for op, value in (('$gte', low), ('$lte', high)) if value is not None}
+        if bounds:
+            match[lead_field(field)] = bounds
+
+    presence = [_present(field, value) for field, value in (('email', query.has_email), ('phone', query.has_phone),
+                                                             ('website', query.has_website)) if value is not None]
+    if presence:
+        match['$and'] = presence
+    return match
+
+
+LOCATION = lead_field('location')
+LNG = {'$arrayElemAt': [f'${LOCATION}.coordinates', 0]}
+LAT = {'$arrayElemAt': [f'${LOCATION}.coordinates', 1]}
+
+
+def box_filter(box: Tuple[float, float, float, float]) -> Dict[str, Any]:
+    """Leads inside a lng/lat rectangle
+
+    The exact bounds are checked on the coordinates. For the 2dsphere index,
+    an enlarged polygon is matched too. Its edges are geodesics and bulge away
+    from the parallels; the margin keeps rectangles of up to tens of degrees
+    inside it. Boxes too wide for a polygon only get the exact check.
+    """
+    min_lng, min_lat, max_lng, max_lat = box
+    match: Dict[str, Any] = {
+        f'{LOCATION}.coordinates.0': {'$gte': min_lng, '$lte': max_lng},
+        f'{LOCATION}.coordinates.1': {'$gte': min_lat, '$lte': max_lat},
+    }
+    margin_lng, margin_lat = (max_lng - min_lng) / 2, (max_lat - min_lat) / 2
+    west, east = min_lng - margin_lng, max_lng + margin_lng
+    south, north = max(-89.9, min_lat - margin_lat), min(89.9, max_lat + margin_lat)
+    if west >= -180 and east <= 180 and east - west < 180:
+        ring = [[west, south], [east, south], [east, north], [west, north], [west, south]]
+        match[LOCATION] = {'$geoWithin': {'$geometry': {'type': 'Polygon', 'coordinates': [ring]}}}
+    return match
+
+
+def _cell_index(value, origin: int, cells: int) -> Dict[str, Any]:
+    """Cell number of an expression, clamped to the tile so boundary points stay in it"""
+    return {'$max': [origin, {'$min': [origin + cells - 1, {'$floor': value}]}]}
+
+
+def _buckets(groups: List[dict]) -> List[dict]:
+    return [{'value': group['_id'], 'count': group['count']} for group in groups]
+
+
+def _search_key(search_id: str) -> Dict[str, Any]:
+    return {'_id': SEARCH_CODEC.value('id', search_id)}
+
+
+def _lead_key(lead_id: str) -> Dict[str, Any]:
+    return {'_id': LEAD_CODEC.value('id', lead_id)}
+
+
+def _leads(docs: List[dict]) -> List[dict]:
+    return [LEAD_CODEC.decode(doc) for doc in docs]
+
+
+class MongoSearchRepository(SearchRepository):
+    async def insert(self, search: Dict[str, Any]) -> None:
+        await batch_writer.insert('searches', SEARCH_CODEC.encode(search), wait=True)
+
+    async def get(self, search_id: str) -> Optional[dict]:
+        doc = await db.searches.find_one(_search_key(search_id))
+        return SEARCH_CODEC.decode(doc) if doc else None
+
+    async def get_many(self, search_ids: List[str]) -> Dict[str, dict]:
+        keys = [SEARCH_CODEC.value('id', search_id) for search_id in search_ids]
+        docs = await db.searches.find({'_id': {'$in': keys}}).to_list(None)
+        return {decoded['id']: decoded for decoded in map(SEARCH_CODEC.decode, docs)}
+
+    async def set_results_count(self, search_id: str, results_count: int, status: Optional[str] = None) -> None:
+        fields = {'results_count': results_count, 'updated_at': datetime.utcnow()}
+        if status:
+            fields['status'] = status
+        update = SEARCH_CODEC.update(fields)
+        update['$inc'] = {search_field('results_version'): 1}
+        await batch_writer.update('searches', _search_key(search_id), update, wait=True)
+
+    async def bump_results_versions(self, search_ids: List[str]) -> None:
+        if search_ids:
+            keys = [SEARCH_CODEC.value('id', search_id) for search_id in set(search_ids)]
+            await db.searches.update_many({'_id': {'$in': keys}}, {'$inc': {search_field('results_version'): 1}})
+
+    async def count(self) -> int:
+        return await analytics_db.searches.count_documents({})
+
+    async def recent(self, limit: int) -> List[dict]:
+        docs = await analytics_db.searches.find().sort(search_field('created_at'), -1).limit(limit).to_list(limit)
+        return [SEARCH_CODEC.decode(doc) for doc in docs]
+
+
+class MongoLeadRepository(LeadRepository):
+    async def insert_many(self, leads: List[Dict[str, Any]]) -> None:
+        if leads:
+            await db.leads.insert_many([LEAD_CODEC.encode(lead) for lead in leads])
+
+    async def insert_new(self, leads: List[Dict[str, Any]]) -> List[int]:
+        if not leads:
+            return []
+        try:
+            await db.leads.insert_many([LEAD_CODEC.encode(lead) for lead in leads], ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            if any(error.get('code') != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+            return [error['index'] for error in errors]
+        return []
+
+    async def get(self, lead_id: str) -> Optional[dict]:
+        doc = await db.leads.find_one(_lead_key(lead_id))
+        return LEAD_CODEC.decode(doc) if doc else None
+
+    async def get_many(self, lead_ids: List[str]) -> Dict[str, dict]:
+        keys = [LEAD_CODEC.value('id', lead_id) for lead_id in lead_ids]
+        docs = await db.leads.find({'_id': {'$in': keys}}).to_list(None)
+        return {lead['id']: lead for lead in _leads(docs)}
+
+    async def update(self, lead_id: str, fields: Dict[str, Any]) -> None:
+        await db.leads.update_one(_lead_key(lead_id), LEAD_CODEC.update(fields))
+
+    async def list_by_search(self, search_id: str, limit: int) -> List[dict]:
+        query = {lead_field('searchId'): LEAD_CODEC.value('searchId', search_id)}
+        return _leads(await db.leads.find(query).to_list(limit))
+
+    async def count(self) -> int:
+        return await analytics_db.leads.count_documents({})
+
+    async def count_with_email(self) -> int:
+        return await analytics_db.leads.count_documents(_present('email', True))
+
+    async def query(self, query: LeadQuery) -> Dict[str, Any]:
+        if query.sort == 'relevance' and query.text:
+            sort = {'$sort': {'score': {'$meta': 'textScore'}, '_id': 1}}
+        else:
+            sort = {'$sort': {SORT_FIELDS.get(query.sort, lead_field('created_at')): -1, '_id': 1}}
+
+        def facet(key):
+            return [{'$group': {'_id': key, 'count': {'$sum': 1}}}, {'$sort': {'count': -1}}, {'$limit': FACET_LIMIT}]
+
+        pipeline = [
+            {'$match': lead_query_filter(query)},
+            # One pass over the matches: the page, the total and every facet
+            {'$facet': {
+                'leads': [sort, {'$skip': query.offset}, {'$limit': query.limit}],
+                'total': [{'$count': 'n'}],
+                'businessType': facet('$' + lead_field('businessType')),
+                'state': facet(STATE_EXPR),
+                'hasEmail': facet({'$ne': [{'$ifNull': ['$' + lead_field('email'), '']}, '']})
+            }}
+        ]
+        result = (await analytics_db.leads.aggregate(pipeline).to_list(1))[0]
+        return {
+            'leads': _leads(result['leads']),
+            'total': result['total'][0]['n'] if result['total'] else 0,
+            'facets': {name: _buckets(result[name]) for name in ('businessType', 'state', 'hasEmail')}
+        }
+
+
+    async def stale_scores(self, version: str, limit: int) -> List[dict]:
+        # Primary reads: the previous batch's updates must already be visible
+        projection = {lead_field(field): 1 for field in SCORE_INPUTS}
+        query = {lead_field('score_version'): {'$ne': version}}
+        return _leads(await db.leads.find(query, projection).limit(limit).to_list(limit))
+
+    async def set_scores(self, scores: Dict[str, Dict[str, Any]]) -> None:
+        if scores:
+            await db.leads.bulk_write([UpdateOne(_lead_key(lead_id), LEAD_CODEC.update(fields))
+                                       for lead_id, fields in scores.items()], ordered=False)
+
+    async def scan(self, fields: Tuple[str, ...], batch_size: int) -> AsyncIterator[List[dict]]:
+        projection = {lead_field(field): 1 for field in fields}
+        batch: List[dict] = []
+        async for stored in db.leads.find(projection=projection).batch_size(batch_size):
+            batch.append(LEAD_CODEC.decode(stored))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def set_clusters(self, clusters: Dict[str, Dict[str, Any]]) -> None:
+        # Stored documents have no nulls: cleared fields are unset
+        if clusters:
+            await db.leads.bulk_write([UpdateOne(_lead_key(lead_id), LEAD_CODEC.update(fields))
+                                       for lead_id, fields in clusters.items()], ordered=False)
+
+    async def top(self, k: int, search_id: Optional[str] = None, region: Optional[str] = None) -> List[dict]:
+        # Served by the (searchId|region, score) indexes without an in-memory sort
+        query: Dict[str, Any] = {lead_field('score'): {'$gte': 0}}
+        if search_id:
+            query[lead_field('searchId')] = LEAD_CODEC.value('searchId', search_id)
+        if region:
+            query[lead_field('region')] = region.upper()
+        return _leads(await analytics_db.leads.find(query).sort(lead_field('score'), -1).limit(k).to_list(k))
+
+    async def near(self, lng: float, lat: float, limit: int, max_distance_m: Optional[float] = None) -> List[dict]:
+        geo_near = {'near': point(lng, lat), 'distanceField': 'distance', 'spherical': True, 'key': LOCATION}
+        if max_distance_m is not None:
+            geo_near['maxDistance'] = max_distance_m
+        pipeline = [{'$geoNear': geo_near}, {'$limit': limit}]
+        return _leads(await analytics_db.leads.aggregate(pipeline).to_list(limit))
+
+    async def within_box(self, box: Tuple[float, float, float, float], limit: int) -> List[dict]:
+        return _leads(await analytics_db.leads.find(box_filter(box)).limit(limit).to_list(limit))
+
+    async def tile_cells(self, z: int, x: int, y: int, cell_zoom: int) -> List[dict]:
+        cells = 2 ** cell_zoom
+        n = 2 ** (z + cell_zoom)
+        lat_radians = {'$degreesToRadians': {'$max': [-MAX_MERCATOR_LAT, {'$min': [MAX_MERCATOR_LAT, LAT]}]}}
+        # Web Mercator: x = (lng + 180) / 360 * n, y = (1 - ln(tan φ + sec φ) / π) / 2 * n
+        cell_x = {'$multiply': [{'$divide': [{'$add': [LNG, 180]}, 360]}, n]}
+        cell_y = {'$let': {'vars': {'phi': lat_radians}, 'in': {'$multiply': [
+            {'$divide': [{'$subtract': [1, {'$divide': [
+                {'$ln': {'$add': [{'$tan': '$$phi'}, {'$divide': [1, {'$cos': '$$phi'}]}]}}, math.pi]}]}, 2]}, n]}}}
+        pipeline = [
+            {'$match': box_filter(tile_bounds(z, x, y))},
+            {'$group': {
+                '_id': {'x': _cell_index(cell_x, x * cells, cells), 'y': _cell_index(cell_y, y * cells, cells)},
+                'count': {'$sum': 1},
+                'avgRating': {'$avg': '$' + lead_field('rating')},
+                'lng': {'$avg': LNG},
+                'lat': {'$avg': LAT}
+            }}
+        ]
+        groups = await analytics_db.leads.aggregate(pipeline).to_list(None)
+        return [{'x': int(g['_id']['x']), 'y': int(g['_id']['y']), 'count': g['count'],
+                 'avgRating': g['avgRating'], 'lng': g['lng'], 'lat': g['lat']} for g in groups]
+
+
+class MongoEnrichmentRepository(EnrichmentRepository):
+    async def insert(self, enrichment: Dict[str, Any]) -> None:
+        await batch_writer.insert('email_enrichments', enrichment)
+
+    async def count(self) -> int:
+        return await analytics_db.email_enrichments.count_documents({})
+
+
+class MongoTaskRepository(TaskRepository):
+    async def insert(self, task: Dict[str, Any]) -> None:
+        await batch_writer.insert('automation_tasks', task, wait=True)
+
+    async def recent(self, limit: int, workflow_type: Optional[str] = None) -> List[dict]:
+        query = {'workflow_type': workflow_type} if workflow_type else {}
+        return await analytics_db.automation_tasks.find(query, NO_ID).sort('started_at', -1).limit(limit).to_list(limit)
+
+    async def started_since(self, since: datetime, limit: int) -> List[dict]:
+        return await analytics_db.automation_tasks.find({'started_at': {'$gte': since}}, NO_ID).to_list(limit)
+
+
+class MongoHealthCheckRepository(HealthCheckRepository):
+    async def insert(self, health_check: Dict[str, Any]) -> None:
+        await batch_writer.insert('health_checks', health_check, wait=True)
+
+    async def latest(self) -> Optional[dict]:
+        records = await analytics_db.health_checks.find({}, NO_ID).sort('timestamp', -1).limit(1).to_list(1)
+        return records[0] if records else None
+
+
+class MongoSketchRepository(SketchRepository):
+    async def merge(self, key: str, sketches: Dict[str, bytes]) -> None:
+        # Register-wise max has no update operator: read, merge and write back if nobody wrote in between
+        for _ in range(SKETCH_MERGE_ATTEMPTS):
+            current = await db.lead_sketches.find_one({'key': key})
+            if current is None:
+                try:
+                    await db.lead_sketches.insert_one({
+                        'key': key, 'version': 1, 'updated_at': datetime.utcnow(),
+                        **{name: Binary(registers) for name, registers in sketches.items()}
+                    })
+                    return
+                except DuplicateKeyError:
+                    continue
+            merged = {name: Binary(merge_registers(current.get(name), registers)) for name, registers in sketches.items()}
+            result = await db.lead_sketches.update_one(
+                {'key': key, 'version': current['version']},
+                {'$set': {**merged, 'updated_at': datetime.utcnow()}, '$inc': {'version': 1}})
+            if result.modified_count:
+                return
+        raise RuntimeError(f"Sketch {key} is updated too often concurrently, merge abandoned")
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Dict[str, bytes]]:
+        docs = await analytics_db.lead_sketches.find({'key': {'$in': keys}}, {'_id': 0, 'version': 0, 'updated_at': 0}
+                                                      ).to_list(None)
+        return {doc.pop('key'): {name: bytes(value) for name, value in doc.items()} for doc in docs}
+
+
+class MongoStorage(Storage):
+    name = 'mongo'
+
+    def __init__(self):
+        self.searches = MongoSearchRepository()
+        self.leads = MongoLeadRepository()
+        self.enrichments = MongoEnrichmentRepository()
+        self.tasks = MongoTaskRepository()
+        self.health_checks = MongoHealthCheckRepository()
+        self.sketches = MongoSketchRepository()
+
+    async def setup(self) -> None:
+        # Documents from before the compact codec are moved by repositories.mongo_migration, before deploying
+        await self._create_indexes()
+
+    async def _create_indexes(self) -> None:
+        await db.searches.create_index([(search_field('created_at'), -1)])
+        await db.leads.create_index(lead_field('searchId'))
+        # Lead search: text relevance plus the filter and sort fields
+        name, business_type, address = lead_field('businessName'), lead_field('businessType'), lead_field('address')
+        await db.leads.create_index([(name, TEXT), (business_type, TEXT), (address, TEXT)],
+                                    weights={name: 10, business_type: 5, address: 1}, name='leads_text')
+        await db.leads.create_index([(business_type, 1), (lead_field('rating'), -1)])
+        await db.leads.create_index([(lead_field('rating'), -1), (lead_field('reviewCount'), -1)])
+        await db.leads.create_index([(lead_field('reviewCount'), -1)])
+        await db.leads.create_index([(lead_field('created_at'), -1)])
+        await db.leads.create_index([(LOCATION, GEOSPHERE)])
+        # Lead scores: top-K overall, per search and per region, and stale scores
+        await db.leads.create_index([(lead_field('score'), -1)])
+        await db.leads.create_index([(lead_field('searchId'), 1), (lead_field('score'), -1)])
+        await db.leads.create_index([(lead_field('region'), 1), (lead_field('score'), -1)])
+        await db.leads.create_index(lead_field('score_version'))
+        await db.email_enrichments.create_index('leadId')
+        await db.automation_tasks.create_index([('started_at', -1)])
+        await db.automation_tasks.create_index([('workflow_type', 1), ('started_at', -1)])
+        await db.health_checks.create_index([('timestamp', -1)])
+        await db.lead_sketches.create_index('key', unique=True)
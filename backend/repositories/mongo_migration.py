@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Moves leads and searches written before the compact codec to the compact form.
+
+Legacy documents carry an ObjectId _id, the UUID as an "id" string, long
+field names and explicit nulls; the compact form is described in
+models.leads.DocumentCodec. The API only reads the compact form, so run this
+once before deploying it, with the API stopped or still on the old version.
+It is not run on startup: every API worker would migrate concurrently.
+--estimate only samples legacy documents and estimates the savings.
+
+Usage: python -m repositories.mongo_migration [--estimate] [--sample 1000] [--batch-size 1000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+import bson
+import orjson
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from models.leads import LEAD_CODEC, SEARCH_CODEC, DocumentCodec
+
+MIGRATION_BATCH_SIZE = int(os.environ.get('MIGRATION_BATCH_SIZE', 1000))
+
+COMPACT_CODECS: Dict[str, DocumentCodec] = {'leads': LEAD_CODEC, 'searches': SEARCH_CODEC}
+
+# Only legacy documents have the field: compact ones keep the id in _id
+LEGACY_FILTER = {'id': {'$exists': True}}
+DUPLICATE_KEY_ERROR = 11000
+INDEX_NOT_FOUND = 27
+
+
+async def collection_stats(database, name: str) -> Dict[str, Any]:
+    stats = await database.command('collStats', name)
+    return {
+        'documents': stats.get('count', 0),
+        'data_bytes': stats.get('size', 0),
+        'avg_document_bytes': stats.get('avgObjSize', 0),
+        'storage_bytes': stats.get('storageSize', 0),
+        'index_bytes': stats.get('totalIndexSize', 0),
+        'indexes': stats.get('indexSizes', {}),
+    }
+
+
+async def needs_migration(database, name: str) -> bool:
+    return await database[name].find_one(LEGACY_FILTER, {'_id': 1}) is not None
+
+
+async def _drop_index(collection, index_name: str):
+    try:
+        await collection.drop_index(index_name)
+    except OperationFailure as e:
+        # Another process migrating concurrently dropped it first
+        if e.code != INDEX_NOT_FOUND:
+            raise
+
+
+async def migrate_collection(database, name: str, codec: DocumentCodec,
+                             batch_size: int = MIGRATION_BATCH_SIZE) -> int:
+    """Rewrite legacy documents in batches; safe to rerun and to run from several processes
+
+    Each batch is inserted in compact form before the originals are deleted,
+    so a crash leaves at most duplicates that the next run resolves.
+    """
+    collection = database[name]
+    # Indexes on the long names only slow the copy down, an old text index would
+    # block creating the new one, and a unique "id" index rejects documents without it
+    for index_name in await collection.index_information():
+        if index_name != '_id_':
+            await _drop_index(collection, index_name)
+
+    moved = 0
+    while True:
+        docs = await collection.find(LEGACY_FILTER).limit(batch_size).to_list(batch_size)
+        if not docs:
+            break
+        legacy_ids = [doc.pop('_id') for doc in docs]
+        try:
+            await collection.insert_many([codec.encode(doc) for doc in docs], ordered=False)
+        except BulkWriteError as e:
+            # Already migrated by a previous or concurrent run
+            if any(error.get('code') != DUPLICATE_KEY_ERROR for error in e.details.get('writeErrors', [])):
+                raise
+        await collection.delete_many({'_id': {'$in': legacy_ids}})
+        moved += len(docs)
+    return moved
+
+
+def _saved(before: int, after: int) -> Dict[str, Any]:
+    return {'before': before, 'after': after, 'saved_percent': round(100 * (1 - after / before), 1) if before else 0.0}
+
+
+def savings(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+    """Data size stands in for the working set; storage size only shrinks after a compact"""
+    return {
+        'documents': after['documents'],
+        'avg_document_bytes': _saved(before['avg_document_bytes'], after['avg_document_bytes']),
+        'data_bytes': _saved(before['data_bytes'], after['data_bytes']),
+        'index_bytes': _saved(before['index_bytes'], after['index_bytes']),
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    parts = [f"{report['migrated']} documents moved"]
+    for key in ('avg_document_bytes', 'data_bytes', 'index_bytes'):
+        entry = report['savings'][key]
+        parts.append(f"{key} {entry['before']:,} -> {entry['after']:,} (-{entry['saved_percent']}%)")
+    return ', '.join(parts)
+
+
+async def compact_legacy(database, create_indexes: Callable[[], Awaitable[None]],
+                         batch_size: int = MIGRATION_BATCH_SIZE) -> Dict[str, Dict[str, Any]]:
+    """Migrate every legacy collection, build the indexes and report the savings per migrated collection"""
+    legacy = [name for name in COMPACT_CODECS if await needs_migration(database, name)]
+    before = {name: await collection_stats(database, name) for name in legacy}
+    moved = {name: await migrate_collection(database, name, COMPACT_CODECS[name], batch_size) for name in legacy}
+    await create_indexes()
+    report = {}
+    for name in legacy:
+        after = await collection_stats(database, name)
+        report[name] = {'migrated': moved[name], 'savings': savings(before[name], after)}
+    return report
+
+
+def estimate_savings(docs: List[Dict[str, Any]], codec: DocumentCodec) -> Dict[str, Any]:
+    """BSON bytes of sampled legacy documents against their compact form"""
+    before = sum(len(bson.encode(doc)) for doc in docs)
+    after = sum(len(bson.encode(codec.encode({k: v for k, v in doc.items() if k != '_id'}))) for doc in docs)
+    return {'sampled': len(docs), **_saved(before, after)}
+
+
+async def estimate(database, sample: int) -> Dict[str, Any]:
+    report = {}
+    for name, codec in COMPACT_CODECS.items():
+        docs = await database[name].aggregate([{'$match': LEGACY_FILTER},
+                                               {'$sample': {'size': sample}}]).to_list(sample)
+        report[name] = estimate_savings(docs, codec)
+    return report
+
+
+async def run(args):
+    from database import db, mongo
+    from repositories.mongo import MongoStorage
+
+    mongo.connect()
+    try:
+        if args.estimate:
+            print(orjson.dumps(await estimate(db, args.sample), option=orjson.OPT_INDENT_2).decode())
+            return
+        report = await compact_legacy(db, MongoStorage()._create_indexes, args.batch_size)
+    finally:
+        mongo.close()
+    for name, entry in report.items():
+        print(f"{name}: {format_report(entry)}")
+    if not report:
+        print("Nothing to migrate")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--estimate", action="store_true", help="only estimate the savings from a sample")
+    parser.add_argument("--sample", type=int, default=1000, help="documents sampled per collection for --estimate")
+    parser.add_argument("--batch-size", type=int, default=MIGRATION_BATCH_SIZE)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
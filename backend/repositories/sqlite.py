@@ -0,0 +1,568 @@
+import asyncio
+import math
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import orjson
+
+from repositories.base import (FACET_LIMIT, SCORE_INPUTS, EnrichmentRepository, HealthCheckRepository, LeadQuery, LeadRepository,
+                               SearchRepository, SketchRepository, Storage, TaskRepository, lead_state)
+from services.cardinality import merge_registers
+from services.geo import EARTH_RADIUS_M, coordinates, haversine_m, radius_box, tile_bounds, tile_of
+
+EPOCH = datetime(1970, 1, 1)
+
+
+@dataclass
+class SideTable:
+    """Virtual table with one row per document, sharing the document's rowid
+
+    row() returns the column values, or None to leave the document out;
+    fields are the document fields the row depends on.
+    """
+    name: str
+    module: str
+    columns: Tuple[str, ...]
+    fields: Tuple[str, ...]
+    row: Callable[[Dict[str, Any]], Optional[Tuple]]
+
+    def insert_sql(self) -> str:
+        return f"INSERT INTO {self.name} (rowid, {', '.join(self.columns)}) VALUES (?{', ?' * len(self.columns)})"
+
+    def write(self, conn: sqlite3.Connection, rows: List[Tuple[int, Dict[str, Any]]]):
+        values = [(rowid,) + row for rowid, row in ((rowid, self.row(doc)) for rowid, doc in rows) if row is not None]
+        if values:
+            conn.executemany(self.insert_sql(), values)
+
+
+LEAD_TEXT_FIELDS = ('businessName', 'businessType', 'address')
+
+
+def _text_row(doc: Dict[str, Any]) -> Tuple:
+    return tuple(str(doc.get(field) or '') for field in LEAD_TEXT_FIELDS)
+
+
+def _geo_row(doc: Dict[str, Any]) -> Optional[Tuple]:
+    point = coordinates(doc)
+    return None if point is None else (point[0], point[0], point[1], point[1])
+
+# Per table: indexed columns (name, extractor) and indexes, mirroring the Mongo indexes
+SCHEMA = {
+    'searches': {
+        'columns': [('id', lambda d: d.get('id')), ('created_at', lambda d: _ts(d.get('created_at')))],
+        'indexes': ['CREATE UNIQUE INDEX IF NOT EXISTS searches_id ON searches (id)',
+                    'CREATE INDEX IF NOT EXISTS searches_created_at ON searches (created_at DESC)'],
+    },
+    'leads': {
+        'columns': [('id', lambda d: d.get('id')), ('search_id', lambda d: d.get('searchId')),
+                    ('has_email', lambda d: int(bool(d.get('email')))),
+                    ('has_phone', lambda d: int(bool(d.get('phone')))),
+                    ('has_website', lambda d: int(bool(d.get('website')))),
+                    ('business_type', lambda d: d.get('businessType')),
+                    ('state', lambda d: lead_state(d.get('address'))),
+                    ('rating', lambda d: d.get('rating')), ('review_count', lambda d: d.get('reviewCount')),
+                    ('created_at', lambda d: _ts(d.get('created_at'))),
+                    ('score', lambda d: d.get('score')), ('score_version', lambda d: d.get('score_version'))],
+        'indexes': ['CREATE UNIQUE INDEX IF NOT EXISTS leads_id ON leads (id)',
+                    'CREATE INDEX IF NOT EXISTS leads_search_id ON leads (search_id)',
+                    'CREATE INDEX IF NOT EXISTS leads_has_email ON leads (has_email)',
+                    'CREATE INDEX IF NOT EXISTS leads_type_rating ON leads (business_type, rating DESC)',
+                    'CREATE INDEX IF NOT EXISTS leads_rating ON leads (rating DESC, review_count DESC)',
+                    'CREATE INDEX IF NOT EXISTS leads_review_count ON leads (review_count DESC)',
+                    'CREATE INDEX IF NOT EXISTS leads_state ON leads (state)',
+                    'CREATE INDEX IF NOT EXISTS leads_created_at ON leads (created_at DESC)',
+                    'CREATE INDEX IF NOT EXISTS leads_score ON leads (score DESC)',
+                    'CREATE INDEX IF NOT EXISTS leads_search_score ON leads (search_id, score DESC)',
+                    'CREATE INDEX IF NOT EXISTS leads_state_score ON leads (state, score DESC)',
+                    'CREATE INDEX IF NOT EXISTS leads_score_version ON leads (score_version)'],
+        # Full-text index (FTS5) and spatial index (R*Tree) of the leads
+        'side': [SideTable('leads_fts', f"fts5({', '.join(LEAD_TEXT_FIELDS)})", LEAD_TEXT_FIELDS, LEAD_TEXT_FIELDS,
+                           _text_row),
+                 SideTable('leads_geo', 'rtree(id, min_lng, max_lng, min_lat, max_lat)',
+                           ('min_lng', 'max_lng', 'min_lat', 'max_lat'), ('location',), _geo_row)],
+    },
+    'email_enrichments': {
+        'columns': [('id', lambda d: d.get('id')), ('lead_id', lambda d: d.get('leadId'))],
+        'indexes': ['CREATE INDEX IF NOT EXISTS email_enrichments_lead_id ON email_enrichments (lead_id)'],
+    },
+    'automation_tasks': {
+        'columns': [('id', lambda d: d.get('id')), ('workflow_type', lambda d: d.get('workflow_type')),
+                    ('started_at', lambda d: _ts(d.get('started_at')))],
+        'indexes': ['CREATE INDEX IF NOT EXISTS automation_tasks_started_at ON automation_tasks (started_at DESC)',
+                    'CREATE INDEX IF NOT EXISTS automation_tasks_workflow ON automation_tasks (workflow_type, started_at DESC)'],
+    },
+    'health_checks': {
+        'columns': [('timestamp', lambda d: _ts(d.get('timestamp')))],
+        'indexes': ['CREATE INDEX IF NOT EXISTS health_checks_timestamp ON health_checks (timestamp DESC)'],
+    },
+}
+
+# Tables outside SCHEMA, which hold no documents
+TABLES = ['CREATE TABLE IF NOT EXISTS lead_sketches (key TEXT NOT NULL, name TEXT NOT NULL, registers BLOB NOT NULL, '
+          'PRIMARY KEY (key, name))']
+
+# Fields restored to datetime when reading documents back
+DATETIME_FIELDS = {'created_at', 'started_at', 'completed_at', 'timestamp', 'lease_until'}
+
+# Columns behind the LeadQuery filters and sorts
+LEAD_SORT_COLUMNS = {'score': 'score', 'rating': 'rating', 'reviewCount': 'review_count', 'created_at': 'created_at'}
+EARTH_HALF_CIRCUMFERENCE_M = math.pi * EARTH_RADIUS_M
+# bm25 weights of the FTS columns, matching the Mongo text index weights
+LEAD_TEXT_WEIGHTS = (10.0, 5.0, 1.0)
+
+
+def _ts(value: Optional[datetime]) -> Optional[float]:
+    return (value - EPOCH).total_seconds() if isinstance(value, datetime) else None
+
+
+def _encode(doc: Dict[str, Any]) -> bytes:
+    return orjson.dumps({k: v for k, v in doc.items() if k != '_id'})
+
+
+def _match_expression(text: str) -> str:
+    """Any of the words, like Mongo's $text; quoting keeps FTS5 syntax out of user input"""
+    return ' OR '.join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+def _decode(raw: bytes) -> dict:
+    doc = orjson.loads(raw)
+    for field in DATETIME_FIELDS & doc.keys():
+        if isinstance(doc[field], str):
+            doc[field] = datetime.fromisoformat(doc[field])
+    return doc
+
+
+class SQLiteDatabase:
+    """One SQLite connection used from a worker thread
+
+    Documents are stored as JSON next to the columns that are filtered or
+    sorted on, so each lookup the routes make is served by an index.
+    ':memory:' gives an embedded database that lives as long as the process.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            for table, spec in SCHEMA.items():
+                columns = ', '.join(f'{name}' for name, _ in spec['columns'])
+                self._conn.execute(f'CREATE TABLE IF NOT EXISTS {table} ({columns}, doc BLOB NOT NULL)')
+                self._migrate(self._conn, table, spec)
+                for statement in spec['indexes']:
+                    self._conn.execute(statement)
+            for statement in TABLES:
+                self._conn.execute(statement)
+        return self._conn
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection, table: str, spec: dict):
+        """Bring files written by older versions up to the current columns and side tables"""
+        existing = {row[1] for row in conn.execute(f'PRAGMA table_info({table})')}
+        added = [name for name, _ in spec['columns'] if name not in existing]
+        missing = [side for side in spec.get('side', [])
+                   if conn.execute('SELECT 1 FROM sqlite_master WHERE name = ?', (side.name,)).fetchone() is None]
+        if not added and not missing:
+            return
+
+        with conn:
+            for name in added:
+                conn.execute(f'ALTER TABLE {table} ADD COLUMN {name}')
+            for side in missing:
+                conn.execute(f'CREATE VIRTUAL TABLE {side.name} USING {side.module}')
+            extractors = [(name, extract) for name, extract in spec['columns'] if name in added]
+            assignments = ', '.join(f'{name} = ?' for name, _ in extractors)
+            rows = [(rowid, _decode(raw)) for rowid, raw in conn.execute(f'SELECT rowid, doc FROM {table}')]
+            if extractors:
+                conn.executemany(f'UPDATE {table} SET {assignments} WHERE rowid = ?',
+                                 [tuple(extract(doc) for _, extract in extractors) + (rowid,) for rowid, doc in rows])
+            for side in missing:
+                side.write(conn, rows)
+
+    def _call(self, func: Callable[[sqlite3.Connection], Any]):
+        with self._lock:
+            return func(self._connect())
+
+    async def run(self, func: Callable[[sqlite3.Connection], Any]):
+        return await asyncio.to_thread(self._call, func)
+
+    async def insert(self, table: str, docs: Sequence[Dict[str, Any]], skip_existing: bool = False) -> List[int]:
+        """Insert docs in one transaction; with skip_existing, unique conflicts are skipped and their positions returned"""
+        extractors = SCHEMA[table]['columns']
+        sides = SCHEMA[table].get('side', [])
+        rows = [tuple(extract(doc) for _, extract in extractors) + (_encode(doc),) for doc in docs]
+        placeholders = ', '.join('?' * (len(extractors) + 1))
+        names = ', '.join(name for name, _ in extractors)
+        verb = 'INSERT OR IGNORE' if skip_existing else 'INSERT'
+        sql = f'{verb} INTO {table} ({names}, doc) VALUES ({placeholders})'
+
+        def insert(conn):
+            with conn:
+                if not sides and not skip_existing:
+                    conn.executemany(sql, rows)
+                    return []
+                # The side tables need the rowids the inserts were given
+                inserted, skipped = [], []
+                for index, (row, doc) in enumerate(zip(rows, docs)):
+                    cursor = conn.execute(sql, row)
+                    if cursor.rowcount:
+                        inserted.append((cursor.lastrowid, doc))
+                    else:
+                        skipped.append(index)
+                for side in sides:
+                    side.write(conn, inserted)
+                return skipped
+
+        return await self.run(insert)
+
+    async def find(self, table: str, where: str = '', params: Tuple = (), order: str = '',
+                   limit: Optional[int] = None) -> List[dict]:
+        sql = f'SELECT doc FROM {table}'
+        if where:
+            sql += f' WHERE {where}'
+        if order:
+            sql += f' ORDER BY {order}'
+        if limit is not None:
+            sql += f' LIMIT {int(limit)}'
+        rows = await self.run(lambda conn: conn.execute(sql, params).fetchall())
+        return [_decode(row[0]) for row in rows]
+
+    async def find_by_ids(self, table: str, ids: List[str]) -> Dict[str, dict]:
+        docs = []
+        # Stay below SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            docs += await self.find(table, f"id IN ({', '.join('?' * len(chunk))})", tuple(chunk))
+        return {doc['id']: doc for doc in docs}
+
+    async def find_one(self, table: str, where: str, params: Tuple, order: str = '') -> Optional[dict]:
+        docs = await self.find(table, where, params, order, limit=1)
+        return docs[0] if docs else None
+
+    async def count(self, table: str, where: str = '', params: Tuple = ()) -> int:
+        sql = f'SELECT COUNT(*) FROM {table}' + (f' WHERE {where}' if where else '')
+        return (await self.run(lambda conn: conn.execute(sql, params).fetchone()))[0]
+
+    async def update(self, table: str, key_column: str, key: str,
+                     fields: Union[Dict[str, Any], Callable[[dict], Dict[str, Any]]]):
+        await self.update_many(table, key_column, {key: fields})
+
+    async def update_many(self, table: str, key_column: str,
+                          updates: Dict[str, Union[Dict[str, Any], Callable[[dict], Dict[str, Any]]]]):
+        """Set fields on many documents in one transaction, {key: fields or function of the document}"""
+        extractors = SCHEMA[table]['columns']
+        assignments = ', '.join(f'{name} = ?' for name, _ in extractors)
+
+        def update(conn):
+            with conn:
+                for key, fields in updates.items():
+                    row = conn.execute(f'SELECT rowid, doc FROM {table} WHERE {key_column} = ?', (key,)).fetchone()
+                    if row is None:
+                        continue
+                    current = _decode(row[1])
+                    changes = fields(current) if callable(fields) else fields
+                    doc = {**current, **changes}
+                    values = tuple(extract(doc) for _, extract in extractors)
+                    conn.execute(f'UPDATE {table} SET {assignments}, doc = ? WHERE rowid = ?',
+                                 values + (_encode(doc), row[0]))
+                    for side in SCHEMA[table].get('side', []):
+                        if changes.keys() & set(side.fields):
+                            conn.execute(f'DELETE FROM {side.name} WHERE rowid = ?', (row[0],))
+                            side.write(conn, [(row[0], doc)])
+
+        await self.run(update)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class SQLiteSearchRepository(SearchRepository):
+    def __init__(self, database: SQLiteDatabase):
+        self.db = database
+
+    async def insert(self, search: Dict[str, Any]) -> None:
+        await self.db.insert('searches', [search])
+
+    async def get(self, search_id: str) -> Optional[dict]:
+        return await self.db.find_one('searches', 'id = ?', (search_id,))
+
+    async def get_many(self, search_ids: List[str]) -> Dict[str, dict]:
+        return await self.db.find_by_ids('searches', search_ids)
+
+    async def set_results_count(self, search_id: str, results_count: int, status: Optional[str] = None) -> None:
+        await self.db.update('searches', 'id', search_id, lambda doc: {
+            'results_count': results_count, 'results_version': doc.get('results_version', 0) + 1,
+            **({'status': status} if status else {})})
+
+    async def bump_results_versions(self, search_ids: List[str]) -> None:
+        await self.db.update_many('searches', 'id', {
+            search_id: lambda doc: {'results_version': doc.get('results_version', 0) + 1}
+            for search_id in set(search_ids)})
+
+    async def count(self) -> int:
+        return await self.db.count('searches')
+
+    async def recent(self, limit: int) -> List[dict]:
+        return await self.db.find('searches', order='created_at DESC', limit=limit)
+
+
+class SQLiteLeadRepository(LeadRepository):
+    def __init__(self, database: SQLiteDatabase):
+        self.db = database
+
+    async def insert_many(self, leads: List[Dict[str, Any]]) -> None:
+        if leads:
+            await self.db.insert('leads', leads)
+
+    async def insert_new(self, leads: List[Dict[str, Any]]) -> List[int]:
+        return await self.db.insert('leads', leads, skip_existing=True) if leads else []
+
+    async def get(self, lead_id: str) -> Optional[dict]:
+        return await self.db.find_one('leads', 'id = ?', (lead_id,))
+
+    async def get_many(self, lead_ids: List[str]) -> Dict[str, dict]:
+        return await self.db.find_by_ids('leads', lead_ids)
+
+    async def update(self, lead_id: str, fields: Dict[str, Any]) -> None:
+        await self.db.update('leads', 'id', lead_id, fields)
+
+    async def list_by_search(self, search_id: str, limit: int) -> List[dict]:
+        return await self.db.find('leads', 'search_id = ?', (search_id,), order='rowid', limit=limit)
+
+    async def count(self) -> int:
+        return await self.db.count('leads')
+
+    async def count_with_email(self) -> int:
+        return await self.db.count('leads', 'has_email = 1')
+
+    async def query(self, query: LeadQuery) -> Dict[str, Any]:
+        prefix = ''
+        source = 'leads'
+        conditions: List[str] = []
+        params: List[Any] = []
+        text = _match_expression(query.text or '')
+        if text:
+            # Materialized so FTS runs once per statement instead of once per candidate row
+            weights = ', '.join(str(weight) for weight in LEAD_TEXT_WEIGHTS)
+            prefix = (f'WITH hits AS MATERIALIZED (SELECT rowid, bm25(leads_fts, {weights}) AS rank '
+                      f'FROM leads_fts WHERE leads_fts MATCH ?) ')
+            source = 'hits JOIN leads ON leads.rowid = hits.rowid'
+            params.append(text)
+        for column, value in (('business_type', query.business_type),
+                              ('state', query.state.upper() if query.state else None)):
+            if value is not None:
+                conditions.append(f'{column} = ?')
+                params.append(value)
+        for column, op, value in (('rating', '>=', query.min_rating), ('rating', '<=', query.max_rating),
+                                  ('review_count', '>=', query.min_reviews), ('review_count', '<=', query.max_reviews)):
+            if value is not None:
+                conditions.append(f'{column} {op} ?')
+                params.append(value)
+        for column, value in (('has_email', query.has_email), ('has_phone', query.has_phone),
+                              ('has_website', query.has_website)):
+            if value is not None:
+                conditions.append(f'{column} = ?')
+                params.append(int(value))
+
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        if query.sort == 'relevance' and text:
+            order = 'hits.rank, leads.id'
+        else:
+            order = f"{LEAD_SORT_COLUMNS.get(query.sort, 'created_at')} DESC, leads.id"
+
+        def select(columns: str, tail: str = '') -> str:
+            return f'{prefix}SELECT {columns} FROM {source}{where}{tail}'
+
+        def run(conn):
+            rows = conn.execute(select('leads.doc', f' ORDER BY {order} LIMIT ? OFFSET ?'),
+                                (*params, query.limit, query.offset)).fetchall()
+            total = conn.execute(select('COUNT(*)'), params).fetchone()[0]
+            facets = {
+                name: conn.execute(select(f'{column}, COUNT(*) AS n',
+                                          f' GROUP BY {column} ORDER BY n DESC LIMIT {FACET_LIMIT}'), params).fetchall()
+                for name, column in (('businessType', 'business_type'), ('state', 'state'), ('hasEmail', 'has_email'))
+            }
+            return rows, total, facets
+
+        rows, total, facets = await self.db.run(run)
+        facets['hasEmail'] = [(bool(value), count) for value, count in facets['hasEmail']]
+        return {
+            'leads': [_decode(row[0]) for row in rows],
+            'total': total,
+            'facets': {name: [{'value': value, 'count': count} for value, count in buckets]
+                       for name, buckets in facets.items()}
+        }
+
+
+    async def stale_scores(self, version: str, limit: int) -> List[dict]:
+        docs = await self.db.find('leads', 'score_version IS NOT ?', (version,), limit=limit)
+        return [{field: doc.get(field) for field in SCORE_INPUTS} for doc in docs]
+
+    async def set_scores(self, scores: Dict[str, Dict[str, Any]]) -> None:
+        await self.db.update_many('leads', 'id', scores)
+
+    async def scan(self, fields: Tuple[str, ...], batch_size: int) -> AsyncIterator[List[dict]]:
+        # Keyset pages by rowid: each page is one short query, not a cursor held across awaits
+        last = 0
+        while True:
+            rows = await self.db.run(lambda conn, after=last: conn.execute(
+                'SELECT rowid, doc FROM leads WHERE rowid > ? ORDER BY rowid LIMIT ?', (after, batch_size)).fetchall())
+            if not rows:
+                return
+            last = rows[-1][0]
+            yield [{field: doc.get(field) for field in fields} for doc in (_decode(row[1]) for row in rows)]
+
+    async def set_clusters(self, clusters: Dict[str, Dict[str, Any]]) -> None:
+        await self.db.update_many('leads', 'id', clusters)
+
+    async def top(self, k: int, search_id: Optional[str] = None, region: Optional[str] = None) -> List[dict]:
+        conditions, params = ['score IS NOT NULL'], []
+        if search_id:
+            conditions.append('search_id = ?')
+            params.append(search_id)
+        if region:
+            conditions.append('state = ?')
+            params.append(region.upper())
+        return await self.db.find('leads', ' AND '.join(conditions), tuple(params), order='score DESC', limit=k)
+
+    async def _in_box(self, box: Tuple[float, float, float, float]) -> List[dict]:
+        min_lng, min_lat, max_lng, max_lat = box
+        rows = await self.db.run(lambda conn: conn.execute(
+            'SELECT leads.doc FROM leads_geo JOIN leads ON leads.rowid = leads_geo.id '
+            'WHERE max_lng >= ? AND min_lng <= ? AND max_lat >= ? AND min_lat <= ?',
+            (min_lng, max_lng, min_lat, max_lat)).fetchall())
+        # The R*Tree stores 32-bit floats and rounds outwards; check the exact coordinates
+        docs = [_decode(row[0]) for row in rows]
+        return [doc for doc in docs
+                if min_lng <= coordinates(doc)[0] <= max_lng and min_lat <= coordinates(doc)[1] <= max_lat]
+
+    async def near(self, lng: float, lat: float, limit: int, max_distance_m: Optional[float] = None) -> List[dict]:
+        # Without a radius, widen the search box until it holds enough leads
+        radius = max_distance_m if max_distance_m is not None else 2000.0
+        while True:
+            docs = await self._in_box(radius_box(lng, lat, radius))
+            for doc in docs:
+                doc['distance'] = haversine_m(lng, lat, *coordinates(doc))
+            within = sorted((doc for doc in docs if doc['distance'] <= radius), key=lambda doc: doc['distance'])
+            if max_distance_m is not None or len(within) >= limit or radius >= EARTH_HALF_CIRCUMFERENCE_M:
+                return within[:limit]
+            radius *= 4
+
+    async def within_box(self, box: Tuple[float, float, float, float], limit: int) -> List[dict]:
+        return (await self._in_box(box))[:limit]
+
+    async def tile_cells(self, z: int, x: int, y: int, cell_zoom: int) -> List[dict]:
+        cells: Dict[Tuple[int, int], dict] = {}
+        size = 2 ** cell_zoom
+        for doc in await self._in_box(tile_bounds(z, x, y)):
+            lng, lat = coordinates(doc)
+            cell_x, cell_y = tile_of(lng, lat, z + cell_zoom)
+            # Points on the tile edge count towards this tile
+            key = (min(max(cell_x, x * size), x * size + size - 1), min(max(cell_y, y * size), y * size + size - 1))
+            cell = cells.setdefault(key, {'count': 0, 'lng': 0.0, 'lat': 0.0, 'ratings': []})
+            cell['count'] += 1
+            cell['lng'] += lng
+            cell['lat'] += lat
+            if doc.get('rating') is not None:
+                cell['ratings'].append(doc['rating'])
+        return [{'x': key[0], 'y': key[1], 'count': cell['count'],
+                 'avgRating': sum(cell['ratings']) / len(cell['ratings']) if cell['ratings'] else None,
+                 'lng': cell['lng'] / cell['count'], 'lat': cell['lat'] / cell['count']}
+                for key, cell in cells.items()]
+
+
+class SQLiteEnrichmentRepository(EnrichmentRepository):
+    def __init__(self, database: SQLiteDatabase):
+        self.db = database
+
+    async def insert(self, enrichment: Dict[str, Any]) -> None:
+        await self.db.insert('email_enrichments', [enrichment])
+
+    async def count(self) -> int:
+        return await self.db.count('email_enrichments')
+
+
+class SQLiteTaskRepository(TaskRepository):
+    def __init__(self, database: SQLiteDatabase):
+        self.db = database
+
+    async def insert(self, task: Dict[str, Any]) -> None:
+        await self.db.insert('automation_tasks', [task])
+
+    async def recent(self, limit: int, workflow_type: Optional[str] = None) -> List[dict]:
+        if workflow_type:
+            return await self.db.find('automation_tasks', 'workflow_type = ?', (workflow_type,),
+                                      order='started_at DESC', limit=limit)
+        return await self.db.find('automation_tasks', order='started_at DESC', limit=limit)
+
+    async def started_since(self, since: datetime, limit: int) -> List[dict]:
+        return await self.db.find('automation_tasks', 'started_at >= ?', (_ts(since),), limit=limit)
+
+
+class SQLiteHealthCheckRepository(HealthCheckRepository):
+    def __init__(self, database: SQLiteDatabase):
+        self.db = database
+
+    async def insert(self, health_check: Dict[str, Any]) -> None:
+        await self.db.insert('health_checks', [health_check])
+
+    async def latest(self) -> Optional[dict]:
+        return await self.db.find_one('health_checks', '', (), order='timestamp DESC')
+
+
+class SQLiteSketchRepository(SketchRepository):
+    def __init__(self, database: SQLiteDatabase):
+        self.db = database
+
+    async def merge(self, key: str, sketches: Dict[str, bytes]) -> None:
+        def merge(conn):
+            # Read and write in one transaction under the connection lock
+            with conn:
+                for name, registers in sketches.items():
+                    row = conn.execute('SELECT registers FROM lead_sketches WHERE key = ? AND name = ?',
+                                       (key, name)).fetchone()
+                    conn.execute('INSERT OR REPLACE INTO lead_sketches (key, name, registers) VALUES (?, ?, ?)',
+                                 (key, name, merge_registers(row[0] if row else None, registers)))
+
+        await self.db.run(merge)
+
+    async def get_many(self, keys: List[str]) -> Dict[str, Dict[str, bytes]]:
+        sketches: Dict[str, Dict[str, bytes]] = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = await self.db.run(lambda conn: conn.execute(
+                f"SELECT key, name, registers FROM lead_sketches WHERE key IN ({', '.join('?' * len(chunk))})",
+                chunk).fetchall())
+            for key, name, registers in rows:
+                sketches.setdefault(key, {})[name] = registers
+        return sketches
+
+
+class SQLiteStorage(Storage):
+    name = 'sqlite'
+
+    def __init__(self, path: str):
+        self.database = SQLiteDatabase(path)
+        self.searches = SQLiteSearchRepository(self.database)
+        self.leads = SQLiteLeadRepository(self.database)
+        self.enrichments = SQLiteEnrichmentRepository(self.database)
+        self.tasks = SQLiteTaskRepository(self.database)
+        self.health_checks = SQLiteHealthCheckRepository(self.database)
+        self.sketches = SQLiteSketchRepository(self.database)
+
+    async def setup(self) -> None:
+        await self.database.run(lambda conn: None)
+
+    async def close(self) -> None:
+        self.database.close()
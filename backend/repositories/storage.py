@@ -0,0 +1,35 @@
+import os
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from repositories.base import Storage
+from services.dataloader import DataLoader
+
+ROOT_DIR = Path(__file__).parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+# mongo (default), sqlite (file at STORAGE_SQLITE_PATH) or memory (embedded, per process)
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'mongo')
+STORAGE_SQLITE_PATH = os.environ.get('STORAGE_SQLITE_PATH', str(ROOT_DIR / 'leads.sqlite3'))
+
+
+def create_storage(backend: str = STORAGE_BACKEND) -> Storage:
+    if backend == 'mongo':
+        from repositories.mongo import MongoStorage
+        return MongoStorage()
+    if backend in ('sqlite', 'memory'):
+        from repositories.sqlite import SQLiteStorage
+        return SQLiteStorage(STORAGE_SQLITE_PATH if backend == 'sqlite' else ':memory:')
+    raise ValueError(f"Unknown STORAGE_BACKEND '{backend}', expected mongo, sqlite or memory")
+
+
+storage = create_storage()
+
+# The scheduler (simple_scheduler.py) claims, writes and health-checks tasks in MongoDB only, so the
+# automation routes keep tasks and health checks there, whatever STORAGE_BACKEND says
+automation_storage = storage if storage.name == 'mongo' else create_storage('mongo')
+
+# Point reads by id go through these, so concurrent lookups share one $in query
+lead_loader = DataLoader('leads', lambda ids: storage.leads.get_many(ids))
+search_loader = DataLoader('searches', lambda ids: storage.searches.get_many(ids))
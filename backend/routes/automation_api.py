@@ -2,9 +2,12 @@ from fastapi import APIRouter, HTTPException
 from typing import Dict, List, Any
 import asyncio
 import uuid
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from database import db
 from pydantic import BaseModel
+from services.archive import list_archive, read_archived
+from services.workflow_registry import WORKFLOWS, get_workflow
+from repositories.storage import automation_storage
 
 router = APIRouter(prefix="/api/automation", tags=["automation"])
 
@@ -15,6 +18,7 @@ class WorkflowStatus(BaseModel):
     next_run: str
     success_rate: float
     total_runs: int
+    implemented: bool = True
 
 class SystemHealth(BaseModel):
     overall_status: str
@@ -31,14 +35,11 @@ async def get_automation_overview():
         last_24h = now - timedelta(hours=24)
         
         # Tasks der letzten 24 Stunden
-        recent_tasks_cursor = db.automation_tasks.find({
-            'started_at': {'$gte': last_24h}
-        })
-        recent_tasks = await recent_tasks_cursor.to_list(1000)
+        recent_tasks = await automation_storage.tasks.started_since(last_24h, 1000)
         
         # Workflow-Statistiken
         workflow_stats = {}
-        total_workflows = 11  # Anzahl verfügbare Workflows
+        total_workflows = len(WORKFLOWS)
         
         for task in recent_tasks:
             workflow_type = task.get('workflow_type', 'unknown')
@@ -75,9 +76,7 @@ async def get_automation_overview():
                 stats['success_rate'] = 0.0
         
         # Aktuelle System-Health
-        health_cursor = db.health_checks.find().sort('timestamp', -1).limit(1)
-        health_records = await health_cursor.to_list(1)
-        current_health = health_records[0] if health_records else None
+        current_health = await automation_storage.health_checks.latest()
         
         # Übersicht zusammenstellen
         overview = {
@@ -103,43 +102,36 @@ async def get_automation_overview():
 async def get_all_workflow_status():
     """Status aller Workflows abrufen"""
     try:
-        workflows = [
-            'google_maps_scraper', 'linkedin_extractor', 'ecommerce_intelligence',
-            'social_media_harvester', 'real_estate_analyzer', 'job_market_intelligence',
-            'restaurant_analyzer', 'finance_data_collector', 'event_scout',
-            'vehicle_market_intel', 'seo_opportunity_finder'
-        ]
-        
         workflow_statuses = []
         
-        for workflow_name in workflows:
+        for workflow_name, profile in WORKFLOWS.items():
             # Letzte Ausführungen finden
-            recent_cursor = db.automation_tasks.find({
-                'workflow_type': workflow_name
-            }).sort('started_at', -1).limit(10)
-            recent_tasks = await recent_cursor.to_list(10)
+            recent_tasks = await automation_storage.tasks.recent(10, workflow_type=workflow_name)
             
             if recent_tasks:
                 last_task = recent_tasks[0]
                 success_count = len([t for t in recent_tasks if t.get('status') == 'completed'])
                 success_rate = success_count / len(recent_tasks) if recent_tasks else 0
+                last_run = last_task.get('started_at', datetime.min)
                 
                 status = WorkflowStatus(
                     workflow_name=workflow_name,
                     status=last_task.get('status', 'unknown'),
-                    last_run=last_task.get('started_at', datetime.min).isoformat(),
-                    next_run=(datetime.utcnow() + timedelta(hours=1)).isoformat(),  # Geschätzt
+                    last_run=last_run.isoformat(),
+                    next_run=(last_run + timedelta(minutes=profile.interval_minutes)).isoformat() if profile.implemented else 'not_scheduled',
                     success_rate=success_rate,
-                    total_runs=len(recent_tasks)
+                    total_runs=len(recent_tasks),
+                    implemented=profile.implemented
                 )
             else:
                 status = WorkflowStatus(
                     workflow_name=workflow_name,
                     status='never_run',
                     last_run='never',
-                    next_run='scheduled',
+                    next_run='scheduled' if profile.implemented else 'not_scheduled',
                     success_rate=0.0,
-                    total_runs=0
+                    total_runs=0,
+                    implemented=profile.implemented
                 )
             
             workflow_statuses.append(status)
@@ -154,10 +146,9 @@ async def get_system_health():
     """Aktuelle System-Health abrufen"""
     try:
         # Neueste Health-Checks
-        health_cursor = db.health_checks.find().sort('timestamp', -1).limit(1)
-        health_records = await health_cursor.to_list(1)
+        health_data = await automation_storage.health_checks.latest()
         
-        if not health_records:
+        if not health_data:
             return SystemHealth(
                 overall_status='unknown',
                 services={},
@@ -165,13 +156,11 @@ async def get_system_health():
                 timestamp=datetime.utcnow().isoformat()
             )
         
-        health_data = health_records[0]
-        
         return SystemHealth(
             overall_status=health_data.get('overall_status', 'unknown'),
             services=health_data.get('services', {}),
             system_resources=health_data.get('system_resources', {}),
-            timestamp=health_data.get('timestamp', datetime.utcnow().isoformat())
+            timestamp=(health_data.get('timestamp') or datetime.utcnow()).isoformat()
         )
         
     except Exception as e:
@@ -208,16 +197,13 @@ async def trigger_workflow_manually(workflow_name: str, params: Dict[str, Any] =
     """Workflow manuell auslösen (vereinfacht ohne Celery)"""
     try:
         # Verfügbare Workflows prüfen
-        available_workflows = [
-            'google_maps_scraper', 'linkedin_extractor', 'ecommerce_intelligence',
-            'social_media_harvester', 'real_estate_analyzer', 'job_market_intelligence',
-            'restaurant_analyzer', 'finance_data_collector', 'event_scout',
-            'vehicle_market_intel', 'seo_opportunity_finder'
-        ]
-        
-        if workflow_name not in available_workflows:
+        profile = get_workflow(workflow_name)
+        if profile is None:
             raise HTTPException(status_code=404, detail=f"Workflow '{workflow_name}' nicht gefunden")
         
+        if not profile.implemented:
+            raise HTTPException(status_code=501, detail=f"Workflow '{workflow_name}' ist noch nicht implementiert")
+        
         # Default-Parameter falls keine angegeben
         if not params:
             params = {'max_results': 20, 'triggered_manually': True}
@@ -232,7 +218,7 @@ async def trigger_workflow_manually(workflow_name: str, params: Dict[str, Any] =
             'triggered_manually': True
         }
         
-        await db.automation_tasks.insert_one(task_record)
+        await automation_storage.tasks.insert(task_record)
         
         return {
             'success': True,
@@ -252,8 +238,7 @@ async def trigger_workflow_manually(workflow_name: str, params: Dict[str, Any] =
 async def get_recent_tasks(limit: int = 50):
     """Aktuelle Tasks abrufen"""
     try:
-        tasks_cursor = db.automation_tasks.find().sort('started_at', -1).limit(limit)
-        tasks = await tasks_cursor.to_list(limit)
+        tasks = await automation_storage.tasks.recent(limit)
         
         # Für Frontend formatieren
         formatted_tasks = []
@@ -294,10 +279,7 @@ async def get_automation_statistics():
         stats = {}
         
         for period_name, start_time in periods.items():
-            tasks_cursor = db.automation_tasks.find({
-                'started_at': {'$gte': start_time}
-            })
-            tasks = await tasks_cursor.to_list(10000)
+            tasks = await automation_storage.tasks.started_since(start_time, 10000)
             
             stats[period_name] = {
                 'total_tasks': len(tasks),
@@ -317,8 +299,50 @@ async def get_automation_statistics():
             'generated_at': now.isoformat(),
             'periods': stats,
             'automation_uptime': '24/7',
-            'total_workflows': 11
+            'total_workflows': len(WORKFLOWS)
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Fehler beim Erstellen der Statistiken: {str(e)}")
+
+@router.get("/archive")
+async def get_archive_overview():
+    """Übersicht über das Cold-Storage-Archiv"""
+    try:
+        files = await asyncio.to_thread(list_archive)
+        
+        collections = {}
+        for entry in files:
+            summary = collections.setdefault(entry['collection'], {
+                'files': 0,
+                'documents': 0,
+                'first_date': entry['date'],
+                'last_date': entry['date']
+            })
+            summary['files'] += 1
+            summary['documents'] += entry['count']
+            summary['first_date'] = min(summary['first_date'], entry['date'])
+            summary['last_date'] = max(summary['last_date'], entry['date'])
+        
+        return {
+            'collections': collections,
+            'total_documents': sum(c['documents'] for c in collections.values())
+        }
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Fehler beim Lesen des Archivs: {str(e)}")
+
+@router.get("/archive/{collection_name}")
+async def get_archived_documents(collection_name: str, start: date = None, end: date = None, limit: int = 100):
+    """Archivierte Dokumente einer Collection im Datumsbereich abrufen"""
+    try:
+        documents = await asyncio.to_thread(read_archived, collection_name, start, end, limit)
+        
+        return {
+            'collection': collection_name,
+            'documents': documents,
+            'count': len(documents)
         }
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Fehler beim Erstellen der Statistiken: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Fehler beim Lesen des Archivs: {str(e)}")
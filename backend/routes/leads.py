@@ -1,11 +1,21 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import List
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, Request
+from fastapi.responses import ORJSONResponse
+from typing import List, Optional
+import orjson
 import uuid
-from datetime import datetime
+import zlib
+from datetime import datetime, timedelta
 
-from models.leads import SearchRequest, LeadResult, SearchRecord, EmailEnrichmentRequest, DashboardStats
+from models.leads import SearchRequest, LeadResult, SearchRecord, EmailEnrichmentRequest, DashboardStats, dump_leads
 from services.lead_scraper import MockLeadScraperService, MockEmailEnrichmentService
-from database import db
+from repositories.base import LEAD_SORTS, LeadQuery
+from repositories.storage import lead_loader, search_loader, storage
+from services.cardinality import ALL_KEY, cardinalities, day_keys, record_leads_safely, search_key
+from services.dedupe import one_per_cluster
+from services.lead_import import IMPORT_FORMATS, detect_format, import_leads
+from services.geo import GEO_MAX_RADIUS_KM, GEO_MAX_ZOOM, GEO_TILE_CACHE_TTL_SECONDS, GEO_TILE_CELL_ZOOM, tile_cache
+from services.result_cache import CachedPayload, search_results_cache
+from services.scoring import apply_scores, score_fields
 
 router = APIRouter(prefix="/api/leads", tags=["leads"])
 
@@ -29,45 +39,69 @@ async def scrape_google_maps(search_request: SearchRequest, background_tasks: Ba
         )
         
         # Save search record to database
-        search_dict = search_record.dict()
-        await db.searches.insert_one(search_dict)
+        search_dict = search_record.model_dump()
+        await storage.searches.insert(search_dict)
         search_id = search_dict["id"]
         
         # Scrape leads (this includes the realistic delay)
         leads = await scraper_service.scrape_google_maps(search_request, search_id)
         
         # Save leads to database
-        leads_data = []
-        for lead in leads:
-            lead_dict = lead.dict()
-            leads_data.append(lead_dict)
-            
-        if leads_data:
-            await db.leads.insert_many(leads_data)
+        leads_data = apply_scores(dump_leads(leads))
+        await storage.leads.insert_many(leads_data)
+        # Map tiles may now be missing these leads
+        tile_cache.clear()
+        await record_leads_safely(storage, leads_data)
             
-        # Update search record with results count
-        await db.searches.update_one(
-            {"id": search_id},
-            {"$set": {"results_count": len(leads_data)}}
-        )
-        
-        # Return clean data without MongoDB ObjectIds
-        clean_results = []
-        for lead_dict in leads_data:
-            # Remove any _id field that might have been added
-            clean_dict = {k: v for k, v in lead_dict.items() if k != '_id'}
-            clean_results.append(clean_dict)
+        # Update search record with results count; this bumps its results version
+        await storage.searches.set_results_count(search_id, len(leads_data))
+        search_results_cache.invalidate(search_id)
         
-        return {
+        # Returning a response directly skips re-validation and jsonable_encoder
+        return ORJSONResponse({
             "searchId": search_id,
-            "results": clean_results,
-            "count": len(clean_results),
-            "message": f"Successfully scraped {len(clean_results)} leads for '{search_request.query}' in {search_request.city}, {search_request.state}"
-        }
+            "results": leads_data,
+            "count": len(leads_data),
+            "message": f"Successfully scraped {len(leads_data)} leads for '{search_request.query}' in {search_request.city}, {search_request.state}"
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Scraping failed: {str(e)}")
 
+@router.post("/import", response_model=dict)
+async def import_lead_file(request: Request, format: Optional[str] = None, filename: Optional[str] = None,
+                           name: Optional[str] = None, city: str = "", state: str = ""):
+    """
+    Import a bought or historical lead list into a new search
+
+    The request body is the file itself (CSV with a header row, or JSONL), optionally
+    gzipped, and is parsed as it arrives. The format comes from the format parameter,
+    the Content-Type or the filename. Rows are validated and inserted in batches;
+    the search's results_count shows the progress, and the response reports
+    per-row errors.
+    """
+    file_format = format or detect_format(request.headers.get("content-type"), filename)
+    if file_format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Unknown import format, expected csv or jsonl")
+
+    search_record = SearchRecord(query=name or filename or f"{file_format} import", city=city, state=state,
+                                 maxResults=0, status="importing")
+    search_dict = search_record.model_dump()
+    await storage.searches.insert(search_dict)
+
+    try:
+        report = await import_leads(storage, search_dict["id"], request.stream(), file_format)
+    except (ValueError, zlib.error) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid import file: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Import failed: {str(e)}")
+    finally:
+        # Map tiles may now be missing the imported leads
+        tile_cache.clear()
+        search_results_cache.invalidate(search_dict["id"])
+
+    return ORJSONResponse(report)
+
 @router.post("/enrich-email", response_model=dict)
 async def enrich_email(request: EmailEnrichmentRequest):
     """
@@ -75,7 +109,7 @@ async def enrich_email(request: EmailEnrichmentRequest):
     """
     try:
         # Get the lead from database
-        lead = await db.leads.find_one({"id": request.leadId}, {"_id": 0})
+        lead = await lead_loader.load(request.leadId)
         if not lead:
             raise HTTPException(status_code=404, detail="Lead not found")
         
@@ -86,11 +120,13 @@ async def enrich_email(request: EmailEnrichmentRequest):
         enriched_email = await email_service.enrich_email(request.website)
         
         if enriched_email:
-            # Update lead with enriched email
-            await db.leads.update_one(
-                {"id": request.leadId},
-                {"$set": {"email": enriched_email}}
-            )
+            # Update lead with enriched email; the email changes its score
+            fields = {"email": enriched_email, "updated_at": datetime.utcnow()}
+            fields.update(score_fields([{**lead, **fields}])[0])
+            await storage.leads.update(request.leadId, fields)
+            # Cached results of the lead's search are stale now, here and in other processes
+            await storage.searches.bump_results_versions([lead["searchId"]])
+            search_results_cache.invalidate(lead["searchId"])
             
             # Log enrichment activity
             enrichment_record = {
@@ -101,7 +137,7 @@ async def enrich_email(request: EmailEnrichmentRequest):
                 "source": "hunter_mock",
                 "created_at": datetime.utcnow()
             }
-            await db.email_enrichments.insert_one(enrichment_record)
+            await storage.enrichments.insert(enrichment_record)
             
             return {
                 "success": True,
@@ -121,31 +157,171 @@ async def enrich_email(request: EmailEnrichmentRequest):
         raise HTTPException(status_code=500, detail=f"Email enrichment failed: {str(e)}")
 
 @router.get("/search/{search_id}", response_model=dict)
-async def get_search_results(search_id: str):
+async def get_search_results(search_id: str, request: Request):
     """
     Get results for a specific search
+
+    Served from the result cache with a strong ETag; If-None-Match gets a 304.
     """
     try:
+        # Checked recently: no database work at all
+        cached = search_results_cache.fresh(search_id)
+        if cached is not None:
+            return cached.response(request.headers)
+
         # Get search record
-        search = await db.searches.find_one({"id": search_id}, {"_id": 0})
+        search = await search_loader.load(search_id)
         if not search:
             raise HTTPException(status_code=404, detail="Search not found")
         
+        # Same version as cached: the leads are unchanged
+        version = search.get("results_version", 0)
+        cached = search_results_cache.get(search_id, version)
+        if cached is not None:
+            return cached.response(request.headers)
+        
         # Get associated leads
-        leads_cursor = db.leads.find({"searchId": search_id}, {"_id": 0})
-        leads = await leads_cursor.to_list(1000)
+        leads = await storage.leads.list_by_search(search_id, 1000)
         
-        return {
+        # Documents come straight from storage without _id, no need to validate them again
+        payload = CachedPayload.build(version, orjson.dumps({
             "search": search,
             "leads": leads,
             "count": len(leads)
-        }
+        }, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY))
+        # Searches still running change without a version bump per lead
+        if search.get("status") == "completed":
+            search_results_cache.put(search_id, payload)
+        return payload.response(request.headers)
         
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve search results: {str(e)}")
 
+@router.get("/query", response_model=dict)
+async def query_leads(
+    q: Optional[str] = Query(None, max_length=200, description="Text search over name, type and address"),
+    businessType: Optional[str] = None,
+    state: Optional[str] = Query(None, min_length=2, max_length=2),
+    minRating: Optional[float] = Query(None, ge=0, le=5),
+    maxRating: Optional[float] = Query(None, ge=0, le=5),
+    minReviews: Optional[int] = Query(None, ge=0),
+    maxReviews: Optional[int] = Query(None, ge=0),
+    hasEmail: Optional[bool] = None,
+    hasPhone: Optional[bool] = None,
+    hasWebsite: Optional[bool] = None,
+    sort: str = Query("relevance", pattern=f"^({'|'.join(LEAD_SORTS)})$"),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0, le=10000)
+):
+    """
+    Search all leads by text and filters, with facet counts by type, state and email
+    """
+    query = LeadQuery(
+        text=q, business_type=businessType, state=state,
+        min_rating=minRating, max_rating=maxRating, min_reviews=minReviews, max_reviews=maxReviews,
+        has_email=hasEmail, has_phone=hasPhone, has_website=hasWebsite,
+        sort=sort, limit=limit, offset=offset
+    )
+    try:
+        result = await storage.leads.query(query)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Lead query failed: {str(e)}")
+
+    return ORJSONResponse({**result, "limit": limit, "offset": offset})
+
+@router.get("/top", response_model=dict)
+async def top_leads(
+    k: int = Query(20, ge=1, le=500),
+    searchId: Optional[str] = None,
+    region: Optional[str] = Query(None, min_length=2, max_length=2, description="State, e.g. NY")
+):
+    """
+    Highest scored leads, overall or per search or region
+    """
+    try:
+        leads = await storage.leads.top(k, search_id=searchId, region=region)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Top leads query failed: {str(e)}")
+    return ORJSONResponse({"leads": leads, "count": len(leads)})
+
+@router.get("/geo/radius", response_model=dict)
+async def leads_within_radius(
+    lng: float = Query(..., ge=-180, le=180),
+    lat: float = Query(..., ge=-90, le=90),
+    radiusKm: float = Query(5, gt=0, le=GEO_MAX_RADIUS_KM),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """
+    Leads within radiusKm of a point, nearest first, with their distance in meters
+    """
+    try:
+        leads = await storage.leads.near(lng, lat, limit, max_distance_m=radiusKm * 1000)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Radius query failed: {str(e)}")
+    return ORJSONResponse({"leads": leads, "count": len(leads)})
+
+@router.get("/geo/bbox", response_model=dict)
+async def leads_within_bbox(
+    minLng: float = Query(..., ge=-180, le=180),
+    minLat: float = Query(..., ge=-90, le=90),
+    maxLng: float = Query(..., ge=-180, le=180),
+    maxLat: float = Query(..., ge=-90, le=90),
+    limit: int = Query(500, ge=1, le=5000)
+):
+    """
+    Leads inside a bounding box
+    """
+    if minLng >= maxLng or minLat >= maxLat:
+        raise HTTPException(status_code=400, detail="Bounding box needs minLng < maxLng and minLat < maxLat")
+    try:
+        leads = await storage.leads.within_box((minLng, minLat, maxLng, maxLat), limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Bounding box query failed: {str(e)}")
+    return ORJSONResponse({"leads": leads, "count": len(leads)})
+
+@router.get("/geo/nearest", response_model=dict)
+async def nearest_leads(
+    lng: float = Query(..., ge=-180, le=180),
+    lat: float = Query(..., ge=-90, le=90),
+    k: int = Query(10, ge=1, le=100)
+):
+    """
+    The k leads nearest to a point, with their distance in meters
+    """
+    try:
+        leads = await storage.leads.near(lng, lat, k)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Nearest query failed: {str(e)}")
+    return ORJSONResponse({"leads": leads, "count": len(leads)})
+
+@router.get("/geo/tiles/{z}/{x}/{y}", response_model=dict)
+async def lead_tile(z: int, x: int, y: int):
+    """
+    Lead counts per cell of a Web Mercator tile, for map views
+    """
+    if not 0 <= z <= GEO_MAX_ZOOM or not 0 <= x < 2 ** z or not 0 <= y < 2 ** z:
+        raise HTTPException(status_code=400, detail=f"Tile {z}/{x}/{y} does not exist")
+
+    headers = {"Cache-Control": f"public, max-age={int(GEO_TILE_CACHE_TTL_SECONDS)}"}
+    tile = tile_cache.get((z, x, y))
+    if tile is not None:
+        return ORJSONResponse(tile, headers={**headers, "X-Cache": "HIT"})
+
+    try:
+        cells = await storage.leads.tile_cells(z, x, y, GEO_TILE_CELL_ZOOM)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Tile aggregation failed: {str(e)}")
+    tile = {
+        "z": z, "x": x, "y": y,
+        "cellZoom": z + GEO_TILE_CELL_ZOOM,
+        "total": sum(cell["count"] for cell in cells),
+        "cells": sorted(cells, key=lambda cell: (cell["y"], cell["x"]))
+    }
+    tile_cache.put((z, x, y), tile)
+    return ORJSONResponse(tile, headers={**headers, "X-Cache": "MISS"})
+
 @router.get("/dashboard/stats", response_model=DashboardStats)
 async def get_dashboard_stats():
     """
@@ -153,17 +329,19 @@ async def get_dashboard_stats():
     """
     try:
         # Get total counts
-        total_leads = await db.leads.count_documents({})
-        total_searches = await db.searches.count_documents({})
-        enriched_emails = await db.email_enrichments.count_documents({})
+        total_leads = await storage.leads.count()
+        total_searches = await storage.searches.count()
+        enriched_emails = await storage.enrichments.count()
         
         # Calculate conversion rate (leads with emails / total leads)
-        leads_with_emails = await db.leads.count_documents({"email": {"$ne": None, "$ne": ""}})
+        leads_with_emails = await storage.leads.count_with_email()
         avg_conversion = (leads_with_emails / total_leads * 100) if total_leads > 0 else 0
         
         # Get recent searches
-        recent_searches_cursor = db.searches.find({}, {"_id": 0}).sort("created_at", -1).limit(5)
-        recent_searches = await recent_searches_cursor.to_list(5)
+        recent_searches = await storage.searches.recent(5)
+
+        # Distinct counts come from the all-time sketch, not from scanning leads
+        unique = await cardinalities(storage, [ALL_KEY])
         
         # Format recent searches for frontend
         formatted_searches = []
@@ -181,29 +359,59 @@ async def get_dashboard_stats():
             totalSearches=total_searches,
             avgConversion=round(avg_conversion, 1),
             emailsEnriched=enriched_emails,
-            recentSearches=formatted_searches
+            recentSearches=formatted_searches,
+            uniqueBusinesses=unique["businesses"],
+            uniqueDomains=unique["domains"],
+            uniqueCities=unique["cities"]
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve dashboard stats: {str(e)}")
 
+@router.get("/dashboard/cardinalities", response_model=dict)
+async def get_cardinalities(
+    days: int = Query(30, ge=1, le=366, description="Days up to and including today"),
+    searchId: Optional[str] = None
+):
+    """
+    Approximate unique businesses, domains and cities of leads over recent days or in one search
+    """
+    try:
+        if searchId:
+            keys = [search_key(searchId)]
+        else:
+            today = datetime.utcnow().date()
+            keys = day_keys(today - timedelta(days=days - 1), today)
+        counts = await cardinalities(storage, keys)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to compute cardinalities: {str(e)}")
+    return {
+        "uniqueBusinesses": counts["businesses"],
+        "uniqueDomains": counts["domains"],
+        "uniqueCities": counts["cities"],
+        "days": None if searchId else days,
+        "searchId": searchId
+    }
+
 @router.get("/export/{search_id}")
-async def export_search_results(search_id: str):
+async def export_search_results(search_id: str, dedupe: bool = False):
     """
-    Export search results as CSV
+    Export search results as CSV; dedupe=true keeps one lead per duplicate cluster
     """
     try:
         # Get search and leads
-        search = await db.searches.find_one({"id": search_id}, {"_id": 0})
+        search = await search_loader.load(search_id)
         if not search:
             raise HTTPException(status_code=404, detail="Search not found")
             
-        leads_cursor = db.leads.find({"searchId": search_id}, {"_id": 0})
-        leads = await leads_cursor.to_list(1000)
+        leads = await storage.leads.list_by_search(search_id, 1000)
         
         if not leads:
             raise HTTPException(status_code=404, detail="No leads found for this search")
         
+        if dedupe:
+            leads = one_per_cluster(leads)
+        
         # Generate CSV content
         headers = ["Business Name", "Type", "Address", "Phone", "Website", "Email", "Rating", "Reviews", "Search Query"]
         
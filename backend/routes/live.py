@@ -0,0 +1,45 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Optional
+
+from services.live_updates import LIVE_FIELDS, LIVE_HEARTBEAT_SECONDS, LiveEventFilter, format_sse, live_updates
+
+router = APIRouter(prefix="/api/live", tags=["live"])
+
+
+@router.get("/events")
+async def live_events(collections: Optional[str] = None, searchId: Optional[str] = None,
+                      taskId: Optional[str] = None, workflow: Optional[str] = None, status: Optional[str] = None):
+    """
+    Server-sent events for changes to automation tasks, leads and searches
+
+    collections is a comma-separated subset of automation_tasks, leads and searches.
+    Each event is named after its collection; a "resync" event means events were
+    dropped and the client should refetch. The stream ends when the server shuts
+    down, and the client reconnects after the retry interval.
+    """
+    names = frozenset(name.strip() for name in collections.split(',') if name.strip()) if collections \
+        else frozenset(LIVE_FIELDS)
+    unknown = names - set(LIVE_FIELDS)
+    if unknown or not names:
+        raise HTTPException(status_code=400, detail=f"Unknown collections: {', '.join(sorted(unknown)) or '-'}")
+    event_filter = LiveEventFilter(collections=names, search_id=searchId, task_id=taskId,
+                                   workflow=workflow, status=status)
+
+    async def stream():
+        # Subscribe inside the generator so the finally block always unsubscribes
+        subscription = live_updates.subscribe(event_filter)
+        try:
+            yield b'retry: 5000\n\n'
+            while not subscription.closed:
+                events = await subscription.next_batch(LIVE_HEARTBEAT_SECONDS)
+                if events:
+                    yield format_sse(events)
+                elif not subscription.closed:
+                    # Comments keep proxies from closing an idle connection
+                    yield b': ping\n\n'
+        finally:
+            live_updates.unsubscribe(subscription)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
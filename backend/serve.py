@@ -0,0 +1,75 @@
+import logging
+import os
+from pathlib import Path
+
+import uvicorn
+from dotenv import load_dotenv
+from uvicorn.supervisors import Multiprocess
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def worker_count() -> int:
+    """API_WORKERS if set, otherwise one worker per CPU core"""
+    configured = os.environ.get('API_WORKERS')
+    if configured:
+        return max(1, int(configured))
+    return os.cpu_count() or 1
+
+
+class Server(uvicorn.Server):
+    """uvicorn.Server that ends live update streams as soon as an exit signal arrives
+
+    Server-sent event streams never finish on their own; without this every
+    restart would wait the whole graceful timeout for them and then cancel.
+    """
+
+    def handle_exit(self, sig, frame):
+        # Imported here: the app, and with it the hub, is only loaded in the workers
+        from services.live_updates import live_updates
+        live_updates.close_subscriptions()
+        super().handle_exit(sig, frame)
+
+
+def main():
+    """Production entry point: multi-process uvicorn with uvloop and httptools
+
+    Every worker imports server.py on its own and therefore opens its own
+    Mongo pools; MONGO_MAX_POOL_SIZE is per worker. On SIGTERM uvicorn stops
+    accepting connections and gives in-flight requests up to
+    API_GRACEFUL_TIMEOUT seconds before the workers exit.
+    """
+    workers = worker_count()
+    host = os.environ.get('API_HOST', '0.0.0.0')
+    port = int(os.environ.get('API_PORT', 8001))
+    logger.info(f"Starting API on {host}:{port} with {workers} workers")
+
+    config = uvicorn.Config(
+        'server:app',
+        host=host,
+        port=port,
+        workers=workers,
+        loop='uvloop',
+        http='httptools',
+        proxy_headers=True,
+        timeout_keep_alive=int(os.environ.get('API_KEEP_ALIVE', 5)),
+        timeout_graceful_shutdown=int(os.environ.get('API_GRACEFUL_TIMEOUT', 30)),
+        access_log=os.environ.get('API_ACCESS_LOG', '0') == '1'
+    )
+    server = Server(config)
+    # What uvicorn.run does, with the server above
+    if workers > 1:
+        Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,44 @@
-from fastapi import FastAPI, APIRouter
+from fastapi import FastAPI, APIRouter, HTTPException, Query
+from fastapi.responses import ORJSONResponse, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 import uuid
 from datetime import datetime
 
 # Import database connection
-from database import db, client
+from database import db, mongo
+from services.batch_writer import BatchWriter, batch_writer
+from repositories.storage import automation_storage, storage
+from services.metrics import CONTENT_TYPE, MetricsMiddleware, registry
+from services.loop_monitor import LoopLabelMiddleware, loop_monitor
+from services.profiling import ProfilingMiddleware
 
 # Import leads routes
 from routes.leads import router as leads_router
 from routes.automation_api import router as automation_router
+from routes.live import router as live_router
+from services.live_updates import live_updates
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# Create the main app without a prefix
-app = FastAPI()
+# Create the main app without a prefix; orjson encodes every response
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
+# Group commit for heartbeats: inserts arriving within a few ms share one insert_many
+status_writer = BatchWriter(
+    max_batch_size=int(os.environ.get('STATUS_WRITER_MAX_BATCH', 1000)),
+    flush_interval=float(os.environ.get('STATUS_WRITER_FLUSH_MS', 5)) / 1000
+)
+
 
 # Define Models
 class StatusCheck(BaseModel):
@@ -42,20 +56,61 @@ async def root():
 
 @api_router.post("/status", response_model=StatusCheck)
 async def create_status_check(input: StatusCheckCreate):
-    status_dict = input.dict()
-    status_obj = StatusCheck(**status_dict)
-    _ = await db.status_checks.insert_one(status_obj.dict())
-    return status_obj
+    status_obj = StatusCheck(**input.model_dump())
+    # Acknowledged only once the batch containing it has been written
+    await status_writer.insert('status_checks', status_obj.model_dump(), wait=True)
+    return ORJSONResponse(status_obj.model_dump())
+
+def _parse_status_cursor(cursor: str):
+    try:
+        timestamp, status_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(timestamp), status_id
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
 @api_router.get("/status", response_model=List[StatusCheck])
-async def get_status_checks():
-    status_checks = await db.status_checks.find().to_list(1000)
-    return [StatusCheck(**status_check) for status_check in status_checks]
+async def get_status_checks(client_name: Optional[str] = None,
+                            limit: int = Query(100, ge=1, le=1000),
+                            cursor: Optional[str] = None):
+    """Newest heartbeats first; pass the X-Next-Cursor header back as cursor for the next page"""
+    query = {}
+    if client_name is not None:
+        query['client_name'] = client_name
+    if cursor is not None:
+        timestamp, status_id = _parse_status_cursor(cursor)
+        query['$or'] = [
+            {'timestamp': {'$lt': timestamp}},
+            {'timestamp': timestamp, 'id': {'$lt': status_id}}
+        ]
+
+    status_checks = await db.status_checks.find(query, {'_id': 0}) \
+        .sort([('timestamp', -1), ('id', -1)]).limit(limit).to_list(limit)
+
+    headers = {}
+    if len(status_checks) == limit:
+        last = status_checks[-1]
+        headers['X-Next-Cursor'] = f"{last['timestamp'].isoformat()}_{last['id']}"
+    return ORJSONResponse(status_checks, headers=headers)
+
+async def ensure_status_indexes():
+    # Keyset pagination over all heartbeats and per client
+    await db.status_checks.create_index([('timestamp', -1), ('id', -1)])
+    await db.status_checks.create_index([('client_name', 1), ('timestamp', -1), ('id', -1)])
+
+@api_router.get("/system/db-pool")
+async def get_db_pool_stats():
+    return mongo.pool_stats()
+
+# Prometheus scrape target; every uvicorn worker keeps its own counters
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(registry.render(), media_type=CONTENT_TYPE)
 
 # Include the router in the main app
 app.include_router(api_router)
 app.include_router(leads_router)
 app.include_router(automation_router)
+app.include_router(live_router)
 
 app.add_middleware(
     CORSMiddleware,
@@ -65,6 +120,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Attributes event-loop stalls to the route that caused them
+app.add_middleware(LoopLabelMiddleware)
+
+# Opt-in request profiling (X-Profile header, ?profile= flag or PROFILING_SAMPLE_RATE)
+app.add_middleware(ProfilingMiddleware)
+
+# Outermost, so the timing includes CORS handling
+app.add_middleware(MetricsMiddleware)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -72,6 +136,29 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def startup_db_client():
+    mongo.connect()
+    batch_writer.start()
+    status_writer.start()
+    loop_monitor.start()
+    try:
+        await ensure_status_indexes()
+    except Exception as e:
+        logger.error(f"Creating status_checks indexes failed: {str(e)}")
+    try:
+        await storage.setup()
+        if automation_storage is not storage:
+            # Automation tasks and health checks stay in MongoDB; their indexes are made there
+            await automation_storage.setup()
+    except Exception as e:
+        logger.error(f"Setting up {storage.name} storage failed: {str(e)}")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    await live_updates.stop()
+    await status_writer.stop()
+    await batch_writer.stop()
+    await loop_monitor.stop()
+    await storage.close()
+    mongo.close()
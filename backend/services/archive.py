@@ -0,0 +1,166 @@
+import asyncio
+import io
+import json
+import logging
+import os
+from collections import defaultdict
+from datetime import date, datetime
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import zstandard
+from bson import ObjectId, json_util
+from dotenv import load_dotenv
+
+from database import db
+
+ROOT_DIR = Path(__file__).parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+# Cold-Storage-Konfiguration
+ARCHIVE_DIR = Path(os.environ.get('ARCHIVE_DIR', ROOT_DIR / 'archive'))
+ARCHIVE_RETENTION_DAYS = int(os.environ.get('ARCHIVE_RETENTION_DAYS', 7))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 1000))
+ARCHIVE_BATCH_PAUSE_SECONDS = float(os.environ.get('ARCHIVE_BATCH_PAUSE_SECONDS', 0.5))
+ARCHIVE_ZSTD_LEVEL = int(os.environ.get('ARCHIVE_ZSTD_LEVEL', 10))
+# Tasks und Health-Checks speisen Statistiken über 30 Tage und bleiben länger heiß
+ARCHIVE_TASK_RETENTION_DAYS = int(os.environ.get('ARCHIVE_TASK_RETENTION_DAYS', 90))
+
+# Append-only: jede Zeile ist ein Eintrag, der letzte Eintrag pro Pfad gilt
+MANIFEST_NAME = 'manifest.jsonl'
+
+
+def _load_manifest() -> List[dict]:
+    path = ARCHIVE_DIR / MANIFEST_NAME
+    if not path.exists():
+        return []
+
+    entries = {}
+    with open(path) as fh:
+        for line in fh:
+            if line.strip():
+                entry = json.loads(line)
+                entries[entry['path']] = entry
+    return list(entries.values())
+
+
+def _append_manifest(entries: List[dict]):
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    with open(ARCHIVE_DIR / MANIFEST_NAME, 'a') as fh:
+        fh.write("".join(json.dumps(entry) + "\n" for entry in entries))
+        fh.flush()
+        os.fsync(fh.fileno())
+
+
+def _write_partition(collection_name: str, partition: str, docs: List[dict]) -> dict:
+    """Batch als zstd-JSONL in die Tages-Partition schreiben, Manifest-Eintrag zurückgeben"""
+    relative = Path(collection_name) / partition / f"part-{docs[0]['_id']}.jsonl.zst"
+    target = ARCHIVE_DIR / relative
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    payload = "\n".join(json_util.dumps(doc, json_options=json_util.RELAXED_JSON_OPTIONS) for doc in docs)
+    tmp = target.with_name(target.name + '.tmp')
+    tmp.write_bytes(zstandard.ZstdCompressor(level=ARCHIVE_ZSTD_LEVEL).compress(payload.encode('utf-8')))
+    os.replace(tmp, target)
+
+    return {
+        'collection': collection_name,
+        'date': partition,
+        'path': relative.as_posix(),
+        'count': len(docs),
+        'first_id': str(docs[0]['_id']),
+        'last_id': str(docs[-1]['_id']),
+        'archived_at': datetime.utcnow().isoformat()
+    }
+
+
+def _write_batch(collection_name: str, docs: List[dict]):
+    """Batch nach Tagen partitionieren und das Manifest einmal fortschreiben"""
+    partitions = defaultdict(list)
+    for doc in docs:
+        partitions[doc['_id'].generation_time.strftime('%Y-%m-%d')].append(doc)
+
+    entries = [_write_partition(collection_name, partition, partition_docs)
+               for partition, partition_docs in partitions.items()]
+    _append_manifest(entries)
+
+
+async def archive_expired(collection_name: str, cutoff: datetime,
+                          extra_filter: Optional[Dict[str, Any]] = None) -> int:
+    """Dokumente älter als cutoff in _id-Bereichen archivieren und löschen
+
+    Die Auswahl läuft über den _id-Index (ObjectIds sind zeitlich sortiert),
+    daher braucht es keinen Index auf created_at. extra_filter schränkt die
+    Auswahl weiter ein, z.B. auf abgeschlossene Tasks.
+    """
+    collection = db[collection_name]
+    upper = ObjectId.from_datetime(cutoff)
+
+    archived = 0
+    last_id = None
+    while True:
+        id_range = {'$lt': upper}
+        if last_id is not None:
+            id_range['$gt'] = last_id
+
+        query = {'_id': id_range, **(extra_filter or {})}
+        docs = await collection.find(query).sort('_id', 1).limit(ARCHIVE_BATCH_SIZE).to_list(ARCHIVE_BATCH_SIZE)
+        if not docs:
+            break
+
+        # Erst schreiben, dann löschen: ein Abbruch verliert keine Daten.
+        # Doppelt archivierte Dokumente filtert iter_archived über die _id heraus.
+        await asyncio.to_thread(_write_batch, collection_name, docs)
+
+        await collection.delete_many({'_id': {'$in': [doc['_id'] for doc in docs]}})
+
+        archived += len(docs)
+        last_id = docs[-1]['_id']
+
+        # Drosselung zwischen den Batches
+        await asyncio.sleep(ARCHIVE_BATCH_PAUSE_SECONDS)
+
+    if archived:
+        logger.info(f"{archived} Dokumente aus {collection_name} archiviert")
+    return archived
+
+
+def list_archive(collection_name: Optional[str] = None) -> List[dict]:
+    """Manifest-Einträge, optional gefiltert nach Collection"""
+    files = _load_manifest()
+    if collection_name is not None:
+        files = [f for f in files if f['collection'] == collection_name]
+    return sorted(files, key=lambda f: (f['collection'], f['date'], f['first_id']))
+
+
+def iter_archived(collection_name: str, start: Optional[date] = None, end: Optional[date] = None) -> Iterator[dict]:
+    """Archivierte Dokumente einer Collection im Datumsbereich lesen
+
+    Nach einem Abbruch zwischen Schreiben und Löschen kann ein Dokument in
+    zwei Dateien stehen; es wird nur einmal geliefert.
+    """
+    seen = set()
+    for entry in list_archive(collection_name):
+        if start and entry['date'] < start.isoformat():
+            continue
+        if end and entry['date'] > end.isoformat():
+            continue
+
+        with open(ARCHIVE_DIR / entry['path'], 'rb') as fh:
+            reader = zstandard.ZstdDecompressor().stream_reader(fh)
+            for line in io.TextIOWrapper(reader, encoding='utf-8'):
+                doc = json_util.loads(line)
+                if doc['_id'] in seen:
+                    continue
+                seen.add(doc['_id'])
+                yield doc
+
+
+def read_archived(collection_name: str, start: Optional[date] = None, end: Optional[date] = None,
+                  limit: int = 100) -> List[dict]:
+    """Bis zu limit archivierte Dokumente ohne _id zurückgeben"""
+    docs = islice(iter_archived(collection_name, start, end), limit)
+    return [{k: v for k, v in doc.items() if k != '_id'} for doc in docs]
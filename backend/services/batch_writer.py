@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from pymongo.write_concern import WriteConcern
+
+from database import db
+from services.metrics import registry
+
+ROOT_DIR = Path(__file__).parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+
+def _write_concern_from_env() -> WriteConcern:
+    w = os.environ.get('BATCH_WRITE_CONCERN', '1')
+    return WriteConcern(w=int(w) if w.isdigit() else w)
+
+
+class BatchWriter:
+    """Buffers writes per collection and flushes them in bulk on size or time"""
+
+    def __init__(self, max_batch_size: int = 500, flush_interval: float = 0.05,
+                 max_pending: int = 10000, write_concern: Optional[WriteConcern] = None):
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.write_concern = write_concern or WriteConcern(w=1)
+
+        self._inserts: Dict[str, List[Tuple[dict, Optional[asyncio.Future]]]] = defaultdict(list)
+        self._updates: Dict[str, List[Tuple[UpdateOne, Optional[asyncio.Future]]]] = defaultdict(list)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    @property
+    def pending(self) -> int:
+        return sum(len(ops) for ops in self._inserts.values()) + sum(len(ops) for ops in self._updates.values())
+
+    def start(self):
+        """Start the background flusher on the running event loop"""
+        if self._flusher is not None and not self._flusher.done():
+            return
+        self._stopping = False
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+            self._wakeup = asyncio.Event()
+            self._flush_lock = asyncio.Lock()
+        self._flusher = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Let the flusher finish its current flush, then write everything still buffered"""
+        if self._flusher is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._flusher
+            self._flusher = None
+        if self._flush_lock is not None:
+            await self.flush()
+
+    async def insert(self, collection_name: str, document: dict, wait: bool = False):
+        """Queue an insert; with wait=True return only once it has been flushed"""
+        await self._enqueue('_inserts', collection_name, dict(document), wait)
+
+    async def update(self, collection_name: str, filter: Dict[str, Any], update: Dict[str, Any],
+                     upsert: bool = False, wait: bool = False):
+        """Queue an update_one; updates of a collection are applied in queue order"""
+        await self._enqueue('_updates', collection_name, UpdateOne(filter, update, upsert=upsert), wait)
+
+    async def _enqueue(self, buffer_name: str, collection_name: str, operation, wait: bool):
+        self.start()
+
+        # Backpressure: block producers while max_pending writes are buffered
+        await self._slots.acquire()
+
+        # Resolve the buffer only now, flush() may have swapped it while we waited
+        buffer = getattr(self, buffer_name)
+        future = asyncio.get_running_loop().create_future() if wait else None
+        buffer[collection_name].append((operation, future))
+        if len(buffer[collection_name]) >= self.max_batch_size:
+            self._wakeup.set()
+
+        if future is not None:
+            await future
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Batch flush failed: {str(e)}")
+
+    async def flush(self):
+        """Write all buffered operations, inserts before updates"""
+        async with self._flush_lock:
+            inserts, self._inserts = self._inserts, defaultdict(list)
+            updates, self._updates = self._updates, defaultdict(list)
+
+            try:
+                for collection_name, operations in inserts.items():
+                    while operations:
+                        batch = operations[:self.max_batch_size]
+                        del operations[:len(batch)]
+                        await self._write(collection_name, batch, ordered=False)
+
+                # Updates stay ordered so a status change never overtakes an earlier one
+                for collection_name, operations in updates.items():
+                    while operations:
+                        batch = operations[:self.max_batch_size]
+                        del operations[:len(batch)]
+                        await self._write(collection_name, batch, ordered=True)
+            finally:
+                # Operations not yet handed to _write (e.g. on cancellation) go back to the front
+                for collection_name, operations in inserts.items():
+                    self._inserts[collection_name][:0] = operations
+                for collection_name, operations in updates.items():
+                    self._updates[collection_name][:0] = operations
+
+    async def _write(self, collection_name: str, operations: list, ordered: bool):
+        collection = db.get_collection(collection_name, write_concern=self.write_concern)
+        requests = [operation for operation, _ in operations]
+        failed: Dict[int, BaseException] = {}
+
+        try:
+            if isinstance(requests[0], UpdateOne):
+                await collection.bulk_write(requests, ordered=ordered)
+            else:
+                await collection.insert_many(requests, ordered=ordered)
+        except BulkWriteError as e:
+            write_errors = e.details.get('writeErrors', [])
+            for error in write_errors:
+                failed[error['index']] = e
+            if ordered and write_errors:
+                # Ordered writes stop at the first error
+                first = write_errors[0]['index']
+                failed.update({index: e for index in range(first, len(requests))})
+            logger.error(f"Batch write to {collection_name} partially failed: {len(failed)} of {len(requests)} operations")
+        except Exception as e:
+            failed = {index: e for index in range(len(requests))}
+            logger.error(f"Batch write to {collection_name} failed: {str(e)}")
+        except BaseException:
+            # Cancelled mid-write: the outcome is unknown, so waiters must not be told it succeeded
+            interrupted = RuntimeError(f"Batch write to {collection_name} was interrupted")
+            failed = {index: interrupted for index in range(len(requests))}
+            logger.error(str(interrupted))
+            raise
+        finally:
+            for index, (_, future) in enumerate(operations):
+                if future is not None and not future.done():
+                    if index in failed:
+                        future.set_exception(failed[index])
+                    else:
+                        future.set_result(None)
+                self._slots.release()
+
+
+batch_writer = BatchWriter(
+    max_batch_size=int(os.environ.get('BATCH_WRITER_MAX_BATCH', 500)),
+    flush_interval=float(os.environ.get('BATCH_WRITER_FLUSH_MS', 50)) / 1000,
+    max_pending=int(os.environ.get('BATCH_WRITER_MAX_PENDING', 10000)),
+    write_concern=_write_concern_from_env()
+)
+registry.register_collector(lambda: [
+    '# TYPE batch_writer_pending_operations gauge',
+    f'batch_writer_pending_operations {batch_writer.pending}'
+])
@@ -0,0 +1,148 @@
+import hashlib
+import logging
+import math
+import re
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+
+from repositories.base import Storage
+
+logger = logging.getLogger(__name__)
+
+# 2**14 registers: standard error 1.04 / sqrt(16384) = 0.8%, 16 KB per sketch
+HLL_PRECISION = 14
+HLL_REGISTERS = 1 << HLL_PRECISION
+HLL_ALPHA = 0.7213 / (1 + 1.079 / HLL_REGISTERS)
+
+# Sketches kept per lead; each counts distinct values of one key
+SKETCHES = ('businesses', 'domains', 'cities')
+
+_CITY_RE = re.compile(r',\s*([^,]+?),\s*([A-Z]{2})\s+\d{5}')
+
+
+def hash_values(values: Iterable[str]) -> np.ndarray:
+    """64-bit hashes the registers are derived from"""
+    return np.fromiter((int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+                        for value in values), dtype=np.uint64)
+
+
+class HyperLogLog:
+    """Distinct-count sketch with mergeable registers
+
+    Two sketches merge by taking the register-wise maximum, so per-day and
+    per-search sketches combine into any range without touching the leads.
+    """
+
+    def __init__(self, registers: Optional[bytes] = None):
+        self.registers = (np.frombuffer(registers, dtype=np.uint8).copy() if registers
+                          else np.zeros(HLL_REGISTERS, dtype=np.uint8))
+
+    def add(self, value: str):
+        x = int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+        index = x >> (64 - HLL_PRECISION)
+        rest = x & ((1 << (64 - HLL_PRECISION)) - 1)
+        # Position of the first set bit in the remaining 50 bits
+        rank = (64 - HLL_PRECISION) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def add_hashes(self, hashes: np.ndarray) -> 'HyperLogLog':
+        """add() for many hashed values at once"""
+        index = (hashes >> np.uint64(64 - HLL_PRECISION)).astype(np.intp)
+        rest = hashes & np.uint64((1 << (64 - HLL_PRECISION)) - 1)
+        # The float exponent is the bit length; exact, as rest has fewer than 53 bits
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        np.maximum.at(self.registers, index, ((64 - HLL_PRECISION) - bit_length + 1).astype(np.uint8))
+        return self
+
+    def update(self, values: Iterable[str]) -> 'HyperLogLog':
+        return self.add_hashes(hash_values(values))
+
+    def merge(self, other: 'HyperLogLog') -> 'HyperLogLog':
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self) -> int:
+        estimate = HLL_ALPHA * HLL_REGISTERS ** 2 / np.ldexp(1.0, -self.registers.astype(np.int64)).sum()
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Small cardinalities: linear counting is more accurate
+        if estimate <= 2.5 * HLL_REGISTERS and zeros:
+            estimate = HLL_REGISTERS * math.log(HLL_REGISTERS / zeros)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        return self.registers.tobytes()
+
+
+def merge_registers(current: Optional[bytes], update: bytes) -> bytes:
+    return HyperLogLog(current).merge(HyperLogLog(update)).to_bytes()
+
+
+def sketch_values(lead: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """The business, domain and city a lead counts towards"""
+    name = (lead.get('businessName') or '').strip().lower()
+    address = (lead.get('address') or '').strip()
+    host = urlparse(lead.get('website') or '').hostname or ''
+    city = _CITY_RE.search(address)
+    return {
+        'businesses': f"{name}|{address.lower()}" if name else None,
+        'domains': host[4:] if host.startswith('www.') else host or None,
+        'cities': f"{city.group(1).strip().lower()}|{city.group(2)}" if city else None,
+    }
+
+
+def day_key(day: date) -> str:
+    return f"day:{day.isoformat()}"
+
+
+def search_key(search_id: str) -> str:
+    return f"search:{search_id}"
+
+
+# Running sketch over all leads, so all-time counts need no merge
+ALL_KEY = 'all'
+
+
+async def record_leads(storage: Storage, leads: List[Dict[str, Any]]):
+    """Add freshly ingested leads to their day, search and all-time sketches"""
+    groups: Dict[str, List[int]] = {}
+    for position, lead in enumerate(leads):
+        created = lead.get('created_at') if isinstance(lead.get('created_at'), datetime) else datetime.utcnow()
+        keys = [ALL_KEY, day_key(created.date())] + ([search_key(lead['searchId'])] if lead.get('searchId') else [])
+        for key in keys:
+            groups.setdefault(key, []).append(position)
+
+    # Each lead's values are hashed once, whichever sketches they go into
+    values = [sketch_values(lead) for lead in leads]
+    present = {name: np.array([bool(value[name]) for value in values], dtype=bool) for name in SKETCHES}
+    hashes = {name: hash_values(value[name] or '' for value in values) for name in SKETCHES}
+    for key, positions in groups.items():
+        positions = np.array(positions, dtype=np.intp)
+        sketches = {name: HyperLogLog().add_hashes(hashes[name][positions[present[name][positions]]])
+                    for name in SKETCHES}
+        await storage.sketches.merge(key, {name: sketch.to_bytes() for name, sketch in sketches.items()})
+
+
+async def record_leads_safely(storage: Storage, leads: List[Dict[str, Any]]):
+    """record_leads for ingest paths: counts are best effort and must not fail the ingest"""
+    try:
+        await record_leads(storage, leads)
+    except Exception as e:
+        logger.error(f"Updating lead sketches failed: {str(e)}")
+
+
+async def cardinalities(storage: Storage, keys: List[str]) -> Dict[str, int]:
+    """Distinct counts over the union of the given sketches"""
+    merged = {name: HyperLogLog() for name in SKETCHES}
+    for registers in (await storage.sketches.get_many(keys)).values():
+        for name in SKETCHES:
+            if registers.get(name):
+                merged[name].merge(HyperLogLog(registers[name]))
+    return {name: sketch.count() for name, sketch in merged.items()}
+
+
+def day_keys(start: date, end: date) -> List[str]:
+    return [day_key(start + timedelta(days=offset)) for offset in range((end - start).days + 1)]
@@ -0,0 +1,71 @@
+import asyncio
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Hashable, List
+
+from services.metrics import registry
+
+dataloader_batch_size = registry.histogram(
+    'dataloader_batch_size', 'Keys resolved per batched lookup',
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000))
+
+class _Batch:
+    def __init__(self):
+        self.futures: Dict[Hashable, asyncio.Future] = {}
+
+
+class DataLoader:
+    """Coalesces point lookups issued in the same loop tick into one batched query
+
+    batch_fn receives the distinct keys and returns {key: value}; keys it does
+    not return resolve to None. Nothing is cached beyond the batch, so a load
+    after a write sees the write.
+    """
+
+    def __init__(self, name: str, batch_fn: Callable[[List[Any]], Awaitable[Dict[Any, Any]]],
+                 max_batch_size: int = 1000):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        # One pending batch per event loop
+        self._batches: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _Batch]' = weakref.WeakKeyDictionary()
+
+    async def load(self, key: Hashable) -> Any:
+        # Shielded: one caller going away must not cancel the future others share
+        return await asyncio.shield(self._enqueue(key))
+
+    async def load_many(self, keys: List[Hashable]) -> List[Any]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _enqueue(self, key: Hashable) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        batch = self._batches.get(loop)
+        if batch is None:
+            batch = self._batches[loop] = _Batch()
+            # Dispatch once everything scheduled in this tick has queued its key
+            loop.call_soon(self._dispatch, loop)
+
+        future = batch.futures.get(key)
+        if future is None:
+            future = batch.futures[key] = loop.create_future()
+            if len(batch.futures) >= self.max_batch_size:
+                self._dispatch(loop)
+        return future
+
+    def _dispatch(self, loop: asyncio.AbstractEventLoop):
+        batch = self._batches.pop(loop, None)
+        if batch is not None and batch.futures:
+            loop.create_task(self._resolve(batch.futures))
+
+    async def _resolve(self, futures: Dict[Hashable, asyncio.Future]):
+        dataloader_batch_size.observe(len(futures), loader=self.name)
+        try:
+            values = await self.batch_fn(list(futures))
+        except Exception as e:
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in futures.items():
+            if not future.done():
+                future.set_result(values.get(key))
+
@@ -0,0 +1,247 @@
+import hashlib
+import logging
+import os
+import re
+import unicodedata
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import numpy as np
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+
+from database import db
+from models.leads import PLAIN_CODEC
+from repositories.base import Storage
+
+ROOT_DIR = Path(__file__).parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+# MinHash signature length and LSH banding: DEDUPE_BANDS bands of NUM_PERM / BANDS rows.
+# Pairs become candidates around a Jaccard similarity of (1 / bands) ** (1 / rows), 0.5 here.
+DEDUPE_NUM_PERM = int(os.environ.get('DEDUPE_NUM_PERM', 64))
+DEDUPE_BANDS = int(os.environ.get('DEDUPE_BANDS', 16))
+# Estimated Jaccard similarity a candidate pair needs to be merged
+DEDUPE_THRESHOLD = float(os.environ.get('DEDUPE_THRESHOLD', 0.6))
+DEDUPE_BATCH_SIZE = int(os.environ.get('DEDUPE_BATCH_SIZE', 5000))
+
+# Collections holding Google Maps leads, clustered together
+DEDUPE_COLLECTIONS = ('leads', 'google_maps_results')
+
+CLUSTER_NAMESPACE = uuid.UUID('0c2f5e8a-4b7d-4e19-9a3c-6d1e8f2b7a54')
+MERSENNE_PRIME = (1 << 61) - 1
+
+ADDRESS_ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'boulevard': 'blvd', 'road': 'rd', 'drive': 'dr', 'lane': 'ln',
+    'place': 'pl', 'square': 'sq', 'suite': 'ste', 'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+}
+# Fields that make a record a better representative of its cluster
+COMPLETENESS_FIELDS = ('businessName', 'address', 'phone', 'website', 'email', 'rating', 'reviewCount')
+PROJECTION_FIELDS = ('id', 'searchId', 'cluster_id', 'cluster_size', 'cluster_primary', 'score') + COMPLETENESS_FIELDS
+
+_rng = np.random.default_rng(20240501)
+# a * h + b stays below 2**61 for 32-bit h, so uint64 arithmetic does not overflow
+_PERM_A = _rng.integers(1, 1 << 29, DEDUPE_NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 1 << 32, DEDUPE_NUM_PERM, dtype=np.uint64)
+
+
+def normalize(text: Optional[str]) -> str:
+    """Lowercase ASCII words: "Tony's Café" -> "tonys cafe" """
+    text = unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii').lower()
+    text = re.sub(r"['’`]", '', text)
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', text).split())
+
+
+def normalize_address(address: Optional[str]) -> str:
+    return ' '.join(ADDRESS_ABBREVIATIONS.get(word, word) for word in normalize(address).split())
+
+
+def normalize_phone(phone: Optional[str]) -> str:
+    """Digits only, without a leading country code: "+1 (212) 555-0123" -> "2125550123" """
+    return re.sub(r'\D', '', phone or '')[-10:]
+
+
+def _grams(prefix: str, text: str, size: int = 3) -> List[str]:
+    padded = f" {text} "
+    return [prefix + padded[i:i + size] for i in range(max(len(padded) - size + 1, 1))]
+
+
+def shingles(doc: Dict[str, Any]) -> List[str]:
+    """Character 3-grams of name and street, plus locality, phone and website host as whole tokens
+
+    City, state and zip are one token: shared by most leads of a search, as
+    3-grams they would outweigh the name.
+    """
+    street, _, locality = (doc.get('address') or '').partition(',')
+    tokens = _grams('n:', normalize(doc.get('businessName'))) + _grams('a:', normalize_address(street))
+    if locality.strip():
+        tokens.append(f"l:{normalize(locality)}")
+    phone = normalize_phone(doc.get('phone'))
+    if phone:
+        tokens.append(f"p:{phone}")
+    host = urlparse(doc.get('website') or '').hostname or ''
+    if host:
+        tokens.append(f"w:{host[4:] if host.startswith('www.') else host}")
+    return tokens
+
+
+def minhash(tokens: Iterable[str]) -> np.ndarray:
+    hashes = np.fromiter((int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=4).digest(), 'big')
+                          for token in set(tokens)), dtype=np.uint64)
+    if not len(hashes):
+        return np.full(DEDUPE_NUM_PERM, np.iinfo(np.uint32).max, dtype=np.uint32)
+    permuted = (hashes[:, None] * _PERM_A + _PERM_B) % MERSENNE_PRIME
+    return (permuted & 0xFFFFFFFF).min(axis=0).astype(np.uint32)
+
+
+def cluster_labels(signatures: np.ndarray, bands: int = DEDUPE_BANDS,
+                   threshold: float = DEDUPE_THRESHOLD) -> np.ndarray:
+    """Connected components of similar signatures; label = index of the component's root
+
+    Each band groups the rows whose band slice is identical. Members of a group
+    are verified against the group's first member only, so a band costs
+    O(n log n) however large its groups get; pairs missed that way usually
+    meet again in another band.
+    """
+    count, num_perm = signatures.shape
+    rows = num_perm // bands
+    parent = np.arange(count)
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for band in range(bands):
+        keys = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows]).view(
+            np.dtype((np.void, rows * signatures.itemsize))).ravel()
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        # Start of each run of equal band keys
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        ends = np.r_[starts[1:], count]
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            if end - start < 2:
+                continue
+            anchor, members = order[start], order[start + 1:end]
+            similarity = (signatures[members] == signatures[anchor]).mean(axis=1)
+            for member in members[similarity >= threshold].tolist():
+                root_a, root_b = find(int(anchor)), find(member)
+                if root_a != root_b:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    return np.array([find(i) for i in range(count)])
+
+
+def _completeness(doc: Dict[str, Any]) -> Tuple:
+    filled = sum(1 for field in COMPLETENESS_FIELDS if doc.get(field) not in (None, ''))
+    return doc.get('score') or 0, filled
+
+
+def assign_clusters(docs: List[Dict[str, Any]], labels: np.ndarray) -> List[Dict[str, Any]]:
+    """Cluster fields per document: id, size and whether it represents its cluster
+
+    Singletons get None fields. Cluster ids derive from the smallest member id,
+    so they stay stable while the cluster keeps that member.
+    """
+    members: Dict[int, List[int]] = {}
+    for index, label in enumerate(labels.tolist()):
+        members.setdefault(label, []).append(index)
+
+    fields: List[Dict[str, Any]] = [{'cluster_id': None, 'cluster_size': None, 'cluster_primary': None}] * len(docs)
+    for indices in members.values():
+        if len(indices) < 2:
+            continue
+        cluster_id = str(uuid.uuid5(CLUSTER_NAMESPACE, min(docs[i]['id'] for i in indices)))
+        primary = max(indices, key=lambda i: (_completeness(docs[i]), docs[i]['id']))
+        for i in indices:
+            fields[i] = {'cluster_id': cluster_id, 'cluster_size': len(indices), 'cluster_primary': i == primary}
+    return fields
+
+
+def one_per_cluster(leads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Keep one lead per cluster, the cluster's primary where it is in the list, in list order"""
+    chosen: Dict[str, Dict[str, Any]] = {}
+    for lead in leads:
+        cluster_id = lead.get('cluster_id')
+        if cluster_id and (cluster_id not in chosen
+                           or lead.get('cluster_primary') and not chosen[cluster_id].get('cluster_primary')):
+            chosen[cluster_id] = lead
+    return [lead for lead in leads if not lead.get('cluster_id') or chosen[lead['cluster_id']] is lead]
+
+
+async def _scan(storage: Storage, collection_name: str) -> AsyncIterator[List[Dict[str, Any]]]:
+    if collection_name == 'leads':
+        async for batch in storage.leads.scan(PROJECTION_FIELDS, DEDUPE_BATCH_SIZE):
+            yield batch
+        return
+    projection = {'_id': 0, **{field: 1 for field in PROJECTION_FIELDS}}
+    batch = []
+    async for doc in db[collection_name].find(projection=projection).batch_size(DEDUPE_BATCH_SIZE):
+        batch.append(doc)
+        if len(batch) == DEDUPE_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _write(storage: Storage, collection_name: str, clusters: Dict[str, Dict[str, Any]]) -> None:
+    if collection_name == 'leads':
+        await storage.leads.set_clusters(clusters)
+    elif clusters:
+        # Singletons lose their cluster fields: None unsets
+        await db[collection_name].bulk_write([UpdateOne({'id': lead_id}, PLAIN_CODEC.update(fields))
+                                              for lead_id, fields in clusters.items()], ordered=False)
+
+
+async def dedupe_leads(storage: Storage, collections: Tuple[str, ...] = DEDUPE_COLLECTIONS) -> Dict[str, int]:
+    """Cluster near-duplicate leads across collections and write the cluster fields back
+
+    Leads go through the storage's lead repository; the scheduler's own
+    collections live in MongoDB and are only included when the storage is
+    MongoDB too. Only documents whose cluster fields change are written; the
+    searches of changed leads get a new results version, so cached results
+    refresh.
+    """
+    collections = tuple(name for name in collections if name == 'leads' or storage.name == 'mongo')
+    keys: List[Tuple[str, Dict[str, Any]]] = []
+    signatures = []
+    for collection_name in collections:
+        async for batch in _scan(storage, collection_name):
+            for doc in batch:
+                if doc.get('id'):
+                    keys.append((collection_name, doc))
+                    signatures.append(minhash(shingles(doc)))
+    if not keys:
+        return {'documents': 0, 'clusters': 0, 'updated': 0}
+
+    labels = cluster_labels(np.vstack(signatures))
+    fields = assign_clusters([doc for _, doc in keys], labels)
+
+    updates: Dict[str, Dict[str, Dict[str, Any]]] = {name: {} for name in collections}
+    changed_searches = set()
+    for (collection_name, doc), new in zip(keys, fields):
+        if all(doc.get(name) == value for name, value in new.items()):
+            continue
+        updates[collection_name][doc['id']] = new
+        if collection_name == 'leads' and doc.get('searchId'):
+            changed_searches.add(doc['searchId'])
+
+    updated = 0
+    for collection_name, clusters in updates.items():
+        lead_ids = list(clusters)
+        for start in range(0, len(lead_ids), DEDUPE_BATCH_SIZE):
+            await _write(storage, collection_name,
+                         {lead_id: clusters[lead_id] for lead_id in lead_ids[start:start + DEDUPE_BATCH_SIZE]})
+        updated += len(clusters)
+    await storage.searches.bump_results_versions(sorted(changed_searches))
+
+    clusters = len({f['cluster_id'] for f in fields if f['cluster_id']})
+    logger.info(f"Dedupe: {len(keys)} documents, {clusters} clusters, {updated} updated")
+    return {'documents': len(keys), 'clusters': clusters, 'updated': updated}
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from database import db
+
+ROOT_DIR = Path(__file__).parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+# Intervallgrenzen für Scrapes eines Ziels (Minuten)
+FRESHNESS_MIN_INTERVAL_MINUTES = int(os.environ.get('FRESHNESS_MIN_INTERVAL_MINUTES', 120))
+FRESHNESS_MAX_INTERVAL_MINUTES = int(os.environ.get('FRESHNESS_MAX_INTERVAL_MINUTES', 2880))
+# Gewicht des letzten Laufs in der geglätteten Änderungsrate
+FRESHNESS_EWMA_ALPHA = float(os.environ.get('FRESHNESS_EWMA_ALPHA', 0.5))
+
+# Felder, die nicht zum Inhalt eines Leads zählen
+VOLATILE_FIELDS = {'_id', 'id', 'searchId', 'task_id', 'created_at', 'change_type'}
+
+
+def target_key(target: Dict[str, Any]) -> str:
+    """Schlüssel eines Scrape-Ziels (Query + Ort)"""
+    return "|".join(str(target.get(field, '')).strip().lower() for field in ('query', 'city', 'state'))
+
+
+def lead_fingerprint(doc: Dict[str, Any]) -> Tuple[str, str]:
+    """Identitäts-Hash (Name + Adresse) und Inhalts-Hash eines Leads
+
+    Die Identität wird gehasht, weil sie als Feldname in Mongo gespeichert wird:
+    Namen wie "Dr. Smith" oder "$5 Pizza" sind dort keine gültigen Schlüssel.
+    """
+    identity = f"{doc.get('businessName', '').strip().lower()}|{doc.get('address', '').strip().lower()}"
+    key = hashlib.sha1(identity.encode('utf-8')).hexdigest()[:16]
+    content = {k: v for k, v in doc.items() if k not in VOLATILE_FIELDS}
+    digest = hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return key, digest
+
+
+def compute_delta(previous: Dict[str, str], docs: List[dict]) -> Tuple[List[dict], Dict[str, str], float, str]:
+    """Neue und geänderte Leads gegenüber dem letzten Lauf bestimmen
+
+    Liefert (Delta-Dokumente, neue Fingerprints, Anteil geänderter Leads, Ergebnis-Hash).
+    """
+    fingerprints = {}
+    delta = []
+    for doc in docs:
+        key, digest = lead_fingerprint(doc)
+        fingerprints[key] = digest
+        if key not in previous:
+            delta.append({**doc, 'change_type': 'new'})
+        elif previous[key] != digest:
+            delta.append({**doc, 'change_type': 'changed'})
+
+    removed = len(set(previous) - set(fingerprints))
+    universe = len(set(previous) | set(fingerprints))
+    changed_fraction = (len(delta) + removed) / universe if universe else 0.0
+    result_hash = hashlib.sha1("".join(sorted(fingerprints.values())).encode('utf-8')).hexdigest()
+    return delta, fingerprints, changed_fraction, result_hash
+
+
+def next_interval_minutes(change_rate: float) -> int:
+    """Scrape-Intervall aus der Änderungsrate: stabile Märkte seltener scrapen"""
+    floor = FRESHNESS_MIN_INTERVAL_MINUTES / FRESHNESS_MAX_INTERVAL_MINUTES
+    return int(FRESHNESS_MIN_INTERVAL_MINUTES / max(change_rate, floor))
+
+
+def is_due(record: Optional[Dict[str, Any]], now: datetime) -> bool:
+    """Ziel ist fällig, wenn es nie gescrapt wurde oder sein Intervall abgelaufen ist"""
+    return record is None or record.get('next_due_at', now) <= now
+
+
+async def get_records(targets: List[Dict[str, Any]]) -> Dict[str, dict]:
+    """Freshness-Records aller Ziele mit einer Abfrage laden"""
+    keys = [target_key(target) for target in targets]
+    records = await db.scrape_freshness.find({'key': {'$in': keys}}, {'_id': 0}).to_list(len(keys))
+    return {record['key']: record for record in records}
+
+
+async def save_record(target: Dict[str, Any], record: Optional[Dict[str, Any]], fingerprints: Dict[str, str],
+                      changed_fraction: float, result_hash: str, now: datetime) -> Dict[str, Any]:
+    """Freshness-Record nach einem Scrape fortschreiben"""
+    if record is None:
+        change_rate = 1.0
+    else:
+        change_rate = FRESHNESS_EWMA_ALPHA * changed_fraction + (1 - FRESHNESS_EWMA_ALPHA) * record.get('change_rate', 1.0)
+
+    interval = next_interval_minutes(change_rate)
+    updated = {
+        'key': target_key(target),
+        'target': {field: target.get(field) for field in ('query', 'city', 'state')},
+        'last_scraped_at': now,
+        'next_due_at': now + timedelta(minutes=interval),
+        'change_rate': round(change_rate, 4),
+        'last_changed_fraction': round(changed_fraction, 4),
+        'result_hash': result_hash,
+        'fingerprints': fingerprints,
+        'scrape_count': (record or {}).get('scrape_count', 0) + 1
+    }
+    await db.scrape_freshness.update_one({'key': updated['key']}, {'$set': updated}, upsert=True)
+    return updated
@@ -0,0 +1,151 @@
+import hashlib
+import math
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from services.metrics import registry
+
+ROOT_DIR = Path(__file__).parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+# Tile aggregates: each tile is split into 2**GEO_TILE_CELL_ZOOM cells per side
+GEO_TILE_CELL_ZOOM = int(os.environ.get('GEO_TILE_CELL_ZOOM', 3))
+GEO_TILE_CACHE_TTL_SECONDS = float(os.environ.get('GEO_TILE_CACHE_TTL_SECONDS', 60))
+GEO_TILE_CACHE_SIZE = int(os.environ.get('GEO_TILE_CACHE_SIZE', 4096))
+GEO_MAX_RADIUS_KM = float(os.environ.get('GEO_MAX_RADIUS_KM', 100))
+GEO_MAX_ZOOM = 22
+
+EARTH_RADIUS_M = 6371008.8
+# Web Mercator stops here; tiles cover exactly this latitude range
+MAX_MERCATOR_LAT = 85.0511287798
+
+# (lng, lat) of the cities the mock provider and the synthetic dataset use
+CITY_CENTERS = {
+    ('new york', 'NY'): (-73.9857, 40.7484), ('los angeles', 'CA'): (-118.2437, 34.0522),
+    ('chicago', 'IL'): (-87.6298, 41.8781), ('houston', 'TX'): (-95.3698, 29.7604),
+    ('phoenix', 'AZ'): (-112.0740, 33.4484), ('philadelphia', 'PA'): (-75.1652, 39.9526),
+    ('san antonio', 'TX'): (-98.4936, 29.4241), ('san diego', 'CA'): (-117.1611, 32.7157),
+    ('dallas', 'TX'): (-96.7970, 32.7767), ('austin', 'TX'): (-97.7431, 30.2672),
+    ('miami', 'FL'): (-80.1918, 25.7617), ('seattle', 'WA'): (-122.3321, 47.6062),
+    ('denver', 'CO'): (-104.9903, 39.7392), ('boston', 'MA'): (-71.0589, 42.3601),
+    ('portland', 'OR'): (-122.6765, 45.5152), ('münchen', 'BY'): (11.5820, 48.1351),
+    ('berlin', 'BE'): (13.4050, 52.5200), ('hamburg', 'HH'): (9.9937, 53.5511),
+    ('beverly hills', 'CA'): (-118.4004, 34.0736),
+}
+
+geo_tile_cache_requests = registry.counter('geo_tile_cache_requests_total', 'Tile aggregate lookups by cache result')
+
+GeoBox = Tuple[float, float, float, float]
+
+
+def point(lng: float, lat: float) -> Dict[str, Any]:
+    """GeoJSON point; GeoJSON orders coordinates longitude first"""
+    return {'type': 'Point', 'coordinates': [lng, lat]}
+
+
+def _unit(seed: str) -> Tuple[float, float]:
+    digest = hashlib.sha1(seed.encode('utf-8')).digest()
+    return int.from_bytes(digest[:4], 'big') / 2 ** 32, int.from_bytes(digest[4:8], 'big') / 2 ** 32
+
+
+def city_center(city: str, state: str) -> Tuple[float, float]:
+    """Known city center, otherwise a stable point inside the contiguous US"""
+    center = CITY_CENTERS.get((city.strip().lower(), state.strip().upper()))
+    if center:
+        return center
+    u, v = _unit(f"{city.strip().lower()}|{state.strip().upper()}")
+    return -124 + u * 57, 25 + v * 24
+
+
+def synthetic_point(city: str, state: str, key: str, spread_km: float = 8.0) -> Dict[str, Any]:
+    """Point near the city center, stable per key so re-scrapes do not move a lead"""
+    lng, lat = city_center(city, state)
+    u, v = _unit(key)
+    # Uniform over a disc of radius spread_km
+    distance = spread_km * 1000 * math.sqrt(u)
+    bearing = 2 * math.pi * v
+    dlat = math.degrees(distance * math.cos(bearing) / EARTH_RADIUS_M)
+    dlng = math.degrees(distance * math.sin(bearing) / (EARTH_RADIUS_M * math.cos(math.radians(lat))))
+    return point(round(lng + dlng, 6), round(lat + dlat, 6))
+
+
+def coordinates(doc: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    location = doc.get('location')
+    if not location or not location.get('coordinates'):
+        return None
+    lng, lat = location['coordinates'][:2]
+    return lng, lat
+
+
+def haversine_m(lng1: float, lat1: float, lng2: float, lat2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def radius_box(lng: float, lat: float, radius_m: float) -> GeoBox:
+    """Bounding box containing the circle, for index prefilters"""
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    cos_lat = math.cos(math.radians(min(abs(lat) + dlat, 90)))
+    dlng = 180 if cos_lat < 1e-9 else min(180, math.degrees(radius_m / (EARTH_RADIUS_M * cos_lat)))
+    return max(-180, lng - dlng), max(-90, lat - dlat), min(180, lng + dlng), min(90, lat + dlat)
+
+
+def tile_of(lng: float, lat: float, zoom: int) -> Tuple[int, int]:
+    """Web Mercator (slippy map) tile containing the point"""
+    n = 2 ** zoom
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    x = int((lng + 180) / 360 * n)
+    y = int((1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bounds(z: int, x: int, y: int) -> GeoBox:
+    """(min_lng, min_lat, max_lng, max_lat) of a tile"""
+    n = 2 ** z
+
+    def lat_of(row: int) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360 - 180, lat_of(y + 1), (x + 1) / n * 360 - 180, lat_of(y)
+
+
+class TileCache:
+    """LRU of tile aggregates with a TTL
+
+    Entries expire after ttl seconds so tiles pick up leads written by other
+    processes; clear() drops everything right after this process ingests.
+    """
+
+    def __init__(self, ttl: float = GEO_TILE_CACHE_TTL_SECONDS, max_entries: int = GEO_TILE_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self._entries.pop(key, None)
+            geo_tile_cache_requests.inc(result='miss')
+            return None
+        self._entries.move_to_end(key)
+        geo_tile_cache_requests.inc(result='hit')
+        return entry[1]
+
+    def put(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+tile_cache = TileCache()
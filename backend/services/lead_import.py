@@ -0,0 +1,317 @@
+import asyncio
+import codecs
+import csv
+import logging
+import os
+import time
+import zlib
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import orjson
+from dotenv import load_dotenv
+from pydantic import ValidationError
+
+from models.leads import LeadListAdapter, LeadResult, dump_leads
+from repositories.base import Storage
+from services.cardinality import record_leads_safely
+from services.metrics import registry
+from services.scoring import apply_scores
+
+ROOT_DIR = Path(__file__).parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+# Rows validated and inserted together; one batch is written while the next is parsed
+LEAD_IMPORT_BATCH_SIZE = int(os.environ.get('LEAD_IMPORT_BATCH_SIZE', 5000))
+# Rejected rows listed in the report; the rest are only counted
+LEAD_IMPORT_MAX_REPORTED_ERRORS = int(os.environ.get('LEAD_IMPORT_MAX_REPORTED_ERRORS', 100))
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+GZIP_MAGIC = b'\x1f\x8b'
+# zlib window bits that expect a gzip header and trailer
+GZIP_WBITS = zlib.MAX_WBITS | 16
+
+# CSV headers are matched case-insensitively: the export's headers, a few common
+# spellings and the API field names. Other columns are ignored.
+CSV_COLUMNS: Dict[str, str] = {
+    **{name.lower(): name for name in LeadResult.model_fields if name not in ('location', 'searchId')},
+    'business name': 'businessName', 'name': 'businessName', 'type': 'businessType', 'category': 'businessType',
+    'reviews': 'reviewCount', 'review count': 'reviewCount',
+    'latitude': 'latitude', 'lat': 'latitude', 'longitude': 'longitude', 'lng': 'longitude', 'lon': 'longitude',
+}
+
+lead_import_rows = registry.counter('lead_import_rows_total', 'Imported lead rows by outcome')
+
+
+def detect_format(content_type: Optional[str], filename: Optional[str]) -> Optional[str]:
+    """csv or jsonl from the upload's content type or file name"""
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if content_type in ('text/csv', 'application/csv'):
+        return 'csv'
+    if content_type in ('application/x-ndjson', 'application/jsonl', 'application/json-lines'):
+        return 'jsonl'
+    name = (filename or '').lower()
+    if name.endswith('.gz'):
+        name = name[:-3]
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    return None
+
+
+async def decompressed(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """The body as is, or gunzipped incrementally if it starts with the gzip magic"""
+    gzipped: Optional[bool] = None
+    head = b''
+    decompressor = zlib.decompressobj(wbits=GZIP_WBITS)
+    async for chunk in chunks:
+        if gzipped is None:
+            head += chunk
+            if len(head) < len(GZIP_MAGIC):
+                continue
+            gzipped, chunk, head = head.startswith(GZIP_MAGIC), head, b''
+        if not gzipped:
+            yield chunk
+            continue
+        while chunk:
+            yield decompressor.decompress(chunk)
+            chunk = b''
+            # Concatenated gzip members, as written by appending to a .gz file
+            if decompressor.eof and decompressor.unused_data:
+                chunk = decompressor.unused_data
+                decompressor = zlib.decompressobj(wbits=GZIP_WBITS)
+    if head:
+        yield head
+    if gzipped and not decompressor.eof:
+        raise ValueError("Truncated gzip stream")
+
+
+async def text_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[List[str]]:
+    """Complete UTF-8 lines, a list per chunk, without their line endings"""
+    # utf-8-sig drops the byte order mark spreadsheet exports start with
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    pending = ''
+    async for chunk in chunks:
+        lines = (pending + decoder.decode(chunk)).split('\n')
+        pending = lines.pop()
+        if lines:
+            yield [line.rstrip('\r') for line in lines]
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield [pending.rstrip('\r')]
+
+
+class CsvRows:
+    """Turns lines into lead fields, one CSV record at a time
+
+    Quoted values may span lines: a record is complete once it holds an even
+    number of quotes. Rows are numbered by the line they start on.
+    """
+
+    def __init__(self):
+        self.columns: Optional[List[Optional[str]]] = None
+        self.line = 0
+        self._start = 0
+        self._partial: List[str] = []
+        self._quotes = 0
+
+    def feed(self, lines: List[str]) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[Dict[str, Any]]]:
+        records = []
+        for line in lines:
+            self.line += 1
+            if not self._partial:
+                self._start = self.line
+            self._partial.append(line)
+            self._quotes += line.count('"')
+            if self._quotes % 2 == 0:
+                records.append((self._start, '\n'.join(self._partial)))
+                self._partial, self._quotes = [], 0
+        return self._rows(records)
+
+    def finish(self) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[Dict[str, Any]]]:
+        """The last record, even with an unterminated quote"""
+        records = [(self._start, '\n'.join(self._partial))] if self._partial else []
+        self._partial, self._quotes = [], 0
+        return self._rows(records)
+
+    def _rows(self, records: List[Tuple[int, str]]):
+        rows, errors = [], []
+        for (line, _), values in zip(records, csv.reader(text for _, text in records)):
+            if not any(value.strip() for value in values):
+                continue
+            if self.columns is None:
+                self.columns = [CSV_COLUMNS.get(name.strip().lower()) for name in values]
+                continue
+            fields = {column: value for column, value in zip(self.columns, values) if column and value != ''}
+            latitude, longitude = fields.pop('latitude', None), fields.pop('longitude', None)
+            if latitude is not None and longitude is not None:
+                fields['location'] = {'type': 'Point', 'coordinates': [longitude, latitude]}
+            rows.append((line, fields))
+        return rows, errors
+
+
+class JsonlRows:
+    """Turns lines into lead fields, one JSON object per line"""
+
+    def __init__(self):
+        self.line = 0
+
+    def feed(self, lines: List[str]) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[Dict[str, Any]]]:
+        rows, errors = [], []
+        for line in lines:
+            self.line += 1
+            if not line.strip():
+                continue
+            try:
+                fields = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
+                errors.append(_row_error(self.line, None, f"Invalid JSON: {e}"))
+                continue
+            if not isinstance(fields, dict):
+                errors.append(_row_error(self.line, None, "Expected a JSON object"))
+                continue
+            rows.append((self.line, fields))
+        return rows, errors
+
+    def finish(self):
+        return [], []
+
+
+def _row_error(row: int, field: Optional[str], message: str) -> Dict[str, Any]:
+    return {'row': row, 'errors': [{'field': field, 'message': message}]}
+
+
+def validate_rows(rows: List[Tuple[int, Dict[str, Any]]],
+                  search_id: str) -> Tuple[List[Tuple[int, Dict[str, Any]]], List[Dict[str, Any]]]:
+    """Validate a batch in one call; rows that fail are reported and the rest validated again"""
+    docs = [{**fields, 'searchId': search_id} for _, fields in rows]
+    try:
+        leads = dump_leads(LeadListAdapter.validate_python(docs))
+        return list(zip((line for line, _ in rows), leads)), []
+    except ValidationError as e:
+        failed = defaultdict(list)
+        for error in e.errors(include_url=False):
+            index, *path = error['loc']
+            failed[index].append({'field': '.'.join(str(part) for part in path) or None, 'message': error['msg']})
+
+    valid = [index for index in range(len(rows)) if index not in failed]
+    leads = dump_leads(LeadListAdapter.validate_python([docs[index] for index in valid]))
+    errors = [{'row': rows[index][0], 'errors': messages} for index, messages in sorted(failed.items())]
+    return [(rows[index][0], lead) for index, lead in zip(valid, leads)], errors
+
+
+class LeadImport:
+    """One import into a search: batches rows, writes them and keeps the report
+
+    Progress is visible while it runs through the search's results_count.
+    """
+
+    def __init__(self, storage: Storage, search_id: str, batch_size: int = LEAD_IMPORT_BATCH_SIZE,
+                 max_errors: int = LEAD_IMPORT_MAX_REPORTED_ERRORS):
+        self.storage = storage
+        self.search_id = search_id
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.rows = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.started = time.perf_counter()
+
+    def _note(self, errors: List[Dict[str, Any]]):
+        self.errors.extend(errors[:max(self.max_errors - len(self.errors), 0)])
+
+    def reject(self, errors: List[Dict[str, Any]]):
+        self.rejected += len(errors)
+        lead_import_rows.inc(len(errors), result='rejected')
+        self._note(errors)
+
+    def prepare(self, rows: List[Tuple[int, Dict[str, Any]]]) -> List[Tuple[int, Dict[str, Any]]]:
+        """Validated and scored leads of a batch, with their rows"""
+        valid, errors = validate_rows(rows, self.search_id)
+        self.reject(errors)
+        apply_scores([lead for _, lead in valid])
+        return valid
+
+    async def write(self, valid: List[Tuple[int, Dict[str, Any]]]):
+        leads = [lead for _, lead in valid]
+        skipped = set(await self.storage.leads.insert_new(leads))
+        if skipped:
+            self.duplicates += len(skipped)
+            lead_import_rows.inc(len(skipped), result='duplicate')
+            self._note([_row_error(valid[index][0], 'id', "Lead already exists") for index in sorted(skipped)])
+            leads = [lead for index, lead in enumerate(leads) if index not in skipped]
+        self.imported += len(leads)
+        lead_import_rows.inc(len(leads), result='imported')
+        await record_leads_safely(self.storage, leads)
+        await self.storage.searches.set_results_count(self.search_id, self.imported)
+
+    async def run(self, lines: AsyncIterator[List[str]], file_format: str) -> Dict[str, Any]:
+        parser = CsvRows() if file_format == 'csv' else JsonlRows()
+        batch: List[Tuple[int, Dict[str, Any]]] = []
+        writing: Optional[asyncio.Task] = None
+
+        def parsed(rows, errors):
+            self.reject(errors)
+            self.rows += len(rows) + len(errors)
+            batch.extend(rows)
+
+        async def flush():
+            nonlocal batch, writing
+            # Validation runs while the previous batch is still being written
+            valid = self.prepare(batch) if batch else []
+            batch = []
+            if writing:
+                await writing
+            writing = asyncio.create_task(self.write(valid)) if valid else None
+
+        try:
+            async for chunk in lines:
+                parsed(*parser.feed(chunk))
+                if len(batch) >= self.batch_size:
+                    await flush()
+            parsed(*parser.finish())
+            # Start the last batch, then wait for it
+            await flush()
+            await flush()
+        finally:
+            if writing and not writing.done():
+                writing.cancel()
+        return self.report()
+
+    def report(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        return {
+            'searchId': self.search_id,
+            'rows': self.rows,
+            'imported': self.imported,
+            'duplicates': self.duplicates,
+            'rejected': self.rejected,
+            'errors': self.errors,
+            'errorsTruncated': self.rejected + self.duplicates > len(self.errors),
+            'seconds': round(elapsed, 3),
+            'rowsPerSecond': round(self.rows / elapsed, 1) if elapsed else None,
+        }
+
+
+async def import_leads(storage: Storage, search_id: str, chunks: AsyncIterator[bytes], file_format: str,
+                       batch_size: int = LEAD_IMPORT_BATCH_SIZE) -> Dict[str, Any]:
+    """Stream a CSV or JSONL body, plain or gzipped, into the leads of a search"""
+    if file_format not in IMPORT_FORMATS:
+        raise ValueError(f"Unknown import format '{file_format}', expected csv or jsonl")
+    job = LeadImport(storage, search_id, batch_size)
+    try:
+        report = await job.run(text_lines(decompressed(chunks)), file_format)
+    except Exception:
+        # Keep what was written visible, but not as a finished search
+        await storage.searches.set_results_count(search_id, job.imported, status='failed')
+        raise
+    await storage.searches.set_results_count(search_id, job.imported, status='completed')
+    logger.info(f"Imported {report['imported']} of {report['rows']} rows into search {search_id} "
+                f"({report['rowsPerSecond']} rows/s, {report['duplicates']} duplicates, {report['rejected']} rejected)")
+    return report
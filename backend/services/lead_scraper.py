@@ -3,6 +3,7 @@ import random
 from typing import List, Dict, Any
 from datetime import datetime
 from models.leads import LeadResult, SearchRecord
+from services.geo import synthetic_point
 
 class MockLeadScraperService:
     """Mock service that simulates Google Maps scraping using Apify"""
@@ -131,6 +132,9 @@ class MockLeadScraperService:
                 email=email if email else None,
                 rating=round(random.uniform(3.5, 5.0), 1),
                 reviewCount=random.randint(15, 500),
+                # The mock has no coordinates; place the lead around the searched city
+                location=synthetic_point(search_request.city, search_request.state,
+                                         f"{business['businessName']}|{address}"),
                 searchId=search_id
             )
             results.append(lead)
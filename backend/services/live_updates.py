@@ -0,0 +1,341 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+import orjson
+from dotenv import load_dotenv
+from pymongo.errors import OperationFailure
+
+from database import db
+from models.leads import LEAD_CODEC, PLAIN_CODEC, SEARCH_CODEC, DocumentCodec
+from services.metrics import registry
+
+ROOT_DIR = Path(__file__).parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+# auto: change streams, falling back to polling on a standalone mongod; or force change_stream / poll
+LIVE_UPDATES_MODE = os.environ.get('LIVE_UPDATES_MODE', 'auto')
+LIVE_POLL_INTERVAL_SECONDS = float(os.environ.get('LIVE_POLL_INTERVAL_SECONDS', 2))
+LIVE_POLL_BATCH_SIZE = int(os.environ.get('LIVE_POLL_BATCH_SIZE', 500))
+# Events buffered per client; a client that falls further behind gets a resync instead
+LIVE_QUEUE_SIZE = int(os.environ.get('LIVE_QUEUE_SIZE', 1000))
+LIVE_HEARTBEAT_SECONDS = float(os.environ.get('LIVE_HEARTBEAT_SECONDS', 15))
+LIVE_RETRY_SECONDS = 5
+
+# Fields pushed per collection; clients refetch anything else they need
+LIVE_FIELDS: Dict[str, Tuple[str, ...]] = {
+    'automation_tasks': ('id', 'workflow_type', 'status', 'results_count', 'error', 'started_at', 'completed_at',
+                         'checkpoint.pages', 'checkpoint.results_count'),
+    'leads': ('id', 'searchId', 'businessName', 'email', 'score'),
+    'searches': ('id', 'status', 'results_count', 'query', 'city', 'state'),
+}
+
+# Leads and searches are stored compactly; events always use the API field names
+CODECS: Dict[str, DocumentCodec] = {'leads': LEAD_CODEC, 'searches': SEARCH_CODEC}
+# Field the poller tails inserts by; together with _id it orders documents uniquely
+INSERT_ORDER = {'automation_tasks': '_id', 'leads': 'created_at', 'searches': 'created_at'}
+
+# Error codes of $changeStream on a server that is not a replica set member
+CHANGE_STREAM_UNSUPPORTED_CODES = (40573, 40324)
+
+RESYNC = {'collection': None, 'op': 'resync', 'id': None, 'doc': {}}
+# Queued by close(): the stream ends after the events before it
+_CLOSED = {'collection': None, 'op': 'closed', 'id': None, 'doc': {}}
+
+live_subscribers = registry.gauge('live_subscribers', 'Open live update streams')
+live_events = registry.counter('live_events_total', 'Change events received by the live update hub')
+live_resyncs = registry.counter('live_resyncs_total', 'Backlogs dropped for clients that fell behind')
+
+
+def project(doc: Dict[str, Any], fields: Tuple[str, ...]) -> Dict[str, Any]:
+    """The listed (dotted) fields of a document that are present, nested as in the document"""
+    projected: Dict[str, Any] = {}
+    for field in fields:
+        value: Any = doc
+        for part in field.split('.'):
+            value = value.get(part) if isinstance(value, dict) else None
+        if value is None:
+            continue
+        *parents, leaf = field.split('.')
+        target = projected
+        for part in parents:
+            target = target.setdefault(part, {})
+        target[leaf] = value
+    return projected
+
+
+def codec(collection: str) -> DocumentCodec:
+    return CODECS.get(collection, PLAIN_CODEC)
+
+
+def make_event(collection: str, op: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {'collection': collection, 'op': op, 'id': doc.get('id'), 'doc': project(doc, LIVE_FIELDS[collection])}
+
+
+def stored_event(collection: str, op: str, stored: Dict[str, Any]) -> Dict[str, Any]:
+    """Event for a document as stored in the collection"""
+    return make_event(collection, op, codec(collection).decode(stored))
+
+
+def stored_fields(collection: str) -> List[str]:
+    return [codec(collection).field(field) for field in LIVE_FIELDS[collection]]
+
+
+def after(field: str, position: Optional[Tuple[Any, Any]]) -> Dict[str, Any]:
+    """Keyset condition: documents ordered after (value of field, _id)"""
+    if position is None:
+        return {}
+    value, last_id = position
+    if field == '_id':
+        return {'_id': {'$gt': value}}
+    if last_id is None:
+        return {field: {'$gt': value}}
+    return {'$or': [{field: {'$gt': value}}, {field: value, '_id': {'$gt': last_id}}]}
+
+
+def change_stream_pipeline(collection: str) -> List[Dict[str, Any]]:
+    """Only inserts and updates, trimmed to the pushed fields on the server"""
+    return [
+        {'$match': {'operationType': {'$in': ['insert', 'update', 'replace']}}},
+        {'$project': {'operationType': 1, **{f'fullDocument.{field}': 1 for field in stored_fields(collection)}}},
+    ]
+
+
+def format_sse(events: List[Dict[str, Any]]) -> bytes:
+    """One SSE message per event, named after its collection (or "resync")"""
+    return b''.join(b'event: ' + (event['collection'] or event['op']).encode() + b'\ndata: '
+                    + orjson.dumps(event) + b'\n\n' for event in events)
+
+
+def _change_streams_unsupported(error: OperationFailure) -> bool:
+    return error.code in CHANGE_STREAM_UNSUPPORTED_CODES or 'replica set' in str(error)
+
+
+@dataclass(frozen=True)
+class LiveEventFilter:
+    """What one client wants to see
+
+    search_id narrows leads and searches, task_id and workflow narrow
+    automation tasks, status narrows tasks and searches. A filter does not
+    affect collections it does not apply to.
+    """
+    collections: FrozenSet[str] = frozenset(LIVE_FIELDS)
+    search_id: Optional[str] = None
+    task_id: Optional[str] = None
+    workflow: Optional[str] = None
+    status: Optional[str] = None
+
+    def matches(self, event: Dict[str, Any]) -> bool:
+        collection, doc = event['collection'], event['doc']
+        if collection is None:
+            return True
+        if collection not in self.collections:
+            return False
+        if collection == 'leads':
+            return self.search_id is None or doc.get('searchId') == self.search_id
+        if collection == 'searches':
+            return ((self.search_id is None or event['id'] == self.search_id)
+                    and (self.status is None or doc.get('status') == self.status))
+        return ((self.task_id is None or event['id'] == self.task_id)
+                and (self.workflow is None or doc.get('workflow_type') == self.workflow)
+                and (self.status is None or doc.get('status') == self.status))
+
+
+class Subscription:
+    """A client's bounded event queue; the hub never waits for a slow client"""
+
+    def __init__(self, event_filter: LiveEventFilter, max_queued: int = LIVE_QUEUE_SIZE):
+        self.filter = event_filter
+        self.queue: 'asyncio.Queue[Dict[str, Any]]' = asyncio.Queue(max_queued)
+        self.closed = False
+
+    def offer(self, event: Dict[str, Any]):
+        if self.closed or not self.filter.matches(event):
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too far behind to catch up event by event: drop the backlog, the client refetches
+            self._drop_backlog()
+            self.queue.put_nowait(RESYNC)
+            live_resyncs.inc()
+
+    def close(self):
+        """End the stream once the queued events are sent"""
+        if self.closed:
+            return
+        self.closed = True
+        if self.queue.full():
+            # The client refetches when it reconnects anyway
+            self._drop_backlog()
+        self.queue.put_nowait(_CLOSED)
+
+    def _drop_backlog(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+    async def next_batch(self, timeout: float) -> List[Dict[str, Any]]:
+        """Everything queued, waiting up to timeout for the first event; [] on timeout
+
+        After close() the batch holds the events queued before it, and the
+        subscription's closed flag tells the caller to stop.
+        """
+        try:
+            events = [await asyncio.wait_for(self.queue.get(), timeout)]
+        except asyncio.TimeoutError:
+            return []
+        while not self.queue.empty():
+            events.append(self.queue.get_nowait())
+        return [event for event in events if event is not _CLOSED]
+
+
+class LiveUpdateHub:
+    """Fans change events of a few collections out to any number of subscribers
+
+    One watcher per collection and process, running only while a subscriber
+    wants that collection, so database load depends on the rate of changes
+    and not on the number of viewers. Watchers use change streams and fall
+    back to polling on a standalone mongod, which has none.
+    """
+
+    def __init__(self, mode: str = LIVE_UPDATES_MODE, poll_interval: float = LIVE_POLL_INTERVAL_SECONDS):
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self._subscribers: set = set()
+        self._watchers: Dict[str, asyncio.Task] = {}
+        self._indexed = False
+        self._closing = False
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, event_filter: LiveEventFilter) -> Subscription:
+        subscription = Subscription(event_filter)
+        if self._closing:
+            # Shutting down: the client reconnects to another worker or after the restart
+            subscription.close()
+            return subscription
+        self._subscribers.add(subscription)
+        live_subscribers.inc()
+        self._start_watchers()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription in self._subscribers:
+            self._subscribers.discard(subscription)
+            live_subscribers.dec()
+        wanted = self._wanted_collections()
+        for collection in [name for name in self._watchers if name not in wanted]:
+            self._watchers.pop(collection).cancel()
+
+    def publish(self, event: Dict[str, Any]):
+        live_events.inc(collection=event['collection'])
+        for subscription in list(self._subscribers):
+            subscription.offer(event)
+
+    def _wanted_collections(self) -> FrozenSet[str]:
+        return frozenset().union(*(subscription.filter.collections for subscription in self._subscribers))
+
+    def _start_watchers(self):
+        loop = asyncio.get_running_loop()
+        for collection in self._wanted_collections():
+            watcher = self._watchers.get(collection)
+            if watcher is None or watcher.done():
+                self._watchers[collection] = loop.create_task(self._watch(collection), name=f"live-{collection}")
+
+    def _stop_watchers(self):
+        for watcher in self._watchers.values():
+            watcher.cancel()
+        self._watchers.clear()
+
+    def close_subscriptions(self):
+        """End every open stream, so graceful shutdown does not wait for clients that never leave
+
+        Called from the exit signal handler (serve.py), before the server waits
+        for open requests to finish.
+        """
+        self._closing = True
+        for subscription in list(self._subscribers):
+            subscription.close()
+
+    async def stop(self):
+        self.close_subscriptions()
+        watchers = list(self._watchers.values())
+        self._stop_watchers()
+        await asyncio.gather(*watchers, return_exceptions=True)
+
+    async def _watch(self, collection: str):
+        resume_token = None
+        while True:
+            try:
+                if self.mode != 'poll':
+                    resume_token = await self._follow_change_stream(collection, resume_token)
+                else:
+                    await self._poll(collection)
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if self.mode == 'auto' and _change_streams_unsupported(e):
+                    logger.info("Change streams unavailable (no replica set), polling for live updates")
+                    self.mode = 'poll'
+                    continue
+                logger.error(f"Live updates for {collection} failed: {str(e)}")
+                await asyncio.sleep(LIVE_RETRY_SECONDS)
+            except Exception as e:
+                logger.error(f"Live updates for {collection} failed: {str(e)}")
+                await asyncio.sleep(LIVE_RETRY_SECONDS)
+
+    async def _follow_change_stream(self, collection: str, resume_token: Optional[Dict[str, Any]]):
+        """Publish changes until the stream breaks; returns the token to resume after"""
+        async with db[collection].watch(change_stream_pipeline(collection), full_document='updateLookup',
+                                        resume_after=resume_token) as stream:
+            async for change in stream:
+                resume_token = stream.resume_token
+                doc = change.get('fullDocument')
+                # Updated and then deleted before the lookup: nothing left to push
+                if doc:
+                    self.publish(stored_event(collection, change['operationType'], doc))
+        return resume_token
+
+    async def _ensure_poll_indexes(self):
+        if not self._indexed:
+            for collection in LIVE_FIELDS:
+                await db[collection].create_index(codec(collection).field('updated_at'), sparse=True)
+            self._indexed = True
+
+    async def _poll(self, collection: str):
+        """Tail inserts and updates (by updated_at), starting from now
+
+        Writers stamp updated_at on the updates clients care about; an
+        insert that is later updated is pushed twice, once per op.
+        """
+        await self._ensure_poll_indexes()
+        inserted_by = codec(collection).field(INSERT_ORDER[collection])
+        updated_by = codec(collection).field('updated_at')
+        projection = {updated_by: 1, inserted_by: 1, **{field: 1 for field in stored_fields(collection)}}
+        order = [(inserted_by, -1), ('_id', -1)] if inserted_by != '_id' else [('_id', -1)]
+        newest = await db[collection].find_one({}, {inserted_by: 1}, sort=order)
+        positions = {
+            inserted_by: (newest.get(inserted_by), newest['_id']) if newest else None,
+            updated_by: (datetime.utcnow(), None),
+        }
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            for field, op in ((inserted_by, 'insert'), (updated_by, 'update')):
+                sort = [(field, 1), ('_id', 1)] if field != '_id' else [('_id', 1)]
+                docs = await db[collection].find(after(field, positions[field]), projection) \
+                    .sort(sort).limit(LIVE_POLL_BATCH_SIZE).to_list(LIVE_POLL_BATCH_SIZE)
+                for doc in docs:
+                    self.publish(stored_event(collection, op, doc))
+                if docs:
+                    positions[field] = (docs[-1][field], docs[-1]['_id'])
+
+
+live_updates = LiveUpdateHub()
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from pathlib import Path
+from typing import Optional
+
+from dotenv import load_dotenv
+
+from services.metrics import registry
+
+ROOT_DIR = Path(__file__).parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+# How often the loop is probed, and how long a single step may hold it
+LOOP_MONITOR_INTERVAL_MS = float(os.environ.get('LOOP_MONITOR_INTERVAL_MS', 100))
+LOOP_SLOW_CALLBACK_MS = float(os.environ.get('LOOP_SLOW_CALLBACK_MS', 200))
+LOOP_STACK_DEPTH = int(os.environ.get('LOOP_STACK_DEPTH', 15))
+
+event_loop_lag = registry.histogram(
+    'event_loop_lag_seconds', 'Delay between a scheduled wakeup and the loop running it',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+event_loop_slow_callbacks = registry.counter(
+    'event_loop_slow_callbacks_total', 'Callbacks or coroutine steps that blocked the loop past the threshold')
+
+# ASGI scope per request task, readable from the watchdog thread
+_task_scopes: 'weakref.WeakKeyDictionary[asyncio.Task, dict]' = weakref.WeakKeyDictionary()
+
+
+def _task_label(task: Optional[asyncio.Task]) -> str:
+    if task is None:
+        return 'callback'
+    scope = _task_scopes.get(task)
+    if scope is None:
+        # Scheduler jobs are named after the job when spawned
+        return task.get_name()
+    # The route template once routing has happened, so labels stay low-cardinality
+    route = getattr(scope.get('route'), 'path', None)
+    return f"{scope['method']} {route or 'unmatched'}"
+
+
+class LoopMonitor:
+    """Measures event-loop lag and reports steps that block the loop
+
+    A probe task sleeps for a fixed interval and records how late it wakes up.
+    A watchdog thread notices when the probe stops beating; it then samples the
+    loop thread's stack while the offending step is still running, so the log
+    points at the blocking code instead of at whatever ran afterwards.
+    """
+
+    def __init__(self, interval: float = LOOP_MONITOR_INTERVAL_MS / 1000,
+                 threshold: float = LOOP_SLOW_CALLBACK_MS / 1000):
+        self.interval = interval
+        self.threshold = threshold
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread_id: Optional[int] = None
+        self._heartbeat = 0.0
+        self._probe: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        if self._probe is not None and not self._probe.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._thread_id = threading.get_ident()
+        self._heartbeat = time.perf_counter()
+        self._stopped.clear()
+        self._probe = self._loop.create_task(self._run_probe(), name='loop-monitor')
+        self._watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stopped.set()
+        if self._probe is not None:
+            self._probe.cancel()
+            try:
+                await self._probe
+            except asyncio.CancelledError:
+                pass
+            self._probe = None
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+
+    async def _run_probe(self):
+        while True:
+            scheduled = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            event_loop_lag.observe(max(now - scheduled - self.interval, 0.0))
+            self._heartbeat = now
+
+    def _watch(self):
+        reported = None
+        while not self._stopped.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            blocked = time.perf_counter() - heartbeat - self.interval
+            # One report per stall: the heartbeat only moves once the loop is free again
+            if blocked < self.threshold or reported == heartbeat:
+                continue
+            reported = heartbeat
+            self._report(blocked)
+
+    def _report(self, blocked: float):
+        label = _task_label(asyncio.current_task(self._loop) if self._loop else None)
+        frame = sys._current_frames().get(self._thread_id)
+        stack = ''.join(traceback.format_stack(frame, limit=LOOP_STACK_DEPTH)) if frame else ''
+
+        event_loop_slow_callbacks.inc(label=label)
+        logger.warning(f"Event loop blocked for {blocked * 1000:.0f} ms in {label}\n{stack}")
+
+
+class LoopLabelMiddleware:
+    """Remembers each request task's scope so stalls are attributed to its route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        task = asyncio.current_task()
+        if scope['type'] == 'http' and task is not None:
+            _task_scopes[task] = scope
+        await self.app(scope, receive, send)
+
+
+loop_monitor = LoopMonitor()
@@ -0,0 +1,250 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(**labels) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels: Labels, extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (f'{k}="{v.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in pairs)
+    return '{' + ','.join(escaped) + '}'
+
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _labels(**labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            lines += [f'{self.name}{_format_labels(k)} {v}' for k, v in sorted(self._values.items())]
+        return lines
+
+
+class Gauge(Counter):
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_labels(**labels)] = value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f'# TYPE {self.name} gauge'
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _labels(**labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            # Per-bucket counts, then +Inf count and sum
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 1) + [0.0])
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    lines.append(f'{self.name}_bucket{_format_labels(key, [("le", repr(bound))])} {cumulative}')
+                cumulative += series[len(self.buckets)]
+                lines.append(f'{self.name}_bucket{_format_labels(key, [("le", "+Inf")])} {cumulative}')
+                lines.append(f'{self.name}_sum{_format_labels(key)} {series[-1]}')
+                lines.append(f'{self.name}_count{_format_labels(key)} {cumulative}')
+        return lines
+
+
+class MetricsRegistry:
+    """Process-local metrics rendered in Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def counter(self, name: str, help: str) -> Counter:
+        metric = Counter(name, help)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help: str) -> Gauge:
+        metric = Gauge(name, help)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Callable[[], List[str]]):
+        """Add a callback that renders extra lines at scrape time"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for collector in self._collectors:
+            try:
+                lines += collector()
+            except Exception as e:
+                logger.error(f"Metrics collector failed: {str(e)}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+http_request_duration = registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route template')
+http_requests_total = registry.counter(
+    'http_requests_total', 'HTTP requests by route template and status code')
+http_requests_in_flight = registry.gauge(
+    'http_requests_in_flight', 'HTTP requests currently being handled')
+mongo_command_duration = registry.histogram(
+    'mongo_command_duration_seconds', 'MongoDB command latency by collection and command')
+mongo_command_documents = registry.counter(
+    'mongo_command_documents_total', 'Documents returned or written by MongoDB commands')
+mongo_command_failures = registry.counter(
+    'mongo_command_failures_total', 'Failed MongoDB commands by collection and command')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, in-flight requests and status codes per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        method = scope['method']
+        status = {'code': 500}
+        started = time.perf_counter()
+        http_requests_in_flight.inc(method=method)
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = scope.get('route')
+            path = getattr(route, 'path', None) or 'unmatched'
+            http_requests_in_flight.dec(method=method)
+            http_request_duration.observe(time.perf_counter() - started, route=path, method=method)
+            http_requests_total.inc(route=path, method=method, status=status['code'])
+
+
+def _document_count(command_name: str, reply: dict) -> int:
+    if command_name in ('find', 'aggregate', 'getMore'):
+        cursor = reply.get('cursor', {})
+        return len(cursor.get('firstBatch', cursor.get('nextBatch', [])))
+    if command_name in ('insert', 'update', 'delete'):
+        return reply.get('n', 0)
+    return 0
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Records per-collection, per-command latency and document counts"""
+
+    def __init__(self):
+        self._collections: Dict[Tuple[int, int], str] = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if event.command_name == 'getMore':
+            collection = event.command.get('collection')
+        with self._lock:
+            self._collections[(event.request_id, event.operation_id)] = (
+                collection if isinstance(collection, str) else ''
+            )
+
+    def _collection(self, event) -> str:
+        with self._lock:
+            return self._collections.pop((event.request_id, event.operation_id), '')
+
+    def succeeded(self, event):
+        collection = self._collection(event)
+        mongo_command_duration.observe(event.duration_micros / 1e6, collection=collection, command=event.command_name)
+        documents = _document_count(event.command_name, event.reply)
+        if documents:
+            mongo_command_documents.inc(documents, collection=collection, command=event.command_name)
+
+    def failed(self, event):
+        collection = self._collection(event)
+        mongo_command_duration.observe(event.duration_micros / 1e6, collection=collection, command=event.command_name)
+        mongo_command_failures.inc(collection=collection, command=event.command_name)
+
+
+mongo_command_metrics = MongoCommandMetrics()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: Optional[int] = None) -> ThreadingHTTPServer:
+    """Serve /metrics from a background thread, for processes without an HTTP app"""
+    port = port or int(os.environ.get('SCHEDULER_METRICS_PORT', 9101))
+    server = ThreadingHTTPServer(('0.0.0.0', port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    logger.info(f"Metrics available on :{port}/metrics")
+    return server
@@ -0,0 +1,216 @@
+import asyncio
+import hmac
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Awaitable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from dotenv import load_dotenv
+
+ROOT_DIR = Path(__file__).parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+PROFILING_DIR = Path(os.environ.get('PROFILING_DIR', ROOT_DIR / 'profiles'))
+# Shared secret for the X-Profile header / ?profile= flag; unset disables on-demand profiling
+PROFILING_TOKEN = os.environ.get('PROFILING_TOKEN', '')
+# Fraction of requests and scheduler jobs profiled without being asked
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE', 0))
+# Comma-separated scheduler job names that are always profiled
+PROFILING_JOBS = {name for name in os.environ.get('PROFILING_JOBS', '').split(',') if name}
+PROFILING_INTERVAL_MS = float(os.environ.get('PROFILING_INTERVAL_MS', 5))
+PROFILING_MAX_SECONDS = float(os.environ.get('PROFILING_MAX_SECONDS', 30))
+PROFILING_MAX_FILES = int(os.environ.get('PROFILING_MAX_FILES', 50))
+
+PROFILE_SUFFIX = '.speedscope.json'
+
+Frame = Tuple[str, str, int]
+
+# One profile per process at a time keeps the overhead bounded to a single sampler thread
+_active = threading.Lock()
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread at a fixed interval from a helper thread
+
+    The event loop runs every request on the same thread, so a profile taken
+    while other requests are in flight also contains their frames.
+    """
+
+    def __init__(self, thread_id: int, interval: float, max_seconds: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.stacks: Counter = Counter()
+        self.duration = 0.0
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample, name='profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._done.is_set():
+            return
+        self._done.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self._started
+
+    def _sample(self):
+        deadline = self._started + self.max_seconds
+        while not self._done.wait(self.interval) and time.perf_counter() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_name, code.co_filename, frame.f_lineno))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def to_speedscope(self, name: str) -> dict:
+        """Aggregated samples in the speedscope "sampled" format"""
+        frames: List[dict] = []
+        index: Dict[Frame, int] = {}
+        samples, weights = [], []
+        for stack, count in self.stacks.most_common():
+            sample = []
+            for frame in stack:
+                if frame not in index:
+                    index[frame] = len(frames)
+                    frames.append({'name': frame[0], 'file': frame[1], 'line': frame[2]})
+                sample.append(index[frame])
+            samples.append(sample)
+            weights.append(count * self.interval)
+
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'lead-scraper-profiler',
+            'shared': {'frames': frames},
+            'profiles': [{
+                'type': 'sampled',
+                'name': name,
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': sum(weights),
+                'samples': samples,
+                'weights': weights
+            }]
+        }
+
+
+def _enforce_retention():
+    profiles = sorted(PROFILING_DIR.glob(f'*{PROFILE_SUFFIX}'), key=lambda p: p.stat().st_mtime)
+    for path in profiles[:max(len(profiles) - PROFILING_MAX_FILES, 0)]:
+        path.unlink(missing_ok=True)
+
+
+def _write_profile(path: Path, profile: dict):
+    PROFILING_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_text(json.dumps(profile))
+    os.replace(tmp, path)
+    _enforce_retention()
+
+
+def profile_path(name: str) -> Path:
+    slug = ''.join(c if c.isalnum() else '-' for c in name).strip('-')[:80]
+    return PROFILING_DIR / f"{datetime.utcnow():%Y%m%dT%H%M%S}-{slug}-{uuid.uuid4().hex[:8]}{PROFILE_SUFFIX}"
+
+
+@contextmanager
+def profiled() -> Iterator[Optional[SamplingProfiler]]:
+    """Profile the current thread; yields None if another profile is running"""
+    if not _active.acquire(blocking=False):
+        yield None
+        return
+    try:
+        profiler = SamplingProfiler(threading.get_ident(), PROFILING_INTERVAL_MS / 1000, PROFILING_MAX_SECONDS)
+        profiler.start()
+        try:
+            yield profiler
+        finally:
+            profiler.stop()
+    finally:
+        _active.release()
+
+
+def should_sample(forced: bool = False) -> bool:
+    return forced or (PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE)
+
+
+async def run_profiled(name: str, awaitable: Awaitable, forced: bool = False):
+    """Await a scheduler job, profiling it when forced, listed in PROFILING_JOBS or sampled"""
+    if not should_sample(forced or name in PROFILING_JOBS):
+        return await awaitable
+
+    path = profile_path(name)
+    with profiled() as profiler:
+        try:
+            return await awaitable
+        finally:
+            if profiler is not None:
+                profiler.stop()
+                profile = profiler.to_speedscope(name)
+                await asyncio.to_thread(_write_profile, path, profile)
+                logger.info(f"Profile of {name} written to {path}")
+
+
+class ProfilingMiddleware:
+    """Profiles requests that carry the admin token or fall into the sample rate
+
+    Trigger with the header "X-Profile: <PROFILING_TOKEN>" or "?profile=<PROFILING_TOKEN>".
+    The profile path is returned in the X-Profile-File response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _requested(self, scope) -> bool:
+        if not PROFILING_TOKEN:
+            return False
+        for key, value in scope.get('headers', []):
+            if key == b'x-profile':
+                return hmac.compare_digest(value.decode('latin-1'), PROFILING_TOKEN)
+        query = parse_qs(scope.get('query_string', b'').decode('latin-1'))
+        return any(hmac.compare_digest(value, PROFILING_TOKEN) for value in query.get('profile', []))
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not should_sample(self._requested(scope)):
+            await self.app(scope, receive, send)
+            return
+
+        name = f"{scope['method']} {scope['path']}"
+        path = profile_path(name)
+        with profiled() as profiler:
+            if profiler is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_wrapper(message):
+                if message['type'] == 'http.response.start':
+                    message.setdefault('headers', [])
+                    message['headers'] = list(message['headers']) + [(b'x-profile-file', path.name.encode())]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                profiler.stop()
+                profile = profiler.to_speedscope(name)
+                await asyncio.to_thread(_write_profile, path, profile)
+                logger.info(f"Profile of {name} written to {path}")
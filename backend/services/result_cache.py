@@ -0,0 +1,134 @@
+import gzip
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Mapping, Optional
+
+from dotenv import load_dotenv
+from fastapi.responses import Response
+
+from services.metrics import registry
+
+ROOT_DIR = Path(__file__).parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+# Total bytes of cached payloads (plain plus gzip) per process
+RESULT_CACHE_MAX_BYTES = int(os.environ.get('RESULT_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+# How long an entry is served without checking the search's version; bounds staleness across processes
+RESULT_CACHE_TTL_SECONDS = float(os.environ.get('RESULT_CACHE_TTL_SECONDS', 30))
+# Payloads smaller than this are not worth compressing
+RESULT_CACHE_GZIP_MIN_BYTES = 1024
+
+result_cache_requests = registry.counter('result_cache_requests_total', 'Search result lookups by cache outcome')
+result_cache_bytes = registry.gauge('result_cache_bytes', 'Bytes held by the search result cache')
+
+
+def _tags(header: Optional[str]) -> Iterable[str]:
+    for tag in (header or '').split(','):
+        tag = tag.strip()
+        yield tag[2:] if tag.startswith('W/') else tag
+
+
+@dataclass
+class CachedPayload:
+    """A serialized response, compressed once, with its strong validator"""
+    version: int
+    body: bytes
+    gzipped: Optional[bytes]
+    etag: str
+    checked_at: float
+
+    @classmethod
+    def build(cls, version: int, body: bytes) -> 'CachedPayload':
+        digest = hashlib.blake2b(body, digest_size=12).hexdigest()
+        gzipped = gzip.compress(body, compresslevel=6, mtime=0) if len(body) >= RESULT_CACHE_GZIP_MIN_BYTES else None
+        return cls(version, body, gzipped, f'"{digest}"', time.monotonic())
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzipped or b'')
+
+    def _etag(self, gzipped: bool) -> str:
+        # Each content coding is its own representation and gets its own strong tag
+        return self.etag[:-1] + '-gzip"' if gzipped else self.etag
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        tags = set(_tags(if_none_match))
+        return '*' in tags or self.etag in tags or self._etag(True) in tags
+
+    def response(self, headers: Mapping[str, str]) -> Response:
+        """304 if the client has this payload, otherwise the body, gzipped when accepted"""
+        use_gzip = self.gzipped is not None and 'gzip' in headers.get('accept-encoding', '')
+        response_headers = {'ETag': self._etag(use_gzip), 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+        if self.matches(headers.get('if-none-match')):
+            return Response(status_code=304, headers=response_headers)
+        if use_gzip:
+            response_headers['Content-Encoding'] = 'gzip'
+            return Response(self.gzipped, media_type='application/json', headers=response_headers)
+        return Response(self.body, media_type='application/json', headers=response_headers)
+
+
+class SearchResultCache:
+    """Byte-bounded LRU of search result payloads, keyed by search id and results version
+
+    Within the TTL an entry is served without any database work. After that
+    the caller re-reads the search's results_version; if it is unchanged the
+    entry is revalidated instead of re-querying and re-serializing the leads.
+    Writers bump the version, and writes in this process also invalidate
+    right away.
+    """
+
+    def __init__(self, max_bytes: int = RESULT_CACHE_MAX_BYTES, ttl: float = RESULT_CACHE_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._entries: 'OrderedDict[str, CachedPayload]' = OrderedDict()
+
+    def fresh(self, search_id: str) -> Optional[CachedPayload]:
+        """The entry if it was checked within the TTL"""
+        entry = self._entries.get(search_id)
+        if entry is None or time.monotonic() - entry.checked_at > self.ttl:
+            return None
+        self._entries.move_to_end(search_id)
+        result_cache_requests.inc(result='hit')
+        return entry
+
+    def get(self, search_id: str, version: int) -> Optional[CachedPayload]:
+        """The entry if it still has this version, checked again from now"""
+        entry = self._entries.get(search_id)
+        if entry is None or entry.version != version:
+            result_cache_requests.inc(result='miss')
+            return None
+        entry.checked_at = time.monotonic()
+        self._entries.move_to_end(search_id)
+        result_cache_requests.inc(result='revalidated')
+        return entry
+
+    def put(self, search_id: str, entry: CachedPayload):
+        self.invalidate(search_id)
+        # One huge search must not flush everything else
+        if entry.size > self.max_bytes // 8:
+            return
+        self._entries[search_id] = entry
+        self.size += entry.size
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= evicted.size
+        result_cache_bytes.set(self.size)
+
+    def invalidate(self, search_id: str):
+        entry = self._entries.pop(search_id, None)
+        if entry is not None:
+            self.size -= entry.size
+            result_cache_bytes.set(self.size)
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+        result_cache_bytes.set(0)
+
+
+search_results_cache = SearchResultCache()
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+from dotenv import load_dotenv
+
+from repositories.base import Storage, lead_state
+from services.metrics import registry
+
+ROOT_DIR = Path(__file__).parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+# Review counts beyond this add nothing to the score
+LEAD_SCORE_REVIEW_SATURATION = int(os.environ.get('LEAD_SCORE_REVIEW_SATURATION', 1000))
+LEAD_SCORE_BATCH_SIZE = int(os.environ.get('LEAD_SCORE_BATCH_SIZE', 5000))
+
+leads_scored = registry.counter('leads_scored_total', 'Leads (re)scored by the scoring engine')
+
+
+@dataclass(frozen=True)
+class ScoreWeights:
+    """Weights of the lead score features; the score is their weighted mean scaled to 0-100"""
+    rating: float = 0.35
+    reviews: float = 0.25
+    email: float = 0.2
+    phone: float = 0.1
+    website: float = 0.1
+
+    @classmethod
+    def from_env(cls) -> 'ScoreWeights':
+        """Defaults, overridden by LEAD_SCORE_WEIGHTS, e.g. '{"email": 0.4}'"""
+        return cls(**json.loads(os.environ.get('LEAD_SCORE_WEIGHTS') or '{}'))
+
+    @property
+    def vector(self) -> np.ndarray:
+        values = np.array([self.rating, self.reviews, self.email, self.phone, self.website], dtype=np.float64)
+        if (values < 0).any() or values.sum() <= 0:
+            raise ValueError("Lead score weights must be non-negative and not all zero")
+        return values / values.sum()
+
+    @property
+    def version(self) -> str:
+        """Changes whenever the weights or the review saturation do, marking all scores stale"""
+        config = json.dumps({**asdict(self), 'review_saturation': LEAD_SCORE_REVIEW_SATURATION}, sort_keys=True)
+        return hashlib.sha1(config.encode('utf-8')).hexdigest()[:12]
+
+
+weights = ScoreWeights.from_env()
+
+
+def feature_matrix(docs: List[Dict[str, Any]]) -> np.ndarray:
+    """Columns rating, reviews, email, phone, website in [0, 1], one row per lead"""
+    rating = np.array([doc.get('rating') or 0 for doc in docs], dtype=np.float64)
+    reviews = np.array([doc.get('reviewCount') or 0 for doc in docs], dtype=np.float64)
+    presence = np.array([[bool(doc.get(field)) for field in ('email', 'phone', 'website')] for doc in docs],
+                        dtype=np.float64).reshape(len(docs), 3)
+    return np.column_stack([
+        np.clip(rating / 5, 0, 1),
+        np.clip(np.log1p(np.maximum(reviews, 0)) / np.log1p(LEAD_SCORE_REVIEW_SATURATION), 0, 1),
+        presence
+    ])
+
+
+def score_docs(docs: List[Dict[str, Any]], score_weights: ScoreWeights = weights) -> np.ndarray:
+    if not docs:
+        return np.zeros(0)
+    return np.round(feature_matrix(docs) @ score_weights.vector * 100, 2)
+
+
+def score_fields(docs: List[Dict[str, Any]], score_weights: ScoreWeights = weights) -> List[Dict[str, Any]]:
+    """The persisted fields per lead: score, its weights version and the region top-K is grouped by"""
+    version = score_weights.version
+    return [{'score': score, 'score_version': version, 'region': lead_state(doc.get('address'))}
+            for score, doc in zip(score_docs(docs, score_weights).tolist(), docs)]
+
+
+def apply_scores(docs: List[Dict[str, Any]], score_weights: ScoreWeights = weights) -> List[Dict[str, Any]]:
+    """Score leads in place before they are stored"""
+    for doc, fields in zip(docs, score_fields(docs, score_weights)):
+        doc.update(fields)
+    leads_scored.inc(len(docs))
+    return docs
+
+
+async def rescore_stale(storage: Storage, score_weights: ScoreWeights = weights,
+                        batch_size: int = LEAD_SCORE_BATCH_SIZE) -> int:
+    """Score leads that were never scored or were scored with other weights
+
+    Leads are pulled in batches of their score inputs, scored as one matrix
+    and written back in one bulk update per batch. Leads that are current are
+    not read, so after the first pass only new or changed leads cost anything.
+    """
+    version = score_weights.version
+    total = 0
+    previous = set()
+    while True:
+        batch = await storage.leads.stale_scores(version, batch_size)
+        ids = {doc['id'] for doc in batch}
+        # The same batch coming back means the updates did not stick; stop instead of looping
+        if not batch or ids == previous:
+            return total
+        previous = ids
+        fields = score_fields(batch, score_weights)
+        await storage.leads.set_scores({doc['id']: update for doc, update in zip(batch, fields)})
+        # Scores are part of the cached search results
+        await storage.searches.bump_results_versions([doc['searchId'] for doc in batch if doc.get('searchId')])
+        leads_scored.inc(len(batch))
+        total += len(batch)
+        logger.info(f"Rescored {total} leads (weights {version})")
@@ -0,0 +1,121 @@
+import random
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from models.leads import SearchRequest, dump_leads
+from services import freshness
+from services.lead_scraper import MockLeadScraperService
+
+scraper_service = MockLeadScraperService()
+
+# Handler liefern Seiten als (Dokumente, nächster Cursor); None heißt: keine weitere Seite
+Page = Tuple[List[dict], Optional[Dict[str, Any]]]
+
+# Seitengröße der Demo-Workflows, falls nicht per Parameter gesetzt
+DEMO_PAGE_SIZE = 10
+
+
+async def _demo_pages(params: Dict[str, Any], cursor: Optional[Dict[str, Any]],
+                      make_item: Callable[[int], dict]) -> AsyncIterator[Page]:
+    """Mock-Daten seitenweise mit Offset-Cursor liefern"""
+    count = params.get('count', 0)
+    page_size = params.get('page_size', DEMO_PAGE_SIZE)
+    offset = cursor['offset'] if cursor else 0
+
+    while offset < count:
+        end = min(offset + page_size, count)
+        docs = [make_item(i) for i in range(offset, end)]
+        offset = end
+        yield docs, ({'offset': offset} if offset < count else None)
+
+
+def _google_maps_targets(params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Scrape-Ziele aus den Parametern: explizite Query oder Zielliste"""
+    if params.get('query'):
+        return [{field: params.get(field) for field in ('query', 'city', 'state', 'zipCode')}]
+    return params.get('targets', [])
+
+
+async def google_maps_handler(params: Dict[str, Any], task_id: str,
+                              cursor: Optional[Dict[str, Any]]) -> AsyncIterator[Page]:
+    """Fällige Google-Maps-Ziele scrapen und nur das Delta zum Vorlauf liefern (eine Seite pro Ziel)"""
+    targets = _google_maps_targets(params)
+    force = params.get('force', False) or params.get('triggered_manually', False)
+    records = await freshness.get_records(targets)
+
+    for index in range(cursor['target_index'] if cursor else 0, len(targets)):
+        target = targets[index]
+        next_cursor = {'target_index': index + 1} if index + 1 < len(targets) else None
+        record = records.get(freshness.target_key(target))
+        now = datetime.utcnow()
+
+        # Stabile Ziele überspringen, bis ihr Intervall abgelaufen ist
+        if not force and not freshness.is_due(record, now):
+            yield [], next_cursor
+            continue
+
+        search_request = SearchRequest(**{**params, **target})
+        leads = await scraper_service.scrape_google_maps(search_request, task_id)
+        delta, fingerprints, changed_fraction, result_hash = freshness.compute_delta(
+            (record or {}).get('fingerprints', {}), dump_leads(leads)
+        )
+        yield delta, next_cursor
+
+        # Erst fortschreiben, wenn das Delta gespeichert ist
+        await freshness.save_record(target, record, fingerprints, changed_fraction, result_hash, now)
+
+
+def linkedin_extractor_handler(params: Dict[str, Any], task_id: str,
+                               cursor: Optional[Dict[str, Any]]) -> AsyncIterator[Page]:
+    """Mock-Profile für den LinkedIn-Extractor"""
+    return _demo_pages(params, cursor, lambda i: {
+        'name': f'Max Mustermann {i}',
+        'position': random.choice(['Sales Director', 'Marketing Manager', 'CEO']),
+        'company': random.choice(['SAP', 'Siemens', 'BMW']),
+        'location': random.choice(['München', 'Berlin', 'Hamburg']),
+        'connections': random.randint(50, 500)
+    })
+
+
+def ecommerce_intelligence_handler(params: Dict[str, Any], task_id: str,
+                                   cursor: Optional[Dict[str, Any]]) -> AsyncIterator[Page]:
+    """Mock-Produkte für E-Commerce-Intelligence"""
+    return _demo_pages(params, cursor, lambda i: {
+        'product_name': f'Produkt {i}',
+        'price': round(random.uniform(20, 500), 2),
+        'rating': round(random.uniform(3.5, 5.0), 1),
+        'category': random.choice(['Electronics', 'Fashion', 'Home'])
+    })
+
+
+def social_media_harvester_handler(params: Dict[str, Any], task_id: str,
+                                   cursor: Optional[Dict[str, Any]]) -> AsyncIterator[Page]:
+    """Mock-Accounts für den Social-Media-Harvester"""
+    return _demo_pages(params, cursor, lambda i: {
+        'username': f'@user_{i}',
+        'platform': random.choice(['Instagram', 'TikTok', 'YouTube']),
+        'followers': random.randint(1000, 100000),
+        'engagement_rate': round(random.uniform(2.0, 8.0), 2)
+    })
+
+
+def real_estate_analyzer_handler(params: Dict[str, Any], task_id: str,
+                                 cursor: Optional[Dict[str, Any]]) -> AsyncIterator[Page]:
+    """Mock-Immobilien für den Real-Estate-Analyzer"""
+    return _demo_pages(params, cursor, lambda i: {
+        'property_type': random.choice(['Wohnung', 'Haus', 'Studio']),
+        'price': random.randint(200000, 800000),
+        'city': random.choice(['München', 'Berlin', 'Hamburg']),
+        'rooms': random.randint(1, 5)
+    })
+
+
+def job_market_intelligence_handler(params: Dict[str, Any], task_id: str,
+                                    cursor: Optional[Dict[str, Any]]) -> AsyncIterator[Page]:
+    """Mock-Stellenanzeigen für Job-Market-Intelligence"""
+    return _demo_pages(params, cursor, lambda i: {
+        'job_title': random.choice(['Developer', 'Manager', 'Designer']),
+        'company': f'Firma {i}',
+        'salary_min': random.randint(40000, 70000),
+        'location': random.choice(['München', 'Berlin', 'Frankfurt'])
+    })
@@ -0,0 +1,161 @@
+import json
+import logging
+import os
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from services import workflow_handlers
+
+ROOT_DIR = Path(__file__).parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+# handler(params, task_id, cursor) liefert Seiten ab dem Checkpoint-Cursor
+WorkflowHandler = Callable[[Dict[str, Any], str, Optional[Dict[str, Any]]], AsyncIterator[workflow_handlers.Page]]
+
+
+@dataclass(frozen=True)
+class WorkflowProfile:
+    """Ausführungsprofil eines Workflows"""
+    name: str
+    handler: Optional[WorkflowHandler]
+    result_collection: str
+    interval_minutes: int = 240
+    concurrency: int = 1
+    batch_size: int = 500
+    timeout_seconds: int = 300
+    default_params: Dict[str, Any] = field(default_factory=dict)
+    # Ergebnisse sind Leads und fließen in die Dashboard-Sketches ein
+    produces_leads: bool = False
+
+    @property
+    def implemented(self) -> bool:
+        return self.handler is not None
+
+
+_PROFILES = [
+    WorkflowProfile(
+        name='google_maps_scraper',
+        handler=workflow_handlers.google_maps_handler,
+        result_collection='google_maps_results',
+        # Nur die Prüfung läuft so oft; gescrapt werden fällige Ziele (services/freshness.py)
+        interval_minutes=30,
+        produces_leads=True,
+        default_params={
+            'targets': [{'query': 'restaurants', 'city': 'München', 'state': 'BY'}],
+            'maxResults': 20
+        }
+    ),
+    WorkflowProfile(
+        name='linkedin_extractor',
+        handler=workflow_handlers.linkedin_extractor_handler,
+        result_collection='linkedin_extractor_results',
+        default_params={'demo': True, 'count': 15}
+    ),
+    WorkflowProfile(
+        name='ecommerce_intelligence',
+        handler=workflow_handlers.ecommerce_intelligence_handler,
+        result_collection='ecommerce_intelligence_results',
+        default_params={'demo': True, 'count': 25}
+    ),
+    WorkflowProfile(
+        name='social_media_harvester',
+        handler=workflow_handlers.social_media_harvester_handler,
+        result_collection='social_media_harvester_results',
+        default_params={'demo': True, 'count': 20}
+    ),
+    WorkflowProfile(
+        name='real_estate_analyzer',
+        handler=workflow_handlers.real_estate_analyzer_handler,
+        result_collection='real_estate_analyzer_results',
+        default_params={'demo': True, 'count': 12}
+    ),
+    WorkflowProfile(
+        name='job_market_intelligence',
+        handler=workflow_handlers.job_market_intelligence_handler,
+        result_collection='job_market_intelligence_results',
+        default_params={'demo': True, 'count': 18}
+    ),
+    # Noch ohne Implementierung: werden gelistet, aber weder geplant noch manuell ausgelöst
+    WorkflowProfile(name='restaurant_analyzer', handler=None, result_collection='restaurant_analyzer_results'),
+    WorkflowProfile(name='finance_data_collector', handler=None, result_collection='finance_data_collector_results'),
+    WorkflowProfile(name='event_scout', handler=None, result_collection='event_scout_results'),
+    WorkflowProfile(name='vehicle_market_intel', handler=None, result_collection='vehicle_market_intel_results'),
+    WorkflowProfile(name='seo_opportunity_finder', handler=None, result_collection='seo_opportunity_finder_results'),
+]
+
+# Felder, die per WORKFLOW_OVERRIDES angepasst werden dürfen, mit erwartetem Typ
+TUNABLE_FIELDS = {
+    'interval_minutes': int,
+    'concurrency': int,
+    'batch_size': int,
+    'timeout_seconds': int,
+    'default_params': dict
+}
+
+
+def _load_overrides() -> Dict[str, Dict[str, Any]]:
+    """WORKFLOW_OVERRIDES lesen; bei ungültigem JSON gelten die Defaults"""
+    raw = os.environ.get('WORKFLOW_OVERRIDES', '')
+    if not raw:
+        return {}
+    try:
+        overrides = json.loads(raw)
+    except ValueError as e:
+        logger.error(f"WORKFLOW_OVERRIDES ist kein gültiges JSON, Defaults werden verwendet: {str(e)}")
+        return {}
+    if not isinstance(overrides, dict):
+        logger.error("WORKFLOW_OVERRIDES muss ein JSON-Objekt sein, Defaults werden verwendet")
+        return {}
+    return overrides
+
+
+def _valid_override(name: str, key: str, value: Any) -> bool:
+    """Override-Wert gegen den deklarierten Typ prüfen"""
+    expected = TUNABLE_FIELDS.get(key)
+    if expected is None:
+        logger.warning(f"Unbekanntes Override-Feld für {name} ignoriert: {key}")
+        return False
+    if expected is int:
+        valid = isinstance(value, int) and not isinstance(value, bool) and value > 0
+    else:
+        valid = isinstance(value, expected)
+    if not valid:
+        logger.warning(f"Ungültiger Override für {name}.{key} ignoriert: {value!r}")
+    return valid
+
+
+def _apply_overrides(profiles: List[WorkflowProfile]) -> Dict[str, WorkflowProfile]:
+    """Profile mit Overrides aus der Umgebung zusammenführen
+
+    WORKFLOW_OVERRIDES ist ein JSON-Objekt, z.B.
+    {"google_maps_scraper": {"batch_size": 100, "concurrency": 2}}
+    """
+    overrides = _load_overrides()
+
+    registry = {}
+    for profile in profiles:
+        changes = overrides.get(profile.name, {})
+        if not isinstance(changes, dict):
+            logger.warning(f"Override für {profile.name} ist kein Objekt und wird ignoriert")
+            changes = {}
+        valid = {k: v for k, v in changes.items() if _valid_override(profile.name, k, v)}
+        registry[profile.name] = replace(profile, **valid)
+    return registry
+
+
+WORKFLOWS: Dict[str, WorkflowProfile] = _apply_overrides(_PROFILES)
+
+
+def get_workflow(name: str) -> Optional[WorkflowProfile]:
+    """Workflow-Profil per Name nachschlagen"""
+    return WORKFLOWS.get(name)
+
+
+def implemented_workflows() -> List[WorkflowProfile]:
+    """Alle Workflows mit Handler"""
+    return [profile for profile in WORKFLOWS.values() if profile.implemented]
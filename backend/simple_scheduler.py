@@ -1,195 +1,252 @@
 import asyncio
 import logging
+import os
 import schedule
-import time
-import threading
-from datetime import datetime
-from database import db
-from services.lead_scraper import MockLeadScraperService
-from models.leads import SearchRequest
+import socket
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from database import db, mongo
+from services.archive import ARCHIVE_RETENTION_DAYS, ARCHIVE_TASK_RETENTION_DAYS, archive_expired
+from services.batch_writer import batch_writer
+from services.cardinality import record_leads_safely
+from services.dedupe import dedupe_leads
+from services.loop_monitor import loop_monitor
+from services.metrics import start_metrics_server
+from services.profiling import run_profiled
+from services.scoring import rescore_stale
+from repositories.storage import storage
+from services.workflow_registry import WORKFLOWS, WorkflowProfile, get_workflow, implemented_workflows
 import uuid
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Wie oft der Loop fällige Jobs prüft (Sekunden)
+SCHEDULER_TICK_SECONDS = 10
+
+# Namespace für deterministische Ergebnis-IDs
+RESULT_ID_NAMESPACE = uuid.UUID('5b1f3c2e-8f4a-4d7e-9c61-2a0d7e3b9f10')
+DUPLICATE_KEY_ERROR = 11000
+
+# Wie oft neue, geänderte oder mit alten Gewichten bewertete Leads neu bewertet werden (Minuten)
+LEAD_SCORE_INTERVAL_MINUTES = int(os.environ.get('LEAD_SCORE_INTERVAL_MINUTES', 5))
+
+# Lease auf laufende Tasks: ohne Verlängerung darf ein anderer Scheduler übernehmen
+TASK_LEASE_SECONDS = 120
+TASK_LEASE_RENEW_SECONDS = 30
+
+class TaskLeaseLost(Exception):
+    """Der Task gehört inzwischen einem anderen Scheduler"""
+
 class SimpleWorkflowScheduler:
     """Einfacher Workflow-Scheduler ohne Redis/Celery"""
     
     def __init__(self):
         self.running = False
-        self.scraper_service = MockLeadScraperService()
+        self.owner_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._semaphores = {name: asyncio.Semaphore(profile.concurrency) for name, profile in WORKFLOWS.items()}
+        self._jobs = set()
+        self._indexed_collections = set()
         
-    async def execute_google_maps_workflow(self):
-        """Google Maps Workflow ausführen"""
-        try:
-            logger.info("Starte Google Maps Workflow...")
-            
-            # Task-Record erstellen
-            task_record = {
-                'id': str(uuid.uuid4()),
-                'workflow_type': 'google_maps_scraper',
-                'status': 'running',
-                'parameters': {'query': 'restaurants', 'city': 'München', 'state': 'BY', 'maxResults': 20},
-                'started_at': datetime.utcnow()
-            }
-            
-            await db.automation_tasks.insert_one(task_record)
-            task_id = task_record['id']
-            
-            # Leads generieren
-            search_request = SearchRequest(**task_record['parameters'])
-            leads = await self.scraper_service.scrape_google_maps(search_request, task_id)
-            
-            # Ergebnisse speichern
-            results = [lead.dict() for lead in leads]
-            for result in results:
-                result['task_id'] = task_id
-                result['created_at'] = datetime.utcnow()
-                result['id'] = str(uuid.uuid4())
-            
-            if results:
-                await db.google_maps_results.insert_many(results)
-            
-            # Task als erfolgreich markieren
-            await db.automation_tasks.update_one(
-                {'id': task_id},
-                {'$set': {
+    def _lease_deadline(self) -> datetime:
+        return datetime.utcnow() + timedelta(seconds=TASK_LEASE_SECONDS)
+
+    async def _update_owned_task(self, task_id: str, update: Dict[str, Any]):
+        """Task nur ändern, solange dieser Scheduler die Lease hält
+
+        updated_at markiert die Änderung für den Live-Update-Poller.
+        """
+        update = {**update, '$set': {**update.get('$set', {}), 'updated_at': datetime.utcnow()}}
+        result = await db.automation_tasks.update_one({'id': task_id, 'owner': self.owner_id}, update)
+        if result.matched_count == 0:
+            raise TaskLeaseLost(task_id)
+
+    async def run_workflow(self, profile: WorkflowProfile, parameters: Optional[Dict[str, Any]] = None,
+                           task_id: Optional[str] = None, checkpoint: Optional[Dict[str, Any]] = None):
+        """Workflow gemäß Registry-Profil ausführen, ggf. ab einem Checkpoint
+
+        Übergebene Tasks müssen vorher per _claim_task übernommen worden sein.
+        """
+        params = {**profile.default_params, **(parameters or {})}
+
+        async with self._semaphores[profile.name]:
+            try:
+                logger.info(f"Starte Workflow: {profile.name}")
+
+                # Task-Record erstellen bzw. übernommenen Task starten
+                if task_id is None:
+                    task_record = {
+                        'id': str(uuid.uuid4()),
+                        'workflow_type': profile.name,
+                        'status': 'running',
+                        'parameters': params,
+                        'started_at': datetime.utcnow(),
+                        'owner': self.owner_id,
+                        'lease_until': self._lease_deadline()
+                    }
+                    await db.automation_tasks.insert_one(task_record)
+                    task_id = task_record['id']
+                else:
+                    await self._update_owned_task(task_id, {'$set': {'status': 'running', 'parameters': params}})
+
+                results_count = await asyncio.wait_for(
+                    self._run_pages(profile, params, task_id, checkpoint or {}),
+                    timeout=profile.timeout_seconds
+                )
+
+                # Task als erfolgreich markieren
+                await self._update_owned_task(task_id, {'$set': {
                     'status': 'completed',
                     'completed_at': datetime.utcnow(),
-                    'results_count': len(results)
-                }}
+                    'results_count': results_count
+                }})
+
+                logger.info(f"Workflow {profile.name} erfolgreich: {results_count} Datensätze")
+
+            except TaskLeaseLost:
+                logger.warning(f"Lease für Task {task_id} ({profile.name}) verloren, Ausführung abgebrochen")
+
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                logger.error(f"Workflow {profile.name} fehlgeschlagen: {error}")
+                if task_id is not None:
+                    try:
+                        await self._update_owned_task(task_id, {'$set': {
+                            'status': 'failed',
+                            'completed_at': datetime.utcnow(),
+                            'error': error
+                        }})
+                    except Exception as update_error:
+                        logger.error(f"Task {task_id} konnte nicht als fehlgeschlagen markiert werden: {str(update_error)}")
+
+    async def _run_pages(self, profile: WorkflowProfile, params: Dict[str, Any], task_id: str,
+                         checkpoint: Dict[str, Any]) -> int:
+        """Handler-Seiten speichern und nach jeder Seite einen Checkpoint schreiben"""
+        pages = checkpoint.get('pages', 0)
+        results_count = checkpoint.get('results_count', 0)
+        if checkpoint.get('done'):
+            return results_count
+
+        collection = db[profile.result_collection]
+        await self._ensure_result_index(profile.result_collection)
+
+        async for docs, next_cursor in profile.handler(params, task_id, checkpoint.get('cursor')):
+            # Deterministische IDs: eine nach Absturz wiederholte Seite erzeugt keine Duplikate
+            for index, doc in enumerate(docs):
+                doc['task_id'] = task_id
+                doc['created_at'] = datetime.utcnow()
+                doc['id'] = str(uuid.uuid5(RESULT_ID_NAMESPACE, f"{task_id}:{pages}:{index}"))
+
+            for offset in range(0, len(docs), profile.batch_size):
+                await self._insert_idempotent(collection, docs[offset:offset + profile.batch_size])
+            # Sketches sind idempotent: eine wiederholte Seite zählt nichts doppelt
+            if profile.produces_leads and docs:
+                await record_leads_safely(storage, docs)
+
+            # Checkpoint direkt schreiben: er muss vor der nächsten Seite dauerhaft sein
+            pages += 1
+            results_count += len(docs)
+            await self._update_owned_task(task_id, {'$set': {
+                'checkpoint': {
+                    'cursor': next_cursor,
+                    'pages': pages,
+                    'results_count': results_count,
+                    'done': next_cursor is None,
+                    'updated_at': datetime.utcnow()
+                },
+                'lease_until': self._lease_deadline()
+            }})
+
+        return results_count
+
+    async def _ensure_result_index(self, collection_name: str):
+        """Unique-Index auf id, damit wiederholte Inserts idempotent sind"""
+        if collection_name not in self._indexed_collections:
+            await db[collection_name].create_index('id', unique=True)
+            self._indexed_collections.add(collection_name)
+
+    async def _insert_idempotent(self, collection, docs: list):
+        """Batch einfügen, bereits vorhandene IDs überspringen"""
+        try:
+            await collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            if any(error.get('code') != DUPLICATE_KEY_ERROR for error in e.details.get('writeErrors', [])):
+                raise
+
+    async def _claim_task(self, query: Dict[str, Any], update: Optional[Dict[str, Any]] = None):
+        """Einen passenden Task atomar mit Lease für diesen Scheduler übernehmen"""
+        return await db.automation_tasks.find_one_and_update(
+            query,
+            {'$set': {'status': 'claimed', 'owner': self.owner_id, 'lease_until': self._lease_deadline(),
+                      'updated_at': datetime.utcnow()},
+             **(update or {})},
+            sort=[('started_at', 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def renew_leases(self):
+        """Leases aller eigenen laufenden Tasks verlängern"""
+        try:
+            await db.automation_tasks.update_many(
+                {'owner': self.owner_id, 'status': {'$in': ['running', 'claimed']}},
+                {'$set': {'lease_until': self._lease_deadline()}}
             )
-            
-            logger.info(f"Google Maps Workflow erfolgreich: {len(results)} Leads generiert")
-            
         except Exception as e:
-            logger.error(f"Google Maps Workflow fehlgeschlagen: {str(e)}")
-            if 'task_id' in locals():
-                await db.automation_tasks.update_one(
-                    {'id': task_id},
-                    {'$set': {
-                        'status': 'failed',
-                        'completed_at': datetime.utcnow(),
-                        'error': str(e)
-                    }}
+            logger.error(f"Verlängern der Task-Leases fehlgeschlagen: {str(e)}")
+
+    async def resume_interrupted_tasks(self):
+        """Tasks mit abgelaufener Lease ab ihrem letzten Checkpoint fortsetzen
+
+        Eine Lease läuft nur ab, wenn der besitzende Scheduler keine
+        Heartbeats mehr schreibt, also abgestürzt oder beendet ist.
+        """
+        try:
+            while True:
+                task = await self._claim_task(
+                    {
+                        'status': {'$in': ['running', 'claimed']},
+                        'workflow_type': {'$in': [profile.name for profile in implemented_workflows()]},
+                        '$or': [
+                            {'lease_until': {'$lt': datetime.utcnow()}},
+                            {'lease_until': {'$exists': False}}
+                        ]
+                    },
+                    {'$inc': {'resume_count': 1}}
                 )
-    
-    async def execute_demo_workflows(self):
-        """Demo-Workflows für andere Bereiche ausführen"""
+                if not task:
+                    break
+
+                profile = get_workflow(task['workflow_type'])
+                logger.info(f"Setze Task {task['id']} ({profile.name}) ab Checkpoint fort")
+                self._spawn(self.run_workflow, profile, task.get('parameters'), task['id'], task.get('checkpoint'))
+
+        except Exception as e:
+            logger.error(f"Fortsetzen unterbrochener Tasks fehlgeschlagen: {str(e)}")
+
+    async def process_scheduled_tasks(self):
+        """Manuell ausgelöste Tasks übernehmen"""
         try:
-            workflows = [
-                {'type': 'linkedin_extractor', 'data_count': 15},
-                {'type': 'ecommerce_intelligence', 'data_count': 25},
-                {'type': 'social_media_harvester', 'data_count': 20},
-                {'type': 'real_estate_analyzer', 'data_count': 12},
-                {'type': 'job_market_intelligence', 'data_count': 18}
-            ]
-            
-            for workflow in workflows:
-                logger.info(f"Starte Demo-Workflow: {workflow['type']}")
-                
-                # Task-Record
-                task_record = {
-                    'id': str(uuid.uuid4()),
-                    'workflow_type': workflow['type'],
-                    'status': 'running',
-                    'parameters': {'demo': True, 'count': workflow['data_count']},
-                    'started_at': datetime.utcnow()
-                }
-                
-                await db.automation_tasks.insert_one(task_record)
-                task_id = task_record['id']
-                
-                # Mock-Daten generieren
-                mock_data = self._generate_workflow_data(workflow['type'], workflow['data_count'])
-                
-                # In entsprechende Collection speichern
-                collection_name = f"{workflow['type']}_results"
-                collection = getattr(db, collection_name)
-                
-                for data in mock_data:
-                    data['task_id'] = task_id
-                    data['created_at'] = datetime.utcnow()
-                    data['id'] = str(uuid.uuid4())
-                
-                if mock_data:
-                    await collection.insert_many(mock_data)
-                
-                # Task abschließen
-                await db.automation_tasks.update_one(
-                    {'id': task_id},
-                    {'$set': {
-                        'status': 'completed',
+            while True:
+                task = await self._claim_task({'status': 'scheduled'})
+                if not task:
+                    break
+
+                profile = get_workflow(task.get('workflow_type'))
+                if profile is None or not profile.implemented:
+                    await self._update_owned_task(task['id'], {'$set': {
+                        'status': 'failed',
                         'completed_at': datetime.utcnow(),
-                        'results_count': len(mock_data)
-                    }}
-                )
-                
-                logger.info(f"Demo-Workflow {workflow['type']} erfolgreich: {len(mock_data)} Datensätze")
-                
-                # Kurze Pause zwischen Workflows
-                await asyncio.sleep(2)
-                
+                        'error': 'Workflow nicht implementiert'
+                    }})
+                    continue
+
+                self._spawn(self.run_workflow, profile, task.get('parameters'), task['id'])
+
         except Exception as e:
-            logger.error(f"Demo-Workflows fehlgeschlagen: {str(e)}")
-    
-    def _generate_workflow_data(self, workflow_type: str, count: int):
-        """Mock-Daten für verschiedene Workflows generieren"""
-        import random
-        
-        if workflow_type == 'linkedin_extractor':
-            return [
-                {
-                    'name': f'Max Mustermann {i}',
-                    'position': random.choice(['Sales Director', 'Marketing Manager', 'CEO']),
-                    'company': random.choice(['SAP', 'Siemens', 'BMW']),
-                    'location': random.choice(['München', 'Berlin', 'Hamburg']),
-                    'connections': random.randint(50, 500)
-                } for i in range(count)
-            ]
-        
-        elif workflow_type == 'ecommerce_intelligence':
-            return [
-                {
-                    'product_name': f'Produkt {i}',
-                    'price': round(random.uniform(20, 500), 2),
-                    'rating': round(random.uniform(3.5, 5.0), 1),
-                    'category': random.choice(['Electronics', 'Fashion', 'Home'])
-                } for i in range(count)
-            ]
-        
-        elif workflow_type == 'social_media_harvester':
-            return [
-                {
-                    'username': f'@user_{i}',
-                    'platform': random.choice(['Instagram', 'TikTok', 'YouTube']),
-                    'followers': random.randint(1000, 100000),
-                    'engagement_rate': round(random.uniform(2.0, 8.0), 2)
-                } for i in range(count)
-            ]
-        
-        elif workflow_type == 'real_estate_analyzer':
-            return [
-                {
-                    'property_type': random.choice(['Wohnung', 'Haus', 'Studio']),
-                    'price': random.randint(200000, 800000),
-                    'city': random.choice(['München', 'Berlin', 'Hamburg']),
-                    'rooms': random.randint(1, 5)
-                } for i in range(count)
-            ]
-        
-        elif workflow_type == 'job_market_intelligence':
-            return [
-                {
-                    'job_title': random.choice(['Developer', 'Manager', 'Designer']),
-                    'company': f'Firma {i}',
-                    'salary_min': random.randint(40000, 70000),
-                    'location': random.choice(['München', 'Berlin', 'Frankfurt'])
-                } for i in range(count)
-            ]
-        
-        return []
-    
+            logger.error(f"Übernahme geplanter Tasks fehlgeschlagen: {str(e)}")
+
     async def health_check(self):
         """Einfacher System-Health-Check"""
         try:
@@ -205,76 +262,143 @@ class SimpleWorkflowScheduler:
                 }
             }
             
-            await db.health_checks.insert_one(health_record)
+            await batch_writer.insert('health_checks', health_record)
             logger.info("Health-Check erfolgreich durchgeführt")
             
         except Exception as e:
             logger.error(f"Health-Check fehlgeschlagen: {str(e)}")
     
+    async def rescore_leads(self):
+        """Leads ohne aktuellen Score bewerten (neu importiert oder Gewichte geändert)"""
+        try:
+            rescored = await rescore_stale(storage)
+            if rescored:
+                logger.info(f"Lead-Scoring: {rescored} Leads neu bewertet")
+        except Exception as e:
+            logger.error(f"Lead-Scoring fehlgeschlagen: {str(e)}")
+
+    async def dedupe_leads(self):
+        """Doppelte Leads über leads und google_maps_results clustern"""
+        try:
+            result = await dedupe_leads(storage)
+            logger.info(f"Dedupe abgeschlossen: {result['clusters']} Cluster, {result['updated']} Leads aktualisiert")
+        except Exception as e:
+            logger.error(f"Dedupe fehlgeschlagen: {str(e)}")
+
     async def cleanup_old_data(self):
-        """Alte Daten bereinigen (vereinfacht)"""
+        """Abgelaufene Daten gedrosselt ins Cold-Storage-Archiv verschieben"""
         try:
-            from datetime import timedelta
-            cutoff_date = datetime.utcnow() - timedelta(days=7)
+            now = datetime.utcnow()
+            result_cutoff = now - timedelta(days=ARCHIVE_RETENTION_DAYS)
+            history_cutoff = now - timedelta(days=ARCHIVE_TASK_RETENTION_DAYS)
             
-            collections = [
-                'automation_tasks', 'health_checks', 'google_maps_results',
-                'linkedin_extractor_results', 'ecommerce_intelligence_results'
+            # Laufende oder fortsetzbare Tasks werden nie archiviert
+            targets = [
+                ('automation_tasks', history_cutoff, {'status': {'$in': ['completed', 'failed']}}),
+                ('health_checks', history_cutoff, None),
+                ('google_maps_results', result_cutoff, None),
+                ('linkedin_extractor_results', result_cutoff, None),
+                ('ecommerce_intelligence_results', result_cutoff, None)
             ]
             
-            total_deleted = 0
-            for collection_name in collections:
+            total_archived = 0
+            for collection_name, cutoff_date, extra_filter in targets:
                 try:
-                    collection = getattr(db, collection_name)
-                    result = await collection.delete_many({'created_at': {'$lt': cutoff_date}})
-                    total_deleted += result.deleted_count
-                except:
-                    pass
+                    total_archived += await archive_expired(collection_name, cutoff_date, extra_filter)
+                except Exception as e:
+                    logger.error(f"Archivierung von {collection_name} fehlgeschlagen: {str(e)}")
             
-            logger.info(f"Cleanup abgeschlossen: {total_deleted} alte Records gelöscht")
+            logger.info(f"Cleanup abgeschlossen: {total_archived} alte Records archiviert")
             
         except Exception as e:
             logger.error(f"Cleanup fehlgeschlagen: {str(e)}")
     
+    def _spawn(self, coroutine_function, *args):
+        """Job als Task im Scheduler-Loop starten (optional profiliert, siehe PROFILING_JOBS)"""
+        name = coroutine_function.__name__
+        if name == 'run_workflow' and args:
+            name = f"run_workflow-{args[0].name}"
+        job = asyncio.get_running_loop().create_task(run_profiled(name, coroutine_function(*args)), name=name)
+        self._jobs.add(job)
+        job.add_done_callback(self._jobs.discard)
+
     def schedule_workflows(self):
-        """Workflows planen ohne Redis/Celery"""
-        # Google Maps alle 2 Stunden
-        schedule.every(2).hours.do(lambda: asyncio.run(self.execute_google_maps_workflow()))
-        
-        # Demo-Workflows alle 4 Stunden  
-        schedule.every(4).hours.do(lambda: asyncio.run(self.execute_demo_workflows()))
-        
+        """Workflows gemäß Registry planen"""
+        for profile in implemented_workflows():
+            schedule.every(profile.interval_minutes).minutes.do(self._spawn, self.run_workflow, profile)
+
+        # Manuell ausgelöste Tasks jede Minute übernehmen
+        schedule.every(1).minutes.do(self._spawn, self.process_scheduled_tasks)
+
+        # Leases verlängern und verwaiste Tasks anderer Scheduler übernehmen
+        schedule.every(TASK_LEASE_RENEW_SECONDS).seconds.do(self._spawn, self.renew_leases)
+        schedule.every(1).minutes.do(self._spawn, self.resume_interrupted_tasks)
+
         # Health-Checks alle 30 Minuten
-        schedule.every(30).minutes.do(lambda: asyncio.run(self.health_check()))
-        
+        schedule.every(30).minutes.do(self._spawn, self.health_check)
+
+        # Veraltete Lead-Scores inkrementell nachziehen
+        schedule.every(LEAD_SCORE_INTERVAL_MINUTES).minutes.do(self._spawn, self.rescore_leads)
+
         # Cleanup täglich
-        schedule.every().day.at("02:00").do(lambda: asyncio.run(self.cleanup_old_data()))
-        
-        logger.info("Workflows geplant: Google Maps (2h), Demo-Workflows (4h), Health-Checks (30min), Cleanup (täglich)")
-    
+        schedule.every().day.at("02:00").do(self._spawn, self.cleanup_old_data)
+
+        # Dubletten täglich nach dem Cleanup neu clustern
+        schedule.every().day.at("03:00").do(self._spawn, self.dedupe_leads)
+
+        planned = ", ".join(f"{p.name} ({p.interval_minutes}min)" for p in implemented_workflows())
+        logger.info(f"Workflows geplant: {planned}, Health-Checks (30min), "
+                    f"Lead-Scoring ({LEAD_SCORE_INTERVAL_MINUTES}min), Cleanup und Dedupe (täglich)")
+
+    async def _run(self):
+        """Scheduler-Loop mit einem durchgehenden Event-Loop"""
+        mongo.connect()
+        batch_writer.start()
+        loop_monitor.start()
+        self.schedule_workflows()
+
+        # Prometheus-Endpunkt des Scheduler-Prozesses (SCHEDULER_METRICS_PORT)
+        metrics_server = None
+        try:
+            metrics_server = start_metrics_server()
+        except OSError as e:
+            logger.error(f"Metrics-Server nicht gestartet: {str(e)}")
+
+        # Unterbrochene Tasks zuerst fortsetzen
+        await self.resume_interrupted_tasks()
+
+        # Initial-Workflows ausführen
+        for profile in implemented_workflows():
+            self._spawn(self.run_workflow, profile)
+
+        try:
+            while self.running:
+                try:
+                    schedule.run_pending()
+                except Exception as e:
+                    logger.error(f"Scheduler-Fehler: {str(e)}")
+                await asyncio.sleep(SCHEDULER_TICK_SECONDS)
+
+            if self._jobs:
+                await asyncio.gather(*self._jobs, return_exceptions=True)
+        finally:
+            # Gepufferte Writes vor dem Beenden sicher schreiben
+            await batch_writer.stop()
+            await loop_monitor.stop()
+            mongo.close()
+            if metrics_server is not None:
+                metrics_server.shutdown()
+
     def start(self):
         """Scheduler starten"""
         self.running = True
-        self.schedule_workflows()
-        
         logger.info("Simple Workflow Scheduler gestartet")
-        
-        # Initial-Workflows ausführen
-        asyncio.run(self.execute_google_maps_workflow())
-        asyncio.run(self.execute_demo_workflows())
-        
-        # Scheduler-Loop
-        while self.running:
-            try:
-                schedule.run_pending()
-                time.sleep(60)  # Prüfe jede Minute
-            except KeyboardInterrupt:
-                logger.info("Scheduler gestoppt")
-                break
-            except Exception as e:
-                logger.error(f"Scheduler-Fehler: {str(e)}")
-                time.sleep(60)
-    
+
+        try:
+            asyncio.run(self._run())
+        except KeyboardInterrupt:
+            logger.info("Scheduler gestoppt")
+
     def stop(self):
         """Scheduler stoppen"""
         self.running = False
@@ -282,4 +406,4 @@ class SimpleWorkflowScheduler:
 
 if __name__ == "__main__":
     scheduler = SimpleWorkflowScheduler()
-    scheduler.start()
\ No newline at end of file
+    scheduler.start()
@@ -35,8 +35,41 @@ const AutomationDashboard = () => {
 
   useEffect(() => {
     fetchDashboardData();
-    const interval = setInterval(fetchDashboardData, 30000); // Alle 30 Sekunden
-    return () => clearInterval(interval);
+
+    // Live-Updates: nur bei Task-Änderungen neu laden (gebündelt), Polling nur solange der Stream fehlt
+    let interval = null;
+    let reloadTimer = null;
+    const startPolling = () => {
+      if (!interval) interval = setInterval(fetchDashboardData, 30000); // Alle 30 Sekunden
+    };
+    const stopPolling = () => {
+      clearInterval(interval);
+      interval = null;
+    };
+    const scheduleReload = () => {
+      if (!reloadTimer) {
+        reloadTimer = setTimeout(() => {
+          reloadTimer = null;
+          fetchDashboardData();
+        }, 1000);
+      }
+    };
+
+    if (typeof EventSource === "undefined") {
+      startPolling();
+      return () => stopPolling();
+    }
+    const events = new EventSource(`${API}/live/events?collections=automation_tasks`);
+    events.onopen = stopPolling;
+    events.onerror = startPolling;
+    events.addEventListener("automation_tasks", scheduleReload);
+    events.addEventListener("resync", scheduleReload);
+
+    return () => {
+      events.close();
+      stopPolling();
+      clearTimeout(reloadTimer);
+    };
   }, []);
 
   const fetchDashboardData = async () => {
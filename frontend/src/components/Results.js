@@ -56,6 +56,21 @@ const Results = () => {
     }
   }, [navigate]);
 
+  // Anreicherungen aus anderen Tabs/Sitzungen live übernehmen
+  const searchId = results.length ? results[0].searchId : null;
+  useEffect(() => {
+    if (!searchId || typeof EventSource === "undefined") return;
+    const events = new EventSource(`${API}/live/events?collections=leads&searchId=${encodeURIComponent(searchId)}`);
+    events.addEventListener("leads", (message) => {
+      const { id, doc } = JSON.parse(message.data);
+      if (!doc.email) return;
+      setResults(prev => prev.map(result =>
+        result.id === id && result.email !== doc.email ? { ...result, email: doc.email } : result
+      ));
+    });
+    return () => events.close();
+  }, [searchId]);
+
   useEffect(() => {
     if (filterText) {
       const filtered = results.filter(result => 
@@ -0,0 +1,22 @@
+from benchmarks.api_bench import compare, percentile
+
+
+def test_percentile_uses_nearest_rank():
+    assert percentile([1, 2, 3, 4, 5], 0.5) == 3
+    assert percentile([1, 2, 3, 4, 5], 0.99) == 5
+    assert percentile([], 0.5) is None
+
+
+def test_compare_flags_latency_and_throughput_regressions():
+    baseline = {'endpoints': {
+        'GET /a': {'p95_ms': 10.0, 'throughput_rps': 1000},
+        'GET /b': {'p95_ms': 10.0, 'throughput_rps': 1000},
+    }}
+    results = {'endpoints': {
+        'GET /a': {'p95_ms': 11.0, 'throughput_rps': 950},
+        'GET /b': {'p95_ms': 15.0, 'throughput_rps': 700},
+        'GET /new': {'p95_ms': 1.0, 'throughput_rps': 1},
+    }}
+    regressions = compare(results, baseline, threshold=0.2)
+    assert len(regressions) == 2
+    assert all(r.startswith('GET /b') for r in regressions)
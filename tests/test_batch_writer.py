@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from services import batch_writer as batch_writer_module
+from services.batch_writer import BatchWriter
+
+
+class FakeCollection:
+    def __init__(self, store, name, delay=0.0, fail_indices=()):
+        self.store = store
+        self.name = name
+        self.delay = delay
+        self.fail_indices = set(fail_indices)
+
+    async def insert_many(self, documents, ordered=True):
+        await asyncio.sleep(self.delay)
+        self.store.setdefault(self.name, []).extend(
+            doc for index, doc in enumerate(documents) if index not in self.fail_indices
+        )
+        if self.fail_indices:
+            raise BulkWriteError({'writeErrors': [{'index': i, 'code': 11000} for i in sorted(self.fail_indices)]})
+
+    async def bulk_write(self, requests, ordered=True):
+        await asyncio.sleep(self.delay)
+        self.store.setdefault(self.name, []).extend(requests)
+
+
+class FakeDatabase:
+    def __init__(self, delay=0.0, fail_indices=()):
+        self.store = {}
+        self.delay = delay
+        self.fail_indices = fail_indices
+        self.calls = []
+
+    def get_collection(self, name, write_concern=None):
+        self.calls.append(name)
+        return FakeCollection(self.store, name, self.delay, self.fail_indices)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    database = FakeDatabase()
+    monkeypatch.setattr(batch_writer_module, 'db', database)
+    return database
+
+
+def test_flushes_on_size_and_batches_inserts(fake_db):
+    async def scenario():
+        writer = BatchWriter(max_batch_size=3, flush_interval=10)
+        await asyncio.gather(*[writer.insert('leads', {'i': i}, wait=True) for i in range(6)])
+        await writer.stop()
+
+    asyncio.run(scenario())
+    assert [doc['i'] for doc in fake_db.store['leads']] == list(range(6))
+    assert fake_db.calls == ['leads', 'leads']
+
+
+def test_backpressure_does_not_lose_blocked_writes(fake_db):
+    async def scenario():
+        writer = BatchWriter(max_batch_size=3, flush_interval=0.01, max_pending=5)
+        await asyncio.gather(*[writer.insert('leads', {'i': i}) for i in range(20)])
+        await writer.stop()
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert sorted(doc['i'] for doc in fake_db.store['leads']) == list(range(20))
+    assert writer.pending == 0
+
+
+def test_inserts_are_written_before_updates(fake_db):
+    async def scenario():
+        writer = BatchWriter(flush_interval=10)
+        await writer.update('tasks', {'id': 'a'}, {'$set': {'status': 'running'}})
+        await writer.insert('tasks', {'id': 'a'})
+        await writer.update('tasks', {'id': 'a'}, {'$set': {'status': 'completed'}})
+        await writer.stop()
+
+    asyncio.run(scenario())
+    written = fake_db.store['tasks']
+    assert written[0] == {'id': 'a'}
+    assert [op._doc['$set']['status'] for op in written[1:]] == ['running', 'completed']
+
+
+def test_partial_failure_only_fails_affected_waiters(monkeypatch):
+    database = FakeDatabase(fail_indices=[1])
+    monkeypatch.setattr(batch_writer_module, 'db', database)
+
+    async def scenario():
+        writer = BatchWriter(max_batch_size=3, flush_interval=10)
+        results = await asyncio.gather(
+            *[writer.insert('leads', {'i': i}, wait=True) for i in range(3)],
+            return_exceptions=True
+        )
+        await writer.stop()
+        return results
+
+    results = asyncio.run(scenario())
+    assert results[0] is None and results[2] is None
+    assert isinstance(results[1], BulkWriteError)
+
+
+def test_stop_waits_for_in_flight_write(monkeypatch):
+    database = FakeDatabase(delay=0.05)
+    monkeypatch.setattr(batch_writer_module, 'db', database)
+
+    async def scenario():
+        writer = BatchWriter(max_batch_size=1, flush_interval=0.01)
+        waiters = [asyncio.ensure_future(writer.insert('leads', {'i': i}, wait=True)) for i in range(3)]
+        await asyncio.sleep(0.02)
+        await asyncio.wait_for(writer.stop(), timeout=2)
+        await asyncio.wait_for(asyncio.gather(*waiters), timeout=2)
+
+    asyncio.run(scenario())
+    assert sorted(doc['i'] for doc in database.store['leads']) == [0, 1, 2]
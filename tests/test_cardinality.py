@@ -0,0 +1,51 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from repositories.sqlite import SQLiteStorage
+from services.cardinality import (ALL_KEY, HyperLogLog, cardinalities, day_keys, record_leads, search_key,
+                                  sketch_values)
+
+
+def test_hyperloglog_is_within_about_one_percent_and_merges():
+    first = HyperLogLog().update(f"business-{i}" for i in range(60000))
+    second = HyperLogLog().update(f"business-{i}" for i in range(40000, 100000))
+    assert abs(first.count() - 60000) / 60000 < 0.03
+    merged = HyperLogLog(first.to_bytes()).merge(second)
+    assert abs(merged.count() - 100000) / 100000 < 0.03
+    # Small sets are counted exactly enough for a dashboard
+    assert HyperLogLog().update(['a', 'b', 'a', 'c']).count() == 3
+
+
+def test_sketch_values_normalize_domains_and_cities():
+    values = sketch_values({'businessName': 'Sakura Sushi', 'address': '1 Main St, New York, NY 10001',
+                            'website': 'https://www.sakura.com/menu'})
+    assert values == {'businesses': 'sakura sushi|1 main st, new york, ny 10001', 'domains': 'sakura.com',
+                      'cities': 'new york|NY'}
+    assert sketch_values({})['domains'] is None
+
+
+def test_sketches_are_kept_per_day_search_and_overall():
+    async def scenario():
+        storage = SQLiteStorage(':memory:')
+        await storage.setup()
+        day = datetime(2024, 5, 1, 12)
+        leads = [{'businessName': f"Shop {i % 30}", 'address': f"{i % 30} Main St, Austin, TX 78701",
+                  'website': f"https://shop{i % 10}.com", 'searchId': 's1' if i < 50 else 's2', 'created_at': day}
+                 for i in range(100)]
+        await record_leads(storage, leads[:50])
+        await record_leads(storage, leads[50:])
+        # Ingesting a page again changes nothing
+        await record_leads(storage, leads[50:])
+
+        assert await cardinalities(storage, [ALL_KEY]) == {'businesses': 30, 'domains': 10, 'cities': 1}
+        assert await cardinalities(storage, day_keys(day.date(), day.date())) == \
+            await cardinalities(storage, [ALL_KEY])
+        assert (await cardinalities(storage, [search_key('s2')]))['businesses'] == 30
+        assert await cardinalities(storage, [search_key('missing')]) == {'businesses': 0, 'domains': 0, 'cities': 0}
+        await storage.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,30 @@
+from database import MongoConnectionManager, PoolMetrics
+
+
+def test_pool_metrics_track_in_use_and_waits():
+    metrics = PoolMetrics()
+    metrics.connection_check_out_started(None)
+    metrics.connection_checked_out(None)
+    metrics.connection_check_out_started(None)
+    metrics.connection_checked_out(None)
+    metrics.connection_checked_in(None)
+
+    snapshot = metrics.snapshot()
+    assert snapshot['in_use'] == 1
+    assert snapshot['checkouts'] == 2
+    assert snapshot['wait_seconds_max'] >= 0
+
+
+def test_pool_options_come_from_environment(monkeypatch):
+    monkeypatch.setenv('MONGO_MAX_POOL_SIZE', '7')
+    monkeypatch.setenv('MONGO_ANALYTICS_MAX_POOL_SIZE', '3')
+    monkeypatch.setenv('MONGO_COMPRESSORS', 'zstd')
+    manager = MongoConnectionManager()
+    manager.connect()
+    try:
+        stats = manager.pool_stats()
+        assert stats['primary']['max_pool_size'] == 7
+        assert stats['analytics']['max_pool_size'] == 3
+        assert manager.analytics_db.read_preference.mongos_mode == 'secondaryPreferred'
+    finally:
+        manager.close()
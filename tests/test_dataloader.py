@@ -0,0 +1,50 @@
+import asyncio
+
+from services.dataloader import DataLoader
+
+
+def test_concurrent_loads_share_one_batch():
+    calls = []
+
+    async def fetch(keys):
+        calls.append(sorted(keys))
+        return {key: {'id': key} for key in keys if key != 'missing'}
+
+    async def scenario():
+        loader = DataLoader('test', fetch)
+        results = await asyncio.gather(*(loader.load(f'k{i % 10}') for i in range(50)), loader.load('missing'))
+        return results
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert len(calls[0]) == 11
+    assert results[3] == {'id': 'k3'}
+    assert results[-1] is None
+
+
+def test_loads_after_a_batch_query_again():
+    calls = []
+
+    async def fetch(keys):
+        calls.append(list(keys))
+        return {key: len(calls) for key in keys}
+
+    async def scenario():
+        loader = DataLoader('fresh', fetch)
+        return await loader.load('a'), await loader.load('a')
+
+    # Nothing is cached across batches, so a write in between would be seen
+    assert asyncio.run(scenario()) == (1, 2)
+    assert len(calls) == 2
+
+
+def test_batch_errors_reach_every_caller():
+    async def fetch(keys):
+        raise RuntimeError('database down')
+
+    async def scenario():
+        loader = DataLoader('failing', fetch)
+        return await asyncio.gather(loader.load('a'), loader.load('b'), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
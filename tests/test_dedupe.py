@@ -0,0 +1,102 @@
+import asyncio
+import random
+import string
+
+import pytest
+
+pytest.importorskip('numpy')
+
+import numpy as np
+
+from repositories.sqlite import SQLiteStorage
+from services.dedupe import (assign_clusters, cluster_labels, dedupe_leads, minhash, normalize, normalize_address,
+                             normalize_phone, one_per_cluster, shingles)
+
+
+def _labels(docs):
+    return cluster_labels(np.vstack([minhash(shingles(doc)) for doc in docs])).tolist()
+
+
+def test_normalization_ignores_case_punctuation_and_abbreviations():
+    assert normalize("Tony's  Café!") == 'tonys cafe'
+    assert normalize_address('123 Main Street, New York') == '123 main st new york'
+    assert normalize_phone('+1 (212) 555-0123') == normalize_phone('212.555.0123') == '2125550123'
+    tokens = shingles({'businessName': 'Bar', 'address': '1 Main St, Austin, TX 78701',
+                       'phone': '512-555-0100', 'website': 'https://www.bar.com/x'})
+    assert 'l:austin tx 78701' in tokens and 'p:5125550100' in tokens and 'w:bar.com' in tokens
+
+
+def test_variants_of_one_business_cluster_and_other_locations_do_not():
+    docs = [
+        {'id': '1', 'businessName': "Tony's Pizzeria", 'address': '123 Main Street, New York, NY 10001',
+         'phone': '(212) 555-0123'},
+        {'id': '2', 'businessName': 'Tonys Pizzeria NYC', 'address': '123 Main St, New York, NY 10001',
+         'phone': '+1 212-555-0123'},
+        {'id': '3', 'businessName': "Tony's Pizzeria", 'address': '9 Park Ave, New York, NY 10001',
+         'phone': '(212) 555-0789'},
+        {'id': '4', 'businessName': 'Sakura Sushi', 'address': '77 Green Ave, Austin, TX 78701'},
+    ]
+    labels = _labels(docs)
+    assert labels[0] == labels[1]
+    assert len({labels[0], labels[2], labels[3]}) == 3
+
+
+def test_random_businesses_stay_apart_and_copies_are_found():
+    rng = random.Random(7)
+
+    def word():
+        return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 8))).title()
+
+    docs = [{'id': str(i), 'businessName': f"{word()} {rng.choice(['Cafe', 'Bar', 'Grill'])}",
+             'address': f"{rng.randint(1, 9999)} {word()} St, Austin, TX 78701"} for i in range(2000)]
+    copies = [dict(doc, id=f"{doc['id']}-copy", businessName=doc['businessName'].upper(),
+                   address=doc['address'].replace(' St,', ' Street,')) for doc in docs[:200]]
+    labels = _labels(docs + copies)
+    assert len(set(labels)) == 2000
+    assert all(labels[i] == labels[2000 + i] for i in range(200))
+
+
+def test_assign_clusters_picks_the_most_complete_primary():
+    docs = [{'id': 'b', 'businessName': 'X', 'score': 40},
+            {'id': 'a', 'businessName': 'X', 'score': 70, 'email': 'x@x.com'},
+            {'id': 'c', 'businessName': 'Y'}]
+    fields = assign_clusters(docs, np.array([0, 0, 2]))
+    assert fields[0]['cluster_id'] == fields[1]['cluster_id'] and fields[0]['cluster_size'] == 2
+    assert [f['cluster_primary'] for f in fields[:2]] == [False, True]
+    assert fields[2] == {'cluster_id': None, 'cluster_size': None, 'cluster_primary': None}
+    # Stable: the same members give the same cluster id
+    assert assign_clusters(docs[::-1], np.array([0, 1, 1]))[1]['cluster_id'] == fields[0]['cluster_id']
+
+
+def test_one_per_cluster_prefers_the_primary_and_keeps_order():
+    leads = [{'id': '1', 'cluster_id': 'k', 'cluster_primary': False}, {'id': '2'},
+             {'id': '3', 'cluster_id': 'k', 'cluster_primary': True}, {'id': '4', 'cluster_id': 'm'}]
+    assert [lead['id'] for lead in one_per_cluster(leads)] == ['2', '3', '4']
+
+
+def test_dedupe_runs_through_the_sqlite_lead_repository():
+    async def scenario():
+        storage = SQLiteStorage(':memory:')
+        await storage.setup()
+        await storage.searches.insert({'id': 's1', 'query': 'pizza'})
+        await storage.leads.insert_many([
+            {'id': '1', 'searchId': 's1', 'businessName': "Tony's Pizzeria", 'phone': '(212) 555-0123',
+             'address': '123 Main Street, New York, NY 10001'},
+            {'id': '2', 'searchId': 's1', 'businessName': 'Tonys Pizzeria NYC', 'phone': '+1 212-555-0123',
+             'address': '123 Main St, New York, NY 10001', 'email': 'tony@pizza.com'},
+            {'id': '3', 'searchId': 's1', 'businessName': 'Sakura Sushi', 'address': '77 Green Ave, Austin, TX 78701'},
+        ])
+        batches = [len(batch) async for batch in storage.leads.scan(('id', 'businessName'), 2)]
+        first = await dedupe_leads(storage)
+        again = await dedupe_leads(storage)
+        leads = await storage.leads.list_by_search('s1', 10)
+        version = (await storage.searches.get('s1'))['results_version']
+        await storage.close()
+        return batches, first, again, leads, version
+
+    batches, first, again, leads, version = asyncio.run(scenario())
+    assert batches == [2, 1]
+    assert first == {'documents': 3, 'clusters': 1, 'updated': 2}
+    assert again['updated'] == 0
+    assert [lead['id'] for lead in one_per_cluster(leads)] == ['2', '3']
+    assert leads[2].get('cluster_id') is None and version == 1
@@ -0,0 +1,35 @@
+from services import freshness
+
+
+def lead(name, address, rating):
+    return {'businessName': name, 'address': address, 'rating': rating, 'id': 'x', 'searchId': 'y'}
+
+
+def test_compute_delta_reports_only_new_and_changed_leads():
+    _, previous, _, _ = freshness.compute_delta({}, [lead('A', '1 Main St', 4.0), lead('B', '2 Main St', 4.5)])
+
+    delta, _, changed_fraction, _ = freshness.compute_delta(
+        previous, [lead('A', '1 Main St', 4.0), lead('B', '2 Main St', 4.8), lead('C', '3 Main St', 3.9)]
+    )
+
+    assert [(d['businessName'], d['change_type']) for d in delta] == [('B', 'changed'), ('C', 'new')]
+    assert changed_fraction == 2 / 3
+
+
+def test_result_hash_ignores_volatile_fields():
+    first = freshness.compute_delta({}, [lead('A', '1 Main St', 4.0)])
+    second = freshness.compute_delta({}, [{**lead('A', '1 Main St', 4.0), 'id': 'other', 'searchId': 'z'}])
+    assert first[3] == second[3]
+
+
+def test_stable_targets_are_scraped_less_often():
+    assert freshness.next_interval_minutes(1.0) == freshness.FRESHNESS_MIN_INTERVAL_MINUTES
+    assert freshness.next_interval_minutes(0.0) == freshness.FRESHNESS_MAX_INTERVAL_MINUTES
+    assert freshness.next_interval_minutes(0.1) > freshness.next_interval_minutes(0.5)
+
+
+def test_fingerprint_keys_are_valid_mongo_field_names():
+    _, fingerprints, _, _ = freshness.compute_delta({}, [lead('Dr. Smith', '1 Main St.', 4.0),
+                                                         lead('$5 Pizza', '2 Main St', 4.0)])
+    assert len(fingerprints) == 2
+    assert all('.' not in key and not key.startswith('$') for key in fingerprints)
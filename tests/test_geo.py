@@ -0,0 +1,66 @@
+import asyncio
+from datetime import datetime
+
+from repositories.mongo import box_filter
+from repositories.sqlite import SQLiteStorage
+from services.geo import TileCache, haversine_m, point, synthetic_point, tile_bounds, tile_of
+
+
+def test_tiles_round_trip_and_synthetic_points_are_stable():
+    x, y = tile_of(-73.9857, 40.7484, 12)
+    min_lng, min_lat, max_lng, max_lat = tile_bounds(12, x, y)
+    assert min_lng <= -73.9857 <= max_lng and min_lat <= 40.7484 <= max_lat
+    assert tile_of(0, 0, 0) == (0, 0)
+
+    location = synthetic_point('New York', 'NY', 'lead-1')
+    assert location == synthetic_point('New York', 'NY', 'lead-1')
+    assert haversine_m(-73.9857, 40.7484, *location['coordinates']) <= 8000
+
+
+def test_box_filter_checks_exact_bounds_and_uses_the_index_for_small_boxes():
+    small = box_filter((-74.0, 40.7, -73.9, 40.8))
+    assert small['loc.coordinates.0'] == {'$gte': -74.0, '$lte': -73.9}
+    assert small['loc']['$geoWithin']['$geometry']['type'] == 'Polygon'
+    assert 'loc' not in box_filter((-180, -85, 180, 85))
+
+
+def test_tile_cache_expires_entries():
+    cache = TileCache(ttl=0)
+    cache.put((1, 0, 0), {'total': 1})
+    assert cache.get((1, 0, 0)) is None
+    cache = TileCache(ttl=60, max_entries=1)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') is None and cache.get('b') == 2
+
+
+def test_sqlite_geo_queries():
+    async def scenario():
+        storage = SQLiteStorage(':memory:')
+        await storage.setup()
+        now = datetime(2024, 5, 1)
+        await storage.leads.insert_many([
+            {'id': 'near', 'location': point(-73.99, 40.75), 'rating': 4.0, 'created_at': now},
+            {'id': 'mid', 'location': point(-73.95, 40.78), 'rating': 5.0, 'created_at': now},
+            {'id': 'far', 'location': point(-118.24, 34.05), 'created_at': now},
+            {'id': 'nowhere', 'created_at': now},
+        ])
+
+        within = await storage.leads.near(-73.99, 40.75, 10, max_distance_m=10000)
+        assert [lead['id'] for lead in within] == ['near', 'mid']
+        assert within[0]['distance'] < 1
+
+        assert [lead['id'] for lead in await storage.leads.near(-73.99, 40.75, 3)] == ['near', 'mid', 'far']
+        assert {lead['id'] for lead in await storage.leads.within_box((-74.0, 40.7, -73.9, 40.8), 10)} == {'near', 'mid'}
+
+        x, y = tile_of(-73.99, 40.75, 8)
+        cells = await storage.leads.tile_cells(8, x, y, 3)
+        assert sum(cell['count'] for cell in cells) == 2
+        assert all(x * 8 <= cell['x'] < x * 8 + 8 and y * 8 <= cell['y'] < y * 8 + 8 for cell in cells)
+
+        # Moving a lead re-indexes it
+        await storage.leads.update('far', {'location': point(-73.98, 40.76)})
+        assert len(await storage.leads.near(-73.99, 40.75, 10, max_distance_m=10000)) == 3
+        await storage.close()
+
+    asyncio.run(scenario())
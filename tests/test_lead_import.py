@@ -0,0 +1,95 @@
+import asyncio
+import gzip
+
+import orjson
+import pytest
+
+from repositories.sqlite import SQLiteStorage
+from services.lead_import import CsvRows, decompressed, detect_format, import_leads, validate_rows
+
+CSV = (
+    '\ufeff"Business Name","Type","Address","Phone","Website","Email","Rating","Reviews","Search Query","lat","lng"\r\n'
+    '"Golden Pizza","Restaurant","1 Main St, Austin, TX 78701","","https://a.com","a@a.com","4.5","300","pizza",'
+    '"30.27","-97.74"\r\n'
+    '"Corner ""Cafe""","Cafe","2 Oak St,\nSuite 5, Austin, TX 78701","(512) 555-0100","","","","","pizza","",""\r\n'
+    '\r\n'
+    '"No Type","","3 Elm St","","","","great","","pizza","",""\r\n'
+)
+
+
+async def _chunks(data: bytes, size: int = 7):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+async def _collect(chunks):
+    return b''.join([chunk async for chunk in chunks])
+
+
+async def _import(data: bytes, file_format: str, batch_size: int = 2, existing=()):
+    storage = SQLiteStorage(':memory:')
+    await storage.setup()
+    await storage.searches.insert({'id': 's1', 'query': 'import', 'status': 'importing'})
+    if existing:
+        await storage.leads.insert_many(list(existing))
+    report = await import_leads(storage, 's1', _chunks(data), file_format, batch_size)
+    search = await storage.searches.get('s1')
+    leads = await storage.leads.list_by_search('s1', 100)
+    await storage.close()
+    return report, search, leads
+
+
+def test_format_and_compression_are_detected():
+    assert detect_format('text/csv; charset=utf-8', None) == 'csv'
+    assert detect_format('application/octet-stream', 'leads.jsonl.gz') == 'jsonl'
+    assert detect_format(None, 'leads.xlsx') is None
+
+    body = b'x' * 5000
+    # Two gzip members back to back, split into chunks smaller than the header
+    packed = gzip.compress(body[:3000]) + gzip.compress(body[3000:])
+    assert asyncio.run(_collect(decompressed(_chunks(packed)))) == body
+    assert asyncio.run(_collect(decompressed(_chunks(b'a')))) == b'a'
+    with pytest.raises(ValueError):
+        asyncio.run(_collect(decompressed(_chunks(packed[:-20]))))
+
+
+def test_csv_records_may_span_lines_and_chunks():
+    parser = CsvRows()
+    rows, _ = parser.feed(CSV.lstrip('\ufeff').replace('\r\n', '\n').split('\n')[:3])
+    assert rows == [(2, {'businessName': 'Golden Pizza', 'businessType': 'Restaurant',
+                         'address': '1 Main St, Austin, TX 78701', 'website': 'https://a.com', 'email': 'a@a.com',
+                         'rating': '4.5', 'reviewCount': '300',
+                         'location': {'type': 'Point', 'coordinates': ['-97.74', '30.27']}})]
+    # The quoted address is still open
+    assert parser.finish()[0][0][1]['businessName'] == 'Corner "Cafe"'
+
+
+def test_invalid_rows_are_reported_without_failing_the_batch():
+    rows = [(2, {'businessName': 'A', 'businessType': 'Cafe', 'address': 'x', 'searchId': 'other'}),
+            (3, {'businessName': 'B', 'address': 'y', 'rating': 'great'})]
+    valid, errors = validate_rows(rows, 's1')
+    assert [(line, lead['businessName'], lead['searchId']) for line, lead in valid] == [(2, 'A', 's1')]
+    assert errors[0]['row'] == 3
+    assert {error['field'] for error in errors[0]['errors']} == {'businessType', 'rating'}
+
+
+def test_csv_import_streams_gzip_into_a_search():
+    report, search, leads = asyncio.run(_import(gzip.compress(CSV.encode()), 'csv'))
+    assert (report['rows'], report['imported'], report['rejected']) == (3, 2, 1)
+    assert report['errors'][0]['row'] == 6 and report['errors'][0]['errors'][0]['field'] == 'businessType'
+    assert search['status'] == 'completed' and search['results_count'] == 2
+    by_name = {lead['businessName']: lead for lead in leads}
+    assert by_name['Golden Pizza']['location']['coordinates'] == [-97.74, 30.27]
+    assert by_name['Golden Pizza']['reviewCount'] == 300 and 'score' in by_name['Golden Pizza']
+    assert by_name['Corner "Cafe"']['address'] == '2 Oak St,\nSuite 5, Austin, TX 78701'
+
+
+def test_jsonl_import_skips_existing_ids_and_bad_lines():
+    lead = {'businessName': 'Cafe', 'businessType': 'Cafe', 'address': '1 Main St'}
+    lines = [orjson.dumps({**lead, 'id': f"l{index}"}) for index in range(4)] + [b'{"broken', b'[1, 2]']
+    existing = [{**lead, 'id': 'l1', 'searchId': 'older'}]
+    report, search, leads = asyncio.run(_import(b'\n'.join(lines) + b'\n', 'jsonl', existing=existing))
+    assert (report['rows'], report['imported'], report['duplicates'], report['rejected']) == (6, 3, 1, 2)
+    assert sorted(error['row'] for error in report['errors']) == [2, 5, 6]
+    assert sorted(lead['id'] for lead in leads) == ['l0', 'l2', 'l3']
+    assert search['results_count'] == 3
@@ -0,0 +1,61 @@
+import asyncio
+import uuid
+
+from bson import Binary, ObjectId
+
+from models.leads import LEAD_CODEC, SEARCH_CODEC, LeadResult, SearchRecord, dump_leads
+from repositories.mongo_migration import estimate_savings, needs_migration
+
+
+def test_dump_leads_matches_model_dump():
+    leads = [
+        LeadResult(businessName="Tony's Pizzeria", businessType="Pizza Restaurant",
+                   address="1 Main St, New York, NY 10001", rating=4.5, searchId="s1"),
+        LeadResult(businessName="Blue Moon Cafe", businessType="Coffee Shop",
+                   address="2 Main St, New York, NY 10001", email="hello@bluemooncafe.com", searchId="s1"),
+    ]
+
+    assert dump_leads(leads) == [lead.model_dump() for lead in leads]
+
+
+def test_lead_codec_round_trips_compactly():
+    lead = LeadResult(businessName="Tony's Pizzeria", businessType="Pizza Restaurant",
+                      address="1 Main St, New York, NY 10001", rating=4.5, searchId=str(uuid.uuid4())).model_dump()
+    stored = LEAD_CODEC.encode(lead)
+
+    assert stored['_id'] == Binary.from_uuid(uuid.UUID(lead['id'])) and stored['s'].subtype == 4
+    assert 'p' not in stored and 'e' not in stored and 'businessName' not in stored
+    assert LEAD_CODEC.decode(stored) == lead
+    # Ids that are not UUIDs are kept as strings
+    assert LEAD_CODEC.encode({'id': 'lead-1'}) == {'_id': 'lead-1'}
+    assert LEAD_CODEC.field('location.coordinates') == 'loc.coordinates'
+
+
+def test_codec_updates_unset_nulls_and_searches_keep_their_shape():
+    assert LEAD_CODEC.update({'email': 'a@b.c', 'cluster_id': None}) == {'$set': {'e': 'a@b.c'}, '$unset': {'k': ''}}
+    search = SearchRecord(query='restaurants', city='Austin', state='TX', maxResults=20).model_dump()
+    assert SEARCH_CODEC.decode(SEARCH_CODEC.encode(search)) == search
+
+
+def test_compact_documents_are_much_smaller():
+    docs = [{'_id': ObjectId(), **LeadResult(businessName=f"Cafe {i}", businessType='Cafe', address='1 Main St',
+                                             searchId=str(uuid.uuid4())).model_dump()} for i in range(50)]
+    report = estimate_savings(docs, LEAD_CODEC)
+    assert report['sampled'] == 50 and report['saved_percent'] > 40
+
+
+class _Collection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def find_one(self, query, projection=None):
+        # Only the legacy probe is issued: {'id': {'$exists': True}}
+        return next((doc for doc in self.docs if 'id' in doc), None)
+
+
+def test_legacy_documents_are_detected_without_any_index():
+    legacy = {'_id': ObjectId(), 'id': str(uuid.uuid4()), 'businessName': 'Cafe'}
+    compact = LEAD_CODEC.encode({'id': str(uuid.uuid4()), 'businessName': 'Cafe'})
+    database = {'leads': _Collection([compact, legacy]), 'searches': _Collection([compact])}
+    assert asyncio.run(needs_migration(database, 'leads'))
+    assert not asyncio.run(needs_migration(database, 'searches'))
@@ -0,0 +1,91 @@
+import asyncio
+import uuid
+
+import orjson
+from bson import Binary
+
+from services.live_updates import (RESYNC, LiveEventFilter, LiveUpdateHub, Subscription, after,
+                                   change_stream_pipeline, format_sse, make_event, project, stored_event)
+
+
+def _hub():
+    hub = LiveUpdateHub(mode='poll')
+    # No database in tests: events are published by hand
+    hub._start_watchers = lambda: None
+    return hub
+
+
+def test_events_carry_only_the_pushed_fields():
+    task = {'_id': 1, 'id': 't1', 'workflow_type': 'google_maps_scraper', 'status': 'running', 'owner': 'x',
+            'parameters': {'max_results': 20}, 'checkpoint': {'pages': 2, 'cursor': 'abc'}}
+    assert make_event('automation_tasks', 'update', task) == {
+        'collection': 'automation_tasks', 'op': 'update', 'id': 't1',
+        'doc': {'id': 't1', 'workflow_type': 'google_maps_scraper', 'status': 'running', 'checkpoint': {'pages': 2}}}
+    assert project({'a': None, 'b': {'c': 1}}, ('a', 'b.c', 'b.d')) == {'b': {'c': 1}}
+    # Leads are stored compactly: the stream projects stored names, events carry API names
+    assert change_stream_pipeline('leads')[1]['$project']['fullDocument.e'] == 1
+    stored = {'_id': Binary.from_uuid(uuid.UUID(int=1)), 'e': 'a@b.c', 'n': 'Cafe'}
+    assert stored_event('leads', 'update', stored)['doc'] == {'id': str(uuid.UUID(int=1)), 'businessName': 'Cafe',
+                                                            'email': 'a@b.c'}
+    assert after('c', (1, 2)) == {'$or': [{'c': {'$gt': 1}}, {'c': 1, '_id': {'$gt': 2}}]}
+    assert after('_id', (5, 5)) == {'_id': {'$gt': 5}} and after('u', (1, None)) == {'u': {'$gt': 1}}
+
+
+def test_filters_apply_to_their_collections_only():
+    lead = make_event('leads', 'update', {'id': 'l1', 'searchId': 's1', 'email': 'a@b.c'})
+    other_lead = make_event('leads', 'insert', {'id': 'l2', 'searchId': 's2'})
+    task = make_event('automation_tasks', 'update', {'id': 't1', 'workflow_type': 'wf', 'status': 'completed'})
+
+    by_search = LiveEventFilter(search_id='s1')
+    assert by_search.matches(lead) and not by_search.matches(other_lead) and by_search.matches(task)
+    tasks_only = LiveEventFilter(collections=frozenset({'automation_tasks'}), workflow='wf', status='completed')
+    assert tasks_only.matches(task) and not tasks_only.matches(lead)
+    assert not LiveEventFilter(workflow='other').matches(task)
+    assert LiveEventFilter(collections=frozenset({'leads'})).matches(RESYNC)
+
+
+def test_hub_fans_out_and_resyncs_slow_clients():
+    async def scenario():
+        hub = _hub()
+        fast = hub.subscribe(LiveEventFilter())
+        filtered = hub.subscribe(LiveEventFilter(search_id='s1'))
+        slow = Subscription(LiveEventFilter(), max_queued=3)
+        hub._subscribers.add(slow)
+
+        for index in range(5):
+            hub.publish(make_event('leads', 'insert', {'id': f"l{index}", 'searchId': 's1' if index == 4 else 's2'}))
+
+        assert [event['id'] for event in await fast.next_batch(1)] == ['l0', 'l1', 'l2', 'l3', 'l4']
+        assert [event['id'] for event in await filtered.next_batch(1)] == ['l4']
+        # Overflowed after three events: backlog dropped, then a resync marker and what came after
+        assert [event['op'] for event in await slow.next_batch(1)] == ['resync', 'insert']
+        assert await fast.next_batch(0.01) == []
+
+        hub.unsubscribe(fast)
+        hub.unsubscribe(filtered)
+        hub.unsubscribe(fast)
+        return hub.subscriber_count
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_sse_messages_are_named_after_the_collection():
+    payload = format_sse([make_event('searches', 'update', {'id': 's1', 'status': 'completed'}), RESYNC])
+    first, second, rest = payload.split(b'\n\n')
+    assert first.startswith(b'event: searches\ndata: ')
+    assert orjson.loads(first.split(b'data: ', 1)[1])['doc'] == {'id': 's1', 'status': 'completed'}
+    assert second.startswith(b'event: resync\n') and rest == b''
+
+
+def test_closing_ends_streams_after_their_queued_events():
+    async def scenario():
+        hub = _hub()
+        subscription = hub.subscribe(LiveEventFilter())
+        hub.publish(make_event('searches', 'update', {'id': 's1'}))
+        hub.close_subscriptions()
+        hub.publish(make_event('searches', 'update', {'id': 's2'}))
+        batch = await subscription.next_batch(1)
+        late = hub.subscribe(LiveEventFilter())
+        return [event['id'] for event in batch], subscription.closed, late.closed, await late.next_batch(1)
+
+    assert asyncio.run(scenario()) == (['s1'], True, True, [])
@@ -0,0 +1,23 @@
+import asyncio
+import time
+
+from services.loop_monitor import LoopMonitor, event_loop_slow_callbacks
+
+
+def test_blocking_step_is_reported_with_task_name(caplog):
+    async def blocking_job():
+        await asyncio.sleep(0.05)
+        time.sleep(0.3)
+
+    async def main():
+        monitor = LoopMonitor(interval=0.01, threshold=0.1)
+        monitor.start()
+        await asyncio.get_running_loop().create_task(blocking_job(), name='blocking_job')
+        await monitor.stop()
+
+    with caplog.at_level('WARNING'):
+        asyncio.run(main())
+
+    assert 'event_loop_slow_callbacks_total{label="blocking_job"} 1' in "\n".join(event_loop_slow_callbacks.render())
+    assert 'in blocking_job' in caplog.text
+    assert 'time.sleep(0.3)' in caplog.text
@@ -0,0 +1,37 @@
+import asyncio
+from types import SimpleNamespace
+
+from services.metrics import MetricsMiddleware, MetricsRegistry, http_requests_total
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    latency = registry.histogram('latency_seconds', 'test', buckets=(0.1, 1.0))
+    latency.observe(0.05, route='/a')
+    latency.observe(0.5, route='/a')
+    latency.observe(5, route='/a')
+
+    text = registry.render()
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{route="/a"} 3' in text
+
+
+def test_middleware_labels_requests_with_route_template():
+    async def app(scope, receive, send):
+        scope['route'] = SimpleNamespace(path='/api/leads/search/{search_id}')
+        await send({'type': 'http.response.start', 'status': 404, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        pass
+
+    scope = {'type': 'http', 'method': 'GET', 'path': '/api/leads/search/abc'}
+    asyncio.run(MetricsMiddleware(app)(scope, receive, send))
+
+    assert 'http_requests_total{method="GET",route="/api/leads/search/{search_id}",status="404"}' \
+        in "\n".join(http_requests_total.render())
@@ -0,0 +1,30 @@
+import asyncio
+import json
+import time
+
+from services import profiling
+
+
+def _busy_wait(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_forced_job_profile_is_written_as_speedscope(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, 'PROFILING_DIR', tmp_path)
+    monkeypatch.setattr(profiling, 'PROFILING_MAX_FILES', 1)
+
+    async def job():
+        _busy_wait(0.1)
+        return 'done'
+
+    assert asyncio.run(profiling.run_profiled('job', job(), forced=True)) == 'done'
+    assert asyncio.run(profiling.run_profiled('job', job(), forced=True)) == 'done'
+
+    files = list(tmp_path.glob(f'*{profiling.PROFILE_SUFFIX}'))
+    assert len(files) == 1
+    profile = json.loads(files[0].read_text())
+    names = {frame['name'] for frame in profile['shared']['frames']}
+    assert '_busy_wait' in names
+    assert profile['profiles'][0]['samples']
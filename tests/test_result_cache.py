@@ -0,0 +1,61 @@
+import asyncio
+import gzip
+
+from repositories.sqlite import SQLiteStorage
+from services.result_cache import CachedPayload, SearchResultCache
+
+
+def test_payload_is_compressed_once_and_answers_conditional_requests():
+    body = b'{"leads":[' + b','.join(b'{"id":%d}' % index for index in range(200)) + b']}'
+    payload = CachedPayload.build(1, body)
+    assert gzip.decompress(payload.gzipped) == body
+    assert CachedPayload.build(1, body).gzipped == payload.gzipped
+
+    plain = payload.response({})
+    assert plain.body == body and 'content-encoding' not in plain.headers
+    compressed = payload.response({'accept-encoding': 'gzip, br'})
+    assert compressed.body == payload.gzipped and compressed.headers['content-encoding'] == 'gzip'
+    assert compressed.headers['etag'] != plain.headers['etag']
+
+    for tag in (plain.headers['etag'], compressed.headers['etag'], f"W/{plain.headers['etag']}, \"other\""):
+        not_modified = payload.response({'if-none-match': tag})
+        assert not_modified.status_code == 304 and not_modified.body == b''
+    assert payload.response({'if-none-match': '"other"'}).status_code == 200
+    assert CachedPayload.build(1, b'{}').gzipped is None
+
+
+def test_cache_is_bounded_by_bytes_and_revalidated_by_version():
+    cache = SearchResultCache(max_bytes=800, ttl=60)
+    for search_id in ('a', 'b', 'c'):
+        cache.put(search_id, CachedPayload.build(1, b'x' * 100))
+    cache.fresh('a')
+    cache.put('d', CachedPayload.build(1, b'x' * 100))
+    cache.put('e', CachedPayload.build(1, b'x' * 500))
+    assert cache.fresh('e') is None
+    cache.max_bytes = 200
+    cache.put('d', CachedPayload.build(2, b'x' * 25))
+    # Least recently used first: b and c go, a was read
+    assert cache.fresh('b') is None and cache.fresh('c') is None and cache.fresh('a') is not None
+    assert cache.size == 125
+
+    cache.ttl = 0
+    assert cache.fresh('d') is None
+    assert cache.get('d', 1) is None and cache.get('d', 2).version == 2
+    cache.invalidate('d')
+    assert cache.get('d', 2) is None and cache.size == 100
+
+
+def test_sqlite_writes_bump_the_results_version():
+    async def scenario():
+        storage = SQLiteStorage(':memory:')
+        await storage.setup()
+        await storage.searches.insert({'id': 's1', 'query': 'pizza'})
+        await storage.searches.insert({'id': 's2', 'query': 'coffee'})
+        await storage.searches.set_results_count('s1', 3)
+        await storage.searches.bump_results_versions(['s1', 's2', 's1'])
+        versions = [(await storage.searches.get(search_id))['results_version'] for search_id in ('s1', 's2')]
+        assert (await storage.searches.get('s1'))['results_count'] == 3
+        await storage.close()
+        return versions
+
+    assert asyncio.run(scenario()) == [2, 1]
@@ -0,0 +1,48 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from repositories.sqlite import SQLiteStorage
+from services.scoring import ScoreWeights, apply_scores, rescore_stale, score_docs
+
+
+def test_scores_follow_the_weights():
+    complete = {'rating': 5.0, 'reviewCount': 1000, 'email': 'a@b.c', 'phone': '1', 'website': 'https://b.c'}
+    empty = {'rating': None, 'reviewCount': None, 'email': '', 'phone': None, 'website': None}
+    assert score_docs([complete, empty]).tolist() == [100.0, 0.0]
+
+    email_only = ScoreWeights(rating=0, reviews=0, email=1, phone=0, website=0)
+    assert score_docs([{'email': 'a@b.c', 'rating': 5}, {'rating': 5}], email_only).tolist() == [100.0, 0.0]
+    assert email_only.version != ScoreWeights().version
+    with pytest.raises(ValueError):
+        score_docs([complete], ScoreWeights(0, 0, 0, 0, 0))
+
+
+def test_rescoring_touches_only_stale_leads_and_top_k_uses_scores():
+    async def scenario():
+        storage = SQLiteStorage(':memory:')
+        await storage.setup()
+        weights = ScoreWeights()
+        await storage.leads.insert_many(apply_scores([
+            {'id': 'a', 'searchId': 's1', 'rating': 4.9, 'reviewCount': 500, 'address': '1 A St, Austin, TX 78701'},
+        ], weights) + [
+            {'id': 'b', 'searchId': 's1', 'rating': 3.0, 'reviewCount': 5, 'address': '2 B St, New York, NY 10001'},
+            {'id': 'c', 'searchId': 's2', 'rating': 4.0, 'reviewCount': 50, 'email': 'c@d.e',
+             'address': '3 C St, Austin, TX 78701'},
+        ])
+
+        assert await rescore_stale(storage, weights, batch_size=1) == 2
+        assert await rescore_stale(storage, weights) == 0
+        assert [lead['id'] for lead in await storage.leads.top(3)] == ['c', 'a', 'b']
+        assert [lead['id'] for lead in await storage.leads.top(3, search_id='s2')] == ['c']
+        assert [lead['id'] for lead in await storage.leads.top(3, region='ny')] == ['b']
+
+        # New weights make every score stale
+        rating_only = ScoreWeights(rating=1, reviews=0, email=0, phone=0, website=0)
+        assert await rescore_stale(storage, rating_only) == 3
+        assert (await storage.leads.top(1))[0]['id'] == 'a'
+        await storage.close()
+
+    asyncio.run(scenario())
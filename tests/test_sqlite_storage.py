@@ -0,0 +1,101 @@
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta
+
+import orjson
+
+from repositories.base import LeadQuery, lead_state
+from repositories.sqlite import SQLiteStorage
+
+
+def test_sqlite_storage_round_trips_documents_and_indexed_queries():
+    async def scenario():
+        storage = SQLiteStorage(':memory:')
+        await storage.setup()
+        now = datetime(2024, 5, 1, 12, 0, 0, 250000)
+
+        await storage.searches.insert({'id': 's1', 'query': 'pizza', 'created_at': now - timedelta(hours=1)})
+        await storage.searches.insert({'id': 's2', 'query': 'coffee', 'created_at': now})
+        await storage.leads.insert_many([
+            {'id': 'l1', 'searchId': 's1', 'email': 'a@b.c', 'created_at': now},
+            {'id': 'l2', 'searchId': 's1', 'email': None, 'created_at': now},
+            {'id': 'l3', 'searchId': 's2', 'email': '', 'created_at': now},
+        ])
+        await storage.searches.set_results_count('s1', 2)
+        await storage.leads.update('l2', {'email': 'x@y.z'})
+        await storage.tasks.insert({'id': 't1', 'workflow_type': 'a', 'started_at': now - timedelta(days=2)})
+        await storage.tasks.insert({'id': 't2', 'workflow_type': 'b', 'started_at': now})
+
+        search = await storage.searches.get('s1')
+        assert search['results_count'] == 2
+        assert search['created_at'] == now - timedelta(hours=1)
+        assert [s['id'] for s in await storage.searches.recent(5)] == ['s2', 's1']
+        assert [lead['id'] for lead in await storage.leads.list_by_search('s1', 10)] == ['l1', 'l2']
+        assert await storage.leads.count() == 3
+        assert await storage.leads.count_with_email() == 2
+        assert [t['id'] for t in await storage.tasks.started_since(now - timedelta(days=1), 10)] == ['t2']
+        assert [t['id'] for t in await storage.tasks.recent(10, workflow_type='a')] == ['t1']
+        assert await storage.health_checks.latest() is None
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+def test_sqlite_lead_query_filters_ranks_and_facets():
+    async def scenario():
+        storage = SQLiteStorage(':memory:')
+        await storage.setup()
+        now = datetime(2024, 5, 1)
+        await storage.leads.insert_many([
+            {'id': 'l1', 'businessName': 'Golden Pizza', 'businessType': 'Restaurant', 'address': '1 Main St, Austin, TX 78701',
+             'rating': 4.5, 'reviewCount': 300, 'email': 'a@b.c', 'website': 'https://a.com', 'created_at': now},
+            {'id': 'l2', 'businessName': 'Corner Cafe', 'businessType': 'Pizza Place', 'address': '2 Oak St, Austin, TX 78701',
+             'rating': 3.9, 'reviewCount': 20, 'email': None, 'website': 'https://b.com', 'created_at': now},
+            {'id': 'l3', 'businessName': 'Family Dental', 'businessType': 'Dentist', 'address': '3 Elm St, New York, NY 10001',
+             'rating': 4.8, 'reviewCount': 90, 'email': '', 'website': None, 'created_at': now},
+        ])
+
+        result = await storage.leads.query(LeadQuery(text='pizza'))
+        # The name match outranks the type match
+        assert [lead['id'] for lead in result['leads']] == ['l1', 'l2']
+        assert result['total'] == 2
+        assert result['facets']['state'] == [{'value': 'TX', 'count': 2}]
+        assert {b['value']: b['count'] for b in result['facets']['hasEmail']} == {True: 1, False: 1}
+
+        result = await storage.leads.query(LeadQuery(min_rating=4, has_website=False))
+        assert [lead['id'] for lead in result['leads']] == ['l3']
+
+        result = await storage.leads.query(LeadQuery(state='tx', sort='rating', limit=1, offset=1))
+        assert [lead['id'] for lead in result['leads']] == ['l2'] and result['total'] == 2
+
+        # Renaming a lead re-indexes its text
+        await storage.leads.update('l3', {'businessName': 'Pizza Dental'})
+        assert (await storage.leads.query(LeadQuery(text='"pizza"')))['total'] == 3
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+def test_sqlite_migrates_files_from_before_lead_query(tmp_path):
+    path = str(tmp_path / 'old.sqlite3')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE leads (id, search_id, has_email, doc BLOB NOT NULL)')
+    conn.execute('INSERT INTO leads VALUES (?, ?, ?, ?)', ('l1', 's1', 0, orjson.dumps(
+        {'id': 'l1', 'searchId': 's1', 'businessName': 'Golden Pizza', 'address': '1 Main St, Austin, TX 78701'})))
+    conn.commit()
+    conn.close()
+
+    async def scenario():
+        storage = SQLiteStorage(path)
+        await storage.setup()
+        result = await storage.leads.query(LeadQuery(text='golden', state='TX'))
+        assert [lead['id'] for lead in result['leads']] == ['l1']
+        await storage.close()
+
+    asyncio.run(scenario())
+
+
+def test_lead_state_is_parsed_from_the_address():
+    assert lead_state('12 Main St, New York, NY 10001') == 'NY'
+    assert lead_state('Somewhere without a zip') is None
+    assert lead_state(None) is None
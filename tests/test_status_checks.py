@@ -0,0 +1,17 @@
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from server import _parse_status_cursor
+
+
+def test_status_cursor_round_trips_timestamp_and_id():
+    timestamp = datetime(2024, 5, 1, 12, 30, 15, 123000)
+    assert _parse_status_cursor(f"{timestamp.isoformat()}_abc-123") == (timestamp, 'abc-123')
+
+
+def test_invalid_status_cursor_is_rejected():
+    with pytest.raises(HTTPException) as exc:
+        _parse_status_cursor('not-a-cursor')
+    assert exc.value.status_code == 400
@@ -0,0 +1,40 @@
+from datetime import datetime
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from benchmarks.synthetic_data import generate_chunk, generate_tasks
+from models.leads import LeadListAdapter
+
+END = datetime(2025, 1, 1)
+
+
+def test_chunks_are_deterministic_per_seed_and_index():
+    first = generate_chunk(42, 3, 50, 20, 0.2, END, 30)
+    again = generate_chunk(42, 3, 50, 20, 0.2, END, 30)
+    other = generate_chunk(42, 4, 50, 20, 0.2, END, 30)
+
+    assert first == again
+    assert first['searches'][0]['id'] != other['searches'][0]['id']
+
+
+def test_generated_leads_match_the_api_model():
+    chunk = generate_chunk(1, 0, 100, 20, 0.2, END, 30)
+    leads = chunk['leads']
+    search_ids = {search['id'] for search in chunk['searches']}
+
+    assert len(leads) == sum(search['results_count'] for search in chunk['searches'])
+    assert {lead['searchId'] for lead in leads} <= search_ids
+    assert len(LeadListAdapter.validate_python(leads)) == len(leads)
+    # Contact fields are partially missing, emails only exist with a website
+    assert any(lead['email'] is None for lead in leads)
+    assert all(lead['website'] for lead in leads if lead['email'])
+    assert all(lead['created_at'] <= END for lead in leads)
+
+
+def test_tasks_have_completion_times_when_finished():
+    tasks = generate_tasks(42, 0, 500, END, 30)['automation_tasks']
+    finished = [task for task in tasks if task['status'] in ('completed', 'failed')]
+    assert finished
+    assert all(task['completed_at'] >= task['started_at'] for task in finished)